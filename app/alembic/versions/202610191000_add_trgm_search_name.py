@@ -0,0 +1,53 @@
+"""add trigram search on organization name
+
+Revision ID: 3b9d2f41c6a7
+Revises: 7625708a998e
+Create Date: 2026-10-19 10:00:12.318204
+
+"""
+
+from typing import (
+    Sequence,
+    Union,
+)
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "3b9d2f41c6a7"
+down_revision: Union[str, None] = "7625708a998e"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# frozen copy of domain.normalization.normalize_name_sql("name") as of this revision
+SEARCH_NAME = "btrim(regexp_replace(translate(lower(name), 'aeopcxykmthbё', 'аеорсхукмтнве'), '\\s+', ' ', 'g'))"
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+
+    op.add_column(
+        "organizations",
+        sa.Column(
+            "search_name",
+            sa.String(length=255),
+            sa.Computed(SEARCH_NAME, persisted=True),
+            nullable=False,
+        ),
+    )
+    op.create_index(
+        "ix_organizations_search_name_trgm",
+        "organizations",
+        ["search_name"],
+        unique=False,
+        postgresql_using="gin",
+        postgresql_ops={"search_name": "gin_trgm_ops"},
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_organizations_search_name_trgm", table_name="organizations")
+    op.drop_column("organizations", "search_name")
@@ -0,0 +1,50 @@
+"""add lookup indexes
+
+Revision ID: 8e1c4a7d90b5
+Revises: 3b9d2f41c6a7
+Create Date: 2026-10-19 11:00:41.902377
+
+"""
+
+from typing import (
+    Sequence,
+    Union,
+)
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "8e1c4a7d90b5"
+down_revision: Union[str, None] = "3b9d2f41c6a7"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # by-activity: the primary key starts with organization_id, so lookups by activity need their own index
+    op.create_index(
+        "ix_organization_activity_activity_id_organization_id",
+        "organization_activity",
+        ["activity_id", "organization_id"],
+        unique=False,
+    )
+    # by-building: filter and ORDER BY id are both served by the index
+    op.create_index("ix_organizations_building_id_id", "organizations", ["building_id", "id"], unique=False)
+    # by-nested-activity: ancestor_id = ? AND depth <= ? is a range scan returning descendants from the index
+    op.create_index(
+        "ix_activities_closures_ancestor_id_depth_descendant_id",
+        "activities_closures",
+        ["ancestor_id", "depth", "descendant_id"],
+        unique=False,
+    )
+    # in-bbox and the bounding box prefilter of in-radius
+    op.create_index("ix_buildings_latitude_longitude", "buildings", ["latitude", "longitude"], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_buildings_latitude_longitude", table_name="buildings")
+    op.drop_index("ix_activities_closures_ancestor_id_depth_descendant_id", table_name="activities_closures")
+    op.drop_index("ix_organizations_building_id_id", table_name="organizations")
+    op.drop_index("ix_organization_activity_activity_id_organization_id", table_name="organization_activity")
@@ -0,0 +1,92 @@
+"""add change notify triggers
+
+Revision ID: c4f0a9e2d813
+Revises: 8e1c4a7d90b5
+Create Date: 2026-10-19 12:00:27.554190
+
+"""
+
+from typing import (
+    Sequence,
+    Union,
+)
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "c4f0a9e2d813"
+down_revision: Union[str, None] = "8e1c4a7d90b5"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TABLES = ("organizations", "buildings", "organization_activity", "activities", "activities_closures")
+
+# Payload: {"t": table, "op": insert|update|delete|truncate, "id": row id, "ref": related id}
+# organization_activity reports organization_id/activity_id, activities_closures ancestor_id/descendant_id,
+# organizations carry their building_id as "ref". Bulk loaders set app.suppress_change_notify = 'on' and send a
+# single {"op": "resync"} instead of one notification per row.
+NOTIFY_FUNCTION = """
+CREATE OR REPLACE FUNCTION notify_directory_change() RETURNS trigger AS $$
+DECLARE
+    changed record;
+    payload json;
+BEGIN
+    IF current_setting('app.suppress_change_notify', true) = 'on' THEN
+        RETURN NULL;
+    END IF;
+
+    IF TG_LEVEL = 'STATEMENT' THEN
+        payload := json_build_object('t', TG_TABLE_NAME, 'op', lower(TG_OP));
+    ELSE
+        IF TG_OP = 'DELETE' THEN
+            changed := OLD;
+        ELSE
+            changed := NEW;
+        END IF;
+
+        IF TG_TABLE_NAME = 'organization_activity' THEN
+            payload := json_build_object(
+                't', TG_TABLE_NAME, 'op', lower(TG_OP), 'id', changed.organization_id, 'ref', changed.activity_id
+            );
+        ELSIF TG_TABLE_NAME = 'activities_closures' THEN
+            payload := json_build_object(
+                't', TG_TABLE_NAME, 'op', lower(TG_OP), 'id', changed.ancestor_id, 'ref', changed.descendant_id
+            );
+        ELSIF TG_TABLE_NAME = 'organizations' THEN
+            payload := json_build_object(
+                't', TG_TABLE_NAME, 'op', lower(TG_OP), 'id', changed.id, 'ref', changed.building_id
+            );
+        ELSE
+            payload := json_build_object('t', TG_TABLE_NAME, 'op', lower(TG_OP), 'id', changed.id);
+        END IF;
+    END IF;
+
+    PERFORM pg_notify('directory_changes', payload::text);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql
+"""
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute(NOTIFY_FUNCTION)
+
+    for table in TABLES:
+        op.execute(
+            f"CREATE TRIGGER {table}_notify_change AFTER INSERT OR UPDATE OR DELETE ON {table} "
+            f"FOR EACH ROW EXECUTE FUNCTION notify_directory_change()"
+        )
+        op.execute(
+            f"CREATE TRIGGER {table}_notify_truncate AFTER TRUNCATE ON {table} "
+            f"FOR EACH STATEMENT EXECUTE FUNCTION notify_directory_change()"
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table in TABLES:
+        op.execute(f"DROP TRIGGER IF EXISTS {table}_notify_truncate ON {table}")
+        op.execute(f"DROP TRIGGER IF EXISTS {table}_notify_change ON {table}")
+
+    op.execute("DROP FUNCTION IF EXISTS notify_directory_change()")
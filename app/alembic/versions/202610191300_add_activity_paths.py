@@ -0,0 +1,60 @@
+"""add activity paths
+
+Revision ID: 5d2b8f3a1c97
+Revises: c4f0a9e2d813
+Create Date: 2026-10-19 13:00:41.907316
+
+"""
+
+from typing import (
+    Sequence,
+    Union,
+)
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "5d2b8f3a1c97"
+down_revision: Union[str, None] = "c4f0a9e2d813"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# "1.4.17.": ancestor ids from the root down, the activity itself last
+BACKFILL_PATHS = """
+UPDATE activities a
+SET path = p.path, depth = p.depth
+FROM (
+    SELECT
+        descendant_id AS id,
+        string_agg(ancestor_id::text || '.', '' ORDER BY depth DESC) AS path,
+        max(depth) AS depth
+    FROM activities_closures
+    GROUP BY descendant_id
+) AS p
+WHERE p.id = a.id
+"""
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column("activities", sa.Column("path", sa.String(length=1024), server_default="", nullable=False))
+    op.add_column("activities", sa.Column("depth", sa.Integer(), server_default="0", nullable=False))
+
+    op.execute("SET LOCAL app.suppress_change_notify = 'on'")
+    op.execute(BACKFILL_PATHS)
+
+    op.create_index(
+        "ix_activities_path",
+        "activities",
+        ["path"],
+        unique=False,
+        postgresql_ops={"path": "text_pattern_ops"},
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_activities_path", table_name="activities")
+    op.drop_column("activities", "depth")
+    op.drop_column("activities", "path")
@@ -0,0 +1,58 @@
+"""normalize search name with NFKC
+
+Revision ID: 9a41c7e5b2d0
+Revises: 5d2b8f3a1c97
+Create Date: 2026-10-19 14:00:08.622947
+
+"""
+
+from typing import (
+    Sequence,
+    Union,
+)
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "9a41c7e5b2d0"
+down_revision: Union[str, None] = "5d2b8f3a1c97"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# frozen copies of domain.normalization.normalize_name_sql("name") as of this and the previous revision
+SEARCH_NAME = (
+    "btrim(regexp_replace(translate(lower(normalize(name, NFKC)), "
+    "'aeopcxykmthbё', 'аеорсхукмтнве'), '\\s+', ' ', 'g'))"
+)
+PREVIOUS_SEARCH_NAME = (
+    "btrim(regexp_replace(translate(lower(name), 'aeopcxykmthbё', 'аеорсхукмтнве'), '\\s+', ' ', 'g'))"
+)
+
+
+def _replace_search_name(expression: str):
+    # Postgres 16 can't change the expression of a generated column, it is added again
+    op.drop_index("ix_organizations_search_name_trgm", table_name="organizations")
+    op.drop_column("organizations", "search_name")
+    op.add_column(
+        "organizations",
+        sa.Column("search_name", sa.String(length=255), sa.Computed(expression, persisted=True), nullable=False),
+    )
+    op.create_index(
+        "ix_organizations_search_name_trgm",
+        "organizations",
+        ["search_name"],
+        unique=False,
+        postgresql_using="gin",
+        postgresql_ops={"search_name": "gin_trgm_ops"},
+    )
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    _replace_search_name(SEARCH_NAME)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    _replace_search_name(PREVIOUS_SEARCH_NAME)
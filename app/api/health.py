@@ -0,0 +1,29 @@
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+from services.readiness import readiness
+from services.worker_state import worker_state
+from starlette.status import (
+    HTTP_200_OK,
+    HTTP_503_SERVICE_UNAVAILABLE,
+)
+
+router = APIRouter(prefix="/health", tags=["health"])
+
+
+@router.get("/live", status_code=HTTP_200_OK)
+async def liveness_handler():
+    """Answers as long as the event loop of the worker runs"""
+    return {"status": "alive"}
+
+
+@router.get("/ready", status_code=HTTP_200_OK)
+async def readiness_handler():
+    """
+    Answers 200 once the worker is warmed up and 503 while it starts or shuts down, when the workers share
+    a worker state directory only once all of them are warmed up
+    """
+    ready, reason = worker_state.ready() if worker_state.opened else (readiness.ready, readiness.reason)
+    if not ready:
+        return JSONResponse(status_code=HTTP_503_SERVICE_UNAVAILABLE, content={"status": "not ready", "reason": reason})
+
+    return {"status": "ready"}
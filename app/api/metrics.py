@@ -0,0 +1,18 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+from observability.metrics import registry
+from services.worker_state import worker_state
+
+router = APIRouter(tags=["metrics"])
+
+
+@router.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+async def metrics_handler():
+    """
+    Returns metrics in the Prometheus text exposition format, summed over the workers of the host when they share
+    a worker state directory, otherwise of this worker process
+    Not protected by the API key, expose it to the scraper network only
+    """
+    content = worker_state.render_metrics() if worker_state.opened else registry.render()
+
+    return PlainTextResponse(content, media_type="text/plain; version=0.0.4")
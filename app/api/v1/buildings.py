@@ -0,0 +1,93 @@
+from typing import Annotated
+
+from dependencies.admission import admit
+from dependencies.dependencies import get_building_service
+from domain.schemas import (
+    BuildingPageRead,
+    BuildingSummaryRead,
+)
+from fastapi import (
+    APIRouter,
+    Depends,
+    HTTPException,
+    Path,
+    Query,
+    Security,
+)
+from protocols.service import BuildingService
+from security.authorization import verify_api_key
+from services.exceptions import (
+    BuildingNotFoundException,
+    StorageInternalException,
+)
+from starlette.status import (
+    HTTP_200_OK,
+    HTTP_400_BAD_REQUEST,
+    HTTP_404_NOT_FOUND,
+    HTTP_500_INTERNAL_SERVER_ERROR,
+)
+
+router = APIRouter(prefix="/buildings", tags=["buildings"], dependencies=[Security(verify_api_key)])
+
+
+@router.get("/in-bbox/", dependencies=[Depends(admit("geo"))], response_model=BuildingPageRead, status_code=HTTP_200_OK)
+async def get_buildings_in_bbox_handler(
+    building_service: Annotated[BuildingService, Depends(get_building_service)],
+    lat_min: float = Query(ge=-90, le=90),
+    lon_min: float = Query(ge=-180, le=180),
+    lat_max: float = Query(ge=-90, le=90),
+    lon_max: float = Query(ge=-180, le=180),
+    after_id: int = Query(0, ge=0, description="next_after_id of the previous page"),
+    limit: int = Query(100, ge=1, le=1000),
+):
+    """Returns buildings in bounding box with the number of organizations in each, ordered by id"""
+    try:
+        return await building_service.get_buildings_in_bbox(lat_min, lon_min, lat_max, lon_max, after_id, limit)
+
+    except StorageInternalException as exc:
+        raise HTTPException(status_code=HTTP_500_INTERNAL_SERVER_ERROR, detail=str(exc))
+    except Exception as exc:
+        raise HTTPException(status_code=HTTP_400_BAD_REQUEST, detail=str(exc))
+
+
+@router.get(
+    "/in-radius/", dependencies=[Depends(admit("geo"))], response_model=BuildingPageRead, status_code=HTTP_200_OK
+)
+async def get_buildings_in_radius_handler(
+    building_service: Annotated[BuildingService, Depends(get_building_service)],
+    latitude: float = Query(ge=-90, le=90),
+    longitude: float = Query(ge=-180, le=180),
+    radius: float = Query(ge=0, le=1000, description="Radius in kilometers"),
+    after_id: int = Query(0, ge=0, description="next_after_id of the previous page"),
+    limit: int = Query(100, ge=1, le=1000),
+):
+    """Returns buildings in radius with the number of organizations in each, ordered by id"""
+    try:
+        return await building_service.get_buildings_in_radius(latitude, longitude, radius, after_id, limit)
+
+    except StorageInternalException as exc:
+        raise HTTPException(status_code=HTTP_500_INTERNAL_SERVER_ERROR, detail=str(exc))
+    except Exception as exc:
+        raise HTTPException(status_code=HTTP_400_BAD_REQUEST, detail=str(exc))
+
+
+@router.get(
+    "/{building_id}",
+    dependencies=[Depends(admit("cheap"))],
+    response_model=BuildingSummaryRead,
+    status_code=HTTP_200_OK,
+)
+async def get_building_by_id_handler(
+    building_service: Annotated[BuildingService, Depends(get_building_service)],
+    building_id: Annotated[int, Path(ge=1)],
+):
+    """Returns a building with the number of its organizations"""
+    try:
+        return await building_service.get_building_by_id(building_id)
+
+    except StorageInternalException as exc:
+        raise HTTPException(status_code=HTTP_500_INTERNAL_SERVER_ERROR, detail=str(exc))
+    except BuildingNotFoundException as exc:
+        raise HTTPException(status_code=HTTP_404_NOT_FOUND, detail=str(exc))
+    except Exception as exc:
+        raise HTTPException(status_code=HTTP_400_BAD_REQUEST, detail=str(exc))
@@ -0,0 +1,79 @@
+import asyncio
+import logging
+from typing import AsyncIterator
+
+import asyncpg
+from config import settings
+from fastapi import (
+    APIRouter,
+    HTTPException,
+    Query,
+    Security,
+)
+from fastapi.responses import StreamingResponse
+from repository.export import PostgresExportSource
+from security.authorization import verify_api_key
+from services.exceptions import ExportUnavailableException
+from services.export import (
+    FILE_EXTENSIONS,
+    MEDIA_TYPES,
+    ExportFormat,
+    load_pyarrow,
+    stream_export,
+)
+from starlette.status import (
+    HTTP_501_NOT_IMPLEMENTED,
+    HTTP_503_SERVICE_UNAVAILABLE,
+)
+
+router = APIRouter(prefix="/export", tags=["export"], dependencies=[Security(verify_api_key)])
+
+# a full export holds a database connection for its whole duration, their number per worker is capped
+export_slots = asyncio.Semaphore(settings.export_max_concurrency)
+
+
+async def _export_body(export_format: ExportFormat) -> AsyncIterator[bytes]:
+    # the slot is held only while the body is produced, a response that is never sent can't keep it
+    async with export_slots:
+        try:
+            # a dedicated connection keeps the long running cursor off the request pool
+            connection = await asyncpg.connect(settings.postgres_dsn)
+            try:
+                source = PostgresExportSource(connection)
+                async for chunk in stream_export(source.batches(settings.export_batch_size), export_format):
+                    yield chunk
+            finally:
+                await connection.close()
+
+        except Exception as exc:
+            # the response has already started, the client sees a truncated file
+            logging.error("Error while exporting organizations as %s - %s", export_format, exc)
+            raise
+
+
+@router.get("/organizations/")
+async def export_organizations_handler(
+    export_format: ExportFormat = Query("parquet", alias="format", description="arrow (IPC stream) or parquet"),
+):
+    """
+    Streams all organizations with their building address, coordinates and activity ids as an Arrow IPC stream or
+    a Parquet file, for bulk consumers instead of paging through the JSON endpoints
+    """
+    try:
+        load_pyarrow()
+    except ExportUnavailableException as exc:
+        raise HTTPException(status_code=HTTP_501_NOT_IMPLEMENTED, detail=str(exc))
+
+    # exports arriving together may both pass the check, the later one then waits for the slot in the body
+    if export_slots.locked():
+        raise HTTPException(
+            status_code=HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many exports in progress",
+            headers={"Retry-After": "60"},
+        )
+
+    return StreamingResponse(
+        _export_body(export_format),
+        media_type=MEDIA_TYPES[export_format],
+        headers={"Content-Disposition": f'attachment; filename="organizations.{FILE_EXTENSIONS[export_format]}"'},
+    )
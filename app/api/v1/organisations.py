@@ -3,8 +3,15 @@ from typing import (
     List,
 )
 
+from dependencies.admission import admit
 from dependencies.dependencies import get_organization_service
-from domain.schemas import OrganizationRead
+from domain.filters import OrganizationFilters
+from domain.schemas import (
+    ActivityFacetRead,
+    BatchRadiusRead,
+    BatchRadiusRequest,
+    OrganizationRead,
+)
 from fastapi import (
     APIRouter,
     Depends,
@@ -29,7 +36,12 @@ from starlette.status import (
 router = APIRouter(prefix="/organizations", tags=["organizations"], dependencies=[Security(verify_api_key)])
 
 
-@router.get("/by-building/", response_model=List[OrganizationRead], status_code=HTTP_200_OK)
+@router.get(
+    "/by-building/",
+    dependencies=[Depends(admit("list"))],
+    response_model=List[OrganizationRead],
+    status_code=HTTP_200_OK,
+)
 async def get_organizations_by_building_id_handler(
     organization_service: Annotated[OrganizationService, Depends(get_organization_service)],
     building_id: int = Query(ge=1),
@@ -48,7 +60,12 @@ async def get_organizations_by_building_id_handler(
         raise HTTPException(status_code=HTTP_400_BAD_REQUEST, detail=str(exc))
 
 
-@router.get("/by-activity/", response_model=List[OrganizationRead], status_code=HTTP_200_OK)
+@router.get(
+    "/by-activity/",
+    dependencies=[Depends(admit("list"))],
+    response_model=List[OrganizationRead],
+    status_code=HTTP_200_OK,
+)
 async def get_organizations_by_activity_id_handler(
     organization_service: Annotated[OrganizationService, Depends(get_organization_service)],
     activity_id: int = Query(ge=1),
@@ -67,7 +84,12 @@ async def get_organizations_by_activity_id_handler(
         raise HTTPException(status_code=HTTP_400_BAD_REQUEST, detail=str(exc))
 
 
-@router.get("/{organization_id}", response_model=OrganizationRead, status_code=HTTP_200_OK)
+@router.get(
+    "/{organization_id}",
+    dependencies=[Depends(admit("cheap"))],
+    response_model=OrganizationRead,
+    status_code=HTTP_200_OK,
+)
 async def get_organization_by_id_handler(
     organization_service: Annotated[OrganizationService, Depends(get_organization_service)],
     organization_id: Annotated[int, Path(ge=1)],
@@ -84,7 +106,9 @@ async def get_organization_by_id_handler(
         raise HTTPException(status_code=HTTP_400_BAD_REQUEST, detail=str(exc))
 
 
-@router.get("/by-name/", response_model=OrganizationRead, status_code=HTTP_200_OK)
+@router.get(
+    "/by-name/", dependencies=[Depends(admit("cheap"))], response_model=OrganizationRead, status_code=HTTP_200_OK
+)
 async def get_organization_by_name_handler(
     organization_service: Annotated[OrganizationService, Depends(get_organization_service)],
     name: str = Query(min_length=1),
@@ -101,7 +125,114 @@ async def get_organization_by_name_handler(
         raise HTTPException(status_code=HTTP_400_BAD_REQUEST, detail=str(exc))
 
 
-@router.get("/in-radius/", response_model=List[OrganizationRead], status_code=HTTP_200_OK)
+@router.get(
+    "/search/", dependencies=[Depends(admit("list"))], response_model=List[OrganizationRead], status_code=HTTP_200_OK
+)
+async def search_organizations_by_name_handler(
+    organization_service: Annotated[OrganizationService, Depends(get_organization_service)],
+    name: str = Query(min_length=3, max_length=255, description="Part of organization name, case insensitive"),
+    page: int = Query(1, ge=1),
+    limit: int = Query(10, ge=1, le=20),
+):
+    """Returns a ranked list of organizations matching the name by substring, prefix or similarity with pagination"""
+    try:
+        return await organization_service.search_organizations_by_name_with_pagination(name, page, limit)
+
+    except StorageInternalException as exc:
+        raise HTTPException(status_code=HTTP_500_INTERNAL_SERVER_ERROR, detail=str(exc))
+    except OrganizationNotFoundException as exc:
+        raise HTTPException(status_code=HTTP_404_NOT_FOUND, detail=str(exc))
+    except Exception as exc:
+        raise HTTPException(status_code=HTTP_400_BAD_REQUEST, detail=str(exc))
+
+
+@router.get(
+    "/filter/", dependencies=[Depends(admit("list"))], response_model=List[OrganizationRead], status_code=HTTP_200_OK
+)
+async def search_organizations_by_filters_handler(
+    organization_service: Annotated[OrganizationService, Depends(get_organization_service)],
+    building_id: int | None = Query(None, ge=1),
+    activity_id: int | None = Query(None, ge=1),
+    nested_activity_id: int | None = Query(None, ge=1, description="Activity id, nested activities match too"),
+    latitude: float | None = Query(None, ge=-90, le=90),
+    longitude: float | None = Query(None, ge=-180, le=180),
+    radius: float | None = Query(None, ge=0, le=1000, description="Radius in kilometers"),
+    lat_min: float | None = Query(None, ge=-90, le=90),
+    lon_min: float | None = Query(None, ge=-180, le=180),
+    lat_max: float | None = Query(None, ge=-90, le=90),
+    lon_max: float | None = Query(None, ge=-180, le=180),
+    name: str | None = Query(None, min_length=3, max_length=255, description="Part of organization name"),
+    address: str | None = Query(None, min_length=3, max_length=255, description="Part of building address"),
+    page: int = Query(1, ge=1),
+    limit: int = Query(10, ge=1, le=20),
+):
+    """Returns a list of organizations matching any combination of filters with pagination"""
+    try:
+        filters = OrganizationFilters(
+            building_id=building_id,
+            activity_id=activity_id,
+            nested_activity_id=nested_activity_id,
+            latitude=latitude,
+            longitude=longitude,
+            radius=radius,
+            lat_min=lat_min,
+            lon_min=lon_min,
+            lat_max=lat_max,
+            lon_max=lon_max,
+            name=name,
+            address=address,
+        )
+        return await organization_service.search_organizations_with_pagination(filters, page, limit)
+
+    except StorageInternalException as exc:
+        raise HTTPException(status_code=HTTP_500_INTERNAL_SERVER_ERROR, detail=str(exc))
+    except OrganizationNotFoundException as exc:
+        raise HTTPException(status_code=HTTP_404_NOT_FOUND, detail=str(exc))
+    except Exception as exc:
+        raise HTTPException(status_code=HTTP_400_BAD_REQUEST, detail=str(exc))
+
+
+@router.get(
+    "/facets/", dependencies=[Depends(admit("geo"))], response_model=List[ActivityFacetRead], status_code=HTTP_200_OK
+)
+async def get_activity_facets_handler(
+    organization_service: Annotated[OrganizationService, Depends(get_organization_service)],
+    latitude: float | None = Query(None, ge=-90, le=90),
+    longitude: float | None = Query(None, ge=-180, le=180),
+    radius: float | None = Query(None, ge=0, le=1000, description="Radius in kilometers"),
+    lat_min: float | None = Query(None, ge=-90, le=90),
+    lon_min: float | None = Query(None, ge=-180, le=180),
+    lat_max: float | None = Query(None, ge=-90, le=90),
+    lon_max: float | None = Query(None, ge=-180, le=180),
+):
+    """
+    Returns organization counts per activity for a radius or a bounding box, organizations count towards
+    the ancestors of their activities too. The area is slightly widened to share cached counts
+    """
+    try:
+        area = OrganizationFilters(
+            latitude=latitude,
+            longitude=longitude,
+            radius=radius,
+            lat_min=lat_min,
+            lon_min=lon_min,
+            lat_max=lat_max,
+            lon_max=lon_max,
+        )
+        if len(area.kinds) != 1:
+            raise ValueError("Either a radius or a bounding box is required")
+
+        return await organization_service.get_activity_facets_in_area(area)
+
+    except StorageInternalException as exc:
+        raise HTTPException(status_code=HTTP_500_INTERNAL_SERVER_ERROR, detail=str(exc))
+    except Exception as exc:
+        raise HTTPException(status_code=HTTP_400_BAD_REQUEST, detail=str(exc))
+
+
+@router.get(
+    "/in-radius/", dependencies=[Depends(admit("geo"))], response_model=List[OrganizationRead], status_code=HTTP_200_OK
+)
 async def get_organizations_in_radius_handler(
     organization_service: Annotated[OrganizationService, Depends(get_organization_service)],
     latitude: float = Query(ge=-90, le=90),
@@ -124,7 +255,29 @@ async def get_organizations_in_radius_handler(
         raise HTTPException(status_code=HTTP_400_BAD_REQUEST, detail=str(exc))
 
 
-@router.get("/in-bbox/", response_model=List[OrganizationRead], status_code=HTTP_200_OK)
+@router.post(
+    "/in-radius/batch/", dependencies=[Depends(admit("geo"))], response_model=BatchRadiusRead, status_code=HTTP_200_OK
+)
+async def get_organizations_in_radius_batch_handler(
+    organization_service: Annotated[OrganizationService, Depends(get_organization_service)],
+    request: BatchRadiusRequest,
+):
+    """
+    Answers up to 500 radius queries at once. Results list organization ids per query id,
+    every found organization is included once
+    """
+    try:
+        return await organization_service.get_organizations_in_radius_batch(request)
+
+    except StorageInternalException as exc:
+        raise HTTPException(status_code=HTTP_500_INTERNAL_SERVER_ERROR, detail=str(exc))
+    except Exception as exc:
+        raise HTTPException(status_code=HTTP_400_BAD_REQUEST, detail=str(exc))
+
+
+@router.get(
+    "/in-bbox/", dependencies=[Depends(admit("geo"))], response_model=List[OrganizationRead], status_code=HTTP_200_OK
+)
 async def get_organizations_in_bbox_handler(
     organization_service: Annotated[OrganizationService, Depends(get_organization_service)],
     lat_min: float = Query(ge=-90, le=90),
@@ -148,7 +301,12 @@ async def get_organizations_in_bbox_handler(
         raise HTTPException(status_code=HTTP_400_BAD_REQUEST, detail=str(exc))
 
 
-@router.get("/by-nested-activity/", response_model=List[OrganizationRead], status_code=HTTP_200_OK)
+@router.get(
+    "/by-nested-activity/",
+    dependencies=[Depends(admit("list"))],
+    response_model=List[OrganizationRead],
+    status_code=HTTP_200_OK,
+)
 async def get_organizations_by_nested_activity_id_handler(
     organization_service: Annotated[OrganizationService, Depends(get_organization_service)],
     activity_id: int = Query(ge=1),
@@ -0,0 +1,32 @@
+from typing import (
+    Annotated,
+    List,
+)
+
+from dependencies.dependencies import get_autocomplete
+from domain.schemas import SuggestionRead
+from fastapi import (
+    APIRouter,
+    Depends,
+    Query,
+    Security,
+)
+from security.authorization import verify_api_key
+from services.autocomplete import (
+    Autocomplete,
+    SuggestionKind,
+)
+from starlette.status import HTTP_200_OK
+
+router = APIRouter(prefix="/suggest", tags=["suggest"], dependencies=[Security(verify_api_key)])
+
+
+@router.get("/", response_model=List[SuggestionRead], status_code=HTTP_200_OK)
+async def suggest_handler(
+    autocomplete: Annotated[Autocomplete, Depends(get_autocomplete)],
+    q: str = Query(min_length=1, max_length=255, description="Typed text"),
+    kind: SuggestionKind | None = Query(None, description="Restricts suggestions to organizations or activities"),
+    limit: int = Query(10, ge=1, le=20),
+):
+    """Returns organization and activity names completing the typed text, most popular first"""
+    return [suggestion._asdict() for suggestion in autocomplete.suggest(q, limit, kind)]
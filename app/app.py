@@ -1,37 +1,213 @@
+import asyncio
 import logging
-from contextlib import asynccontextmanager
+from contextlib import (
+    asynccontextmanager,
+    suppress,
+)
+from functools import partial
 
+from api.health import router as health_router
+from api.metrics import router as metrics_router
+from api.v1.buildings import router as building_router
+from api.v1.export import router as export_router
 from api.v1.organisations import router as organisation_router
+from api.v1.suggestions import router as suggestion_router
 from config import settings
 from database import sessionmanager
+from dependencies.dependencies import get_storage
 from fastapi import FastAPI
+from observability.instrumentation import instrument_engine
+from observability.log_pipeline import setup_logging
+from observability.middleware import (
+    MetricsMiddleware,
+    RequestIdMiddleware,
+    RequestStatsMiddleware,
+)
+from observability.slow_queries import SlowQueryLog
+from repository.autocomplete_repo import (
+    open_postgres_autocomplete_source,
+    open_sharded_autocomplete_source,
+)
+from repository.sharding import shard_map
+from repository.snapshot import snapshot_manager
+from repository.snapshot_file import SnapshotFile
+from security.authorization import limiter
+from services.autocomplete import autocomplete
+from services.change_listener import change_listener
+from services.facet_cache import facet_cache
+from services.invalidation import (
+    subscribe_autocomplete,
+    subscribe_facets,
+    subscribe_snapshot,
+    subscribe_snapshot_file,
+)
+from services.readiness import readiness
+from services.warmup import warm_up_and_mark_ready
+from services.worker_state import worker_state
 
 
 def init_app() -> FastAPI:
     app = FastAPI(lifespan=lifespan)
+    app.include_router(health_router)
     app.include_router(organisation_router)
+    app.include_router(building_router)
+    app.include_router(export_router)
+    app.include_router(suggestion_router)
+
+    if settings.metrics_enabled:
+        app.include_router(metrics_router)
+        app.add_middleware(MetricsMiddleware)
+    # statement counts per request feed the metrics, the slow query log and the N+1 check
+    app.add_middleware(RequestStatsMiddleware, repeated_statement_threshold=settings.repeated_statement_threshold)
+
+    app.add_middleware(RequestIdMiddleware)
 
     return app
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    logging.basicConfig(
-        level=logging.INFO,
-        format=settings.log_format,
-        datefmt=settings.log_date_format,
-        filename=settings.log_path,
-        filemode="a",
+    log_listener = setup_logging(
+        settings.log_level,
+        settings.log_path,
+        json_format=settings.log_json,
+        text_format=settings.log_format,
+        date_format=settings.log_date_format,
+        queue_size=settings.log_queue_size,
+    )
+
+    # opened by every worker, not at import, so a preloading master never holds the mapping
+    if settings.rate_limit_shared_path:
+        limiter.open_shared(settings.rate_limit_shared_path)
+
+    worker_state_task = None
+    if settings.worker_state_dir:
+        worker_state.open(settings.worker_state_dir, settings.web_concurrency)
+        worker_state_task = asyncio.create_task(worker_state.publish_periodically())
+
+    sessionmanager.init(
+        settings.postgres_url,
+        pool_size=settings.db_pool_size,
+        max_overflow=settings.db_max_overflow,
+        pool_timeout=settings.db_pool_timeout,
+        connect_args={"prepared_statement_cache_size": settings.db_prepared_statement_cache_size},
     )
+    instrument_engine(sessionmanager.engine, metrics=settings.metrics_enabled)
+
+    if settings.storage_backend == "sharded":
+        shard_map.init(
+            pool_size=settings.db_pool_size,
+            max_overflow=settings.db_max_overflow,
+            pool_timeout=settings.db_pool_timeout,
+            connect_args={"prepared_statement_cache_size": settings.db_prepared_statement_cache_size},
+        )
+        for shard in shard_map.shards:
+            instrument_engine(shard.sessionmanager.engine, shard.name, settings.metrics_enabled)
+        logging.info("Shard connections configured: %s", ", ".join(shard.name for shard in shard_map.shards))
 
-    sessionmanager.init(settings.postgres_url)
+    slow_query_log = None
+    if settings.slow_query_threshold > 0:
+        slow_query_log = SlowQueryLog(
+            settings.postgres_dsn, settings.slow_query_threshold, settings.slow_query_explain_sample_rate
+        )
+        slow_query_log.install(sessionmanager.engine)
+        if settings.storage_backend == "sharded":
+            for shard in shard_map.shards:
+                slow_query_log.install(shard.sessionmanager.engine, shard.dsn)
     logging.info("Database connection established.")
 
+    # in sharded mode suggestions carry the shard ids the storage routes by, and changes are made in the shards
+    if settings.storage_backend == "sharded":
+        open_autocomplete_source = partial(open_sharded_autocomplete_source, shard_map)
+        listen_dsns = [shard.dsn for shard in shard_map.shards]
+        warmup_sessionmanager = shard_map.shards[0].sessionmanager
+    else:
+        open_autocomplete_source = partial(open_postgres_autocomplete_source, sessionmanager)
+        listen_dsns = [settings.postgres_dsn]
+        warmup_sessionmanager = sessionmanager
+
+    try:
+        async with open_autocomplete_source() as source:
+            await autocomplete.load(source)
+        logging.info(
+            "Autocomplete index built: %s organizations, %s activities.",
+            len(autocomplete.organizations),
+            len(autocomplete.activities),
+        )
+    except Exception as exc:
+        logging.error("Error while building autocomplete index - %s", exc)
+
+    snapshot_reload_task = None
+    if settings.storage_backend == "snapshot":
+        await snapshot_manager.reload(sessionmanager)
+        snapshot_reload = partial(snapshot_manager.reload, sessionmanager)
+    elif settings.storage_backend == "mmap":
+        snapshot_file = SnapshotFile(settings.snapshot_path)
+        await snapshot_file.open_if_changed(snapshot_manager)
+        snapshot_reload = partial(snapshot_file.open_if_changed, snapshot_manager)
+
+    if settings.storage_backend in ("snapshot", "mmap") and settings.snapshot_reload_interval > 0:
+        snapshot_reload_task = asyncio.create_task(
+            snapshot_manager.reload_periodically(settings.snapshot_reload_interval, snapshot_reload)
+        )
+
+    if settings.change_listener_enabled:
+        subscribe_autocomplete(change_listener, autocomplete, open_autocomplete_source)
+        subscribe_facets(change_listener, facet_cache)
+        if settings.storage_backend == "snapshot":
+            subscribe_snapshot(change_listener, snapshot_manager, sessionmanager)
+        elif settings.storage_backend == "mmap":
+            subscribe_snapshot_file(change_listener, snapshot_file, snapshot_manager)
+        await change_listener.start(*listen_dsns)
+
+    if settings.warmup_enabled:
+        warmup_task = asyncio.create_task(
+            warm_up_and_mark_ready(
+                readiness,
+                settings.warmup_timeout,
+                warmup_sessionmanager,
+                get_storage,
+                autocomplete,
+                settings.db_pool_size if settings.storage_backend == "postgres" else 0,
+            )
+        )
+    else:
+        warmup_task = None
+        readiness.set_ready()
+
     yield
 
+    readiness.set_not_ready("shutting down")
+    if worker_state_task:
+        worker_state_task.cancel()
+        with suppress(asyncio.CancelledError):
+            await worker_state_task
+        worker_state.publish()
+    if warmup_task:
+        warmup_task.cancel()
+        with suppress(asyncio.CancelledError):
+            await warmup_task
+
+    if settings.change_listener_enabled:
+        await change_listener.stop()
+
+    if snapshot_reload_task:
+        snapshot_reload_task.cancel()
+        with suppress(asyncio.CancelledError):
+            await snapshot_reload_task
+
+    if slow_query_log:
+        await slow_query_log.close()
+
+    if settings.storage_backend == "sharded":
+        await shard_map.close()
+
     if sessionmanager.engine:
         await sessionmanager.close()
         logging.info("Database connection closed.")
 
+    limiter.close()
+    log_listener.stop()
+
 
 app = init_app()
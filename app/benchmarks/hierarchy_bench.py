@@ -0,0 +1,192 @@
+"""
+Activity subtree reads from the closure table against the materialized paths (ACTIVITY_HIERARCHY)
+
+Every tree shape is inserted as synthetic activities with their closure rows and paths inside a savepoint that is
+rolled back afterwards, so the database is left as it was. For the root and a node halfway down the tree the subtree
+is counted through repository.queries.activity_pairs, limited to NESTED_DEPTH levels as the API does and unlimited.
+The size the tree adds to the closure table and to the path index is reported next to the timings.
+
+Usage (from the app directory, against a migrated database):
+    python -m benchmarks.hierarchy_bench
+    python -m benchmarks.hierarchy_bench --shape deep:14:2 --shape wide:2:200 --iterations 500
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+from dataclasses import dataclass
+
+from config import settings
+from database import sessionmanager
+from domain.models import (
+    Activity,
+    ActivityClosure,
+)
+from repository.bulk_ingest import MAX_HIERARCHY_DEPTH
+from repository.constants import NESTED_DEPTH
+from repository.queries import activity_pairs
+from sqlalchemy import (
+    Integer,
+    bindparam,
+    func,
+    insert,
+    select,
+    text,
+)
+from sqlalchemy.ext.asyncio import AsyncSession
+
+HIERARCHIES = ("closure", "path")
+
+SIZES = """
+SELECT pg_total_relation_size('activities_closures'), pg_relation_size('ix_activities_path')
+"""
+
+
+@dataclass
+class Shape:
+    name: str
+    depth: int
+    fanout: int
+
+
+@dataclass
+class Tree:
+    activities: list[dict]
+    closures: list[dict]
+    # activity ids to read the subtree of: the root and the first node halfway down
+    roots: dict[str, int]
+
+
+def parse_shape(value: str) -> Shape:
+    name, depth, fanout = value.split(":")
+    if not 0 < int(depth) <= MAX_HIERARCHY_DEPTH:
+        raise argparse.ArgumentTypeError(f"Tree depth must be between 1 and {MAX_HIERARCHY_DEPTH}")
+
+    return Shape(name, int(depth), int(fanout))
+
+
+def build_tree(shape: Shape, first_id: int) -> Tree:
+    """
+    Builds a complete tree breadth first
+    Args:
+        shape: Levels below the root and children per activity
+        first_id: Id of the root, the others follow
+
+    Returns:
+        Tree: Activity rows with their paths and depths, closure rows including the self pairs
+    """
+    activities, closures = [], []
+    ancestors: dict[int, list[int]] = {}
+    level, next_id = [first_id], first_id + 1
+    roots = {"root": first_id}
+    ancestors[first_id] = []
+
+    for depth in range(shape.depth + 1):
+        if depth == shape.depth // 2 and depth:
+            roots["middle"] = level[0]
+        children = []
+        for id_ in level:
+            lineage = ancestors.pop(id_) + [id_]
+            activities.append(
+                {"id": id_, "name": f"{shape.name} {id_}", "path": "".join(f"{a}." for a in lineage), "depth": depth}
+            )
+            closures.extend({"ancestor_id": a, "descendant_id": id_, "depth": depth - i} for i, a in enumerate(lineage))
+            if depth < shape.depth:
+                for _ in range(shape.fanout):
+                    ancestors[next_id] = lineage
+                    children.append(next_id)
+                    next_id += 1
+        level = children
+
+    return Tree(activities, closures, roots)
+
+
+async def timed_count(session: AsyncSession, hierarchy: str, max_depth: int, activity_id: int, args) -> tuple:
+    pairs = activity_pairs(hierarchy, max_depth)
+    query = select(func.count()).select_from(pairs).where(pairs.c.ancestor_id == bindparam("activity_id", Integer))
+
+    samples, rows = [], 0
+    for _ in range(args.warmup + args.iterations):
+        started = time.perf_counter()
+        rows = (await session.execute(query, {"activity_id": activity_id})).scalar()
+        samples.append(time.perf_counter() - started)
+
+    return rows, statistics.median(samples[args.warmup :]) * 1e3
+
+
+async def run_shape(session: AsyncSession, shape: Shape, args) -> list[tuple]:
+    first_id = (await session.execute(select(func.coalesce(func.max(Activity.id), 0)))).scalar() + 1
+    tree = build_tree(shape, first_id)
+    lines = []
+
+    savepoint = await session.begin_nested()
+    try:
+        closure_before, path_before = (await session.execute(text(SIZES))).one()
+        for start in range(0, len(tree.activities), args.insert_batch):
+            await session.execute(insert(Activity), tree.activities[start : start + args.insert_batch])
+        for start in range(0, len(tree.closures), args.insert_batch):
+            await session.execute(insert(ActivityClosure), tree.closures[start : start + args.insert_batch])
+        await session.execute(text("ANALYZE activities"))
+        await session.execute(text("ANALYZE activities_closures"))
+        closure_after, path_after = (await session.execute(text(SIZES))).one()
+
+        print(
+            f"{shape.name}: depth {shape.depth}, fanout {shape.fanout}, {len(tree.activities)} activities, "
+            f"{len(tree.closures)} closure rows (+{(closure_after - closure_before) // 1024} kB), "
+            f"path index +{(path_after - path_before) // 1024} kB"
+        )
+
+        for node, activity_id in tree.roots.items():
+            for max_depth in (NESTED_DEPTH, MAX_HIERARCHY_DEPTH):
+                counts = {}
+                for hierarchy in HIERARCHIES:
+                    counts[hierarchy] = await timed_count(session, hierarchy, max_depth, activity_id, args)
+                if counts["closure"][0] != counts["path"][0]:
+                    raise SystemExit(f"{shape.name}: subtree of {activity_id} differs between the hierarchies")
+                lines.append(
+                    (shape.name, node, max_depth, counts["closure"][0], counts["closure"][1], counts["path"][1])
+                )
+    finally:
+        await savepoint.rollback()
+
+    return lines
+
+
+async def run(args: argparse.Namespace):
+    sessionmanager.init(settings.postgres_url)
+    lines = []
+    try:
+        async with sessionmanager.session() as session:
+            await session.execute(text("SET LOCAL app.suppress_change_notify = 'on'"))
+            for shape in args.shape:
+                lines.extend(await run_shape(session, shape, args))
+            await session.rollback()
+    finally:
+        await sessionmanager.close()
+
+    print(f"\n{'shape':<10}{'node':<8}{'levels':>7}{'rows':>9}{'closure':>10}{'path':>10}   (median, ms)")
+    for name, node, max_depth, rows, closure_ms, path_ms in lines:
+        levels = max_depth if max_depth == NESTED_DEPTH else "all"
+        print(f"{name:<10}{node:<8}{levels:>7}{rows:>9}{closure_ms:>10.3f}{path_ms:>10.3f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Activity subtree reads: closure table against materialized paths")
+    parser.add_argument(
+        "--shape",
+        type=parse_shape,
+        action="append",
+        help="name:depth:fanout of a synthetic tree, repeatable (default deep:12:2, wide:2:90, chain:60:1)",
+    )
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--warmup", type=int, default=20)
+    parser.add_argument("--insert-batch", type=int, default=5000)
+    args = parser.parse_args()
+    args.shape = args.shape or [parse_shape(value) for value in ("deep:12:2", "wide:2:90", "chain:60:1")]
+
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
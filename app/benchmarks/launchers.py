@@ -0,0 +1,136 @@
+"""
+Throughput of the development launcher against the production one
+
+Each launcher is started on its own port, warmed up and driven by the open-loop load generator at increasing
+arrival rates. The report shows achieved throughput, error rate and tail latency per rate, the rate where the
+error rate or p99 crosses its limit is the capacity of the launcher.
+
+Needs a migrated and populated database (see tools.generate_dataset). Launchers are started from the repository
+root, options not listed below are passed to the load generator.
+
+Usage (from the app directory):
+    python -m benchmarks.launchers --rates 200,500,1000,2000 --duration 20 --connections 128
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import signal
+import socket
+import subprocess
+import time
+
+from benchmarks.load_test import (
+    build_parser,
+    run,
+)
+
+REPOSITORY_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+LAUNCHERS = {
+    "current": [
+        "uvicorn",
+        "app:app",
+        "--app-dir",
+        "./app",
+        "--host",
+        "127.0.0.1",
+        "--port",
+        "{port}",
+        "--workers",
+        "1",
+        "--reload",
+    ],
+    "production": ["./scripts/serve.sh"],
+}
+
+
+def wait_for_port(port: int, timeout: float):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        with socket.socket() as sock:
+            if sock.connect_ex(("127.0.0.1", port)) == 0:
+                return
+        time.sleep(0.2)
+
+    raise TimeoutError(f"Nothing listens on port {port} after {timeout}s")
+
+
+def summarize(report: dict) -> dict:
+    endpoints = report["endpoints"].values()
+    requests = sum(endpoint["requests"] for endpoint in endpoints)
+
+    return {
+        "rate": report["rate"],
+        "rps": sum(endpoint["rps"] for endpoint in endpoints),
+        "error_rate": sum(endpoint["error_rate"] * endpoint["requests"] for endpoint in endpoints) / max(requests, 1),
+        "p99_ms": max(endpoint["p99_ms"] for endpoint in endpoints),
+    }
+
+
+def benchmark_launcher(name: str, args: argparse.Namespace, load_args: argparse.Namespace) -> list[dict]:
+    command = [part.format(port=args.port) for part in LAUNCHERS[name]]
+    env = dict(os.environ, HOST="127.0.0.1", PORT=str(args.port))
+    if args.workers:
+        env["WEB_CONCURRENCY"] = str(args.workers)
+
+    process = subprocess.Popen(
+        command, cwd=REPOSITORY_ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        wait_for_port(args.port, args.startup_timeout)
+        load_args.url = f"http://127.0.0.1:{args.port}"
+
+        # warm-up lets every worker open its pool and fill its caches before anything is measured
+        load_args.rate, load_args.duration = args.rates[0], args.warmup
+        asyncio.run(run(load_args))
+
+        results = []
+        for rate in args.rates:
+            print(f"\n== {name} at {rate:.0f} rps")
+            load_args.rate, load_args.duration = rate, args.duration
+            results.append(summarize(asyncio.run(run(load_args))))
+
+        return results
+    finally:
+        process.send_signal(signal.SIGTERM)
+        try:
+            process.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compares throughput of the application launchers")
+    parser.add_argument("--launchers", default="current,production", help=f"Any of {', '.join(LAUNCHERS)}")
+    parser.add_argument("--rates", default="200,500,1000,2000", help="Arrival rates to step through, rps")
+    parser.add_argument("--duration", type=float, default=20, help="Seconds per rate")
+    parser.add_argument("--warmup", type=float, default=5, help="Seconds of warm-up before measuring")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--workers", type=int, help="Worker count of the production launcher, defaults to CPUs")
+    parser.add_argument("--startup-timeout", type=float, default=60)
+    parser.add_argument("--output", help="Write the comparison to this JSON file")
+    args, load_argv = parser.parse_known_args()
+    args.rates = [float(rate) for rate in args.rates.split(",")]
+
+    # anything else goes to the load generator, e.g. --connections or --mix
+    load_args = build_parser().parse_args(load_argv)
+
+    comparison = {name: benchmark_launcher(name, args, load_args) for name in args.launchers.split(",")}
+
+    print(f"\n{'launcher':<12}{'rate':>8}{'rps':>10}{'errors':>9}{'p99 ms':>10}")
+    for name, results in comparison.items():
+        for result in results:
+            print(
+                f"{name:<12}{result['rate']:>8.0f}{result['rps']:>10.1f}"
+                f"{result['error_rate']:>9.2%}{result['p99_ms']:>10.1f}"
+            )
+
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(comparison, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,323 @@
+"""
+Open-loop HTTP load generator for the organization API
+
+Requests are started at a fixed arrival rate whatever the response times are, and latency is measured from the
+scheduled start, so time spent waiting for a free connection counts (no coordinated omission). Scenarios are picked
+from a weighted mix, parameters follow skewed distributions: hot buildings and activities, random points around city
+centers for geo queries, geometric page numbers with a long tail of deep pages.
+
+Uses a minimal keep-alive HTTP/1.1 client on asyncio streams, no extra dependencies.
+
+Usage (from the app directory):
+    python -m benchmarks.load_test --url http://127.0.0.1:8000 --rate 500 --duration 60 --connections 64
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import time
+from dataclasses import (
+    dataclass,
+    field,
+)
+from typing import Callable
+from urllib.parse import (
+    urlencode,
+    urlsplit,
+)
+
+from config import settings
+from tools.generate_dataset import (
+    CITIES,
+    NAME_WORDS,
+    pick,
+    zipf_cum_weights,
+)
+
+DEFAULT_MIX = "by-building=20,by-activity=15,by-nested-activity=10,by-id=20,in-radius=10,in-bbox=10,search=10,suggest=5"
+# shed load (rate limit, admission control) is a failure of the run like a server error, 404 is a regular
+# "nothing found" answer of the API
+SHED_STATUSES = frozenset({429, 503})
+
+
+class HttpConnection:
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.reader = reader
+        self.writer = writer
+
+    async def get(self, request: bytes) -> tuple[int, bool]:
+        """Sends a prepared GET request, returns the status and whether the connection can be reused"""
+        self.writer.write(request)
+        status_line = await self.reader.readline()
+        if not status_line:
+            raise ConnectionError("Connection closed by server")
+        status = int(status_line.split(b" ", 2)[1])
+
+        headers = {}
+        while (line := await self.reader.readline()) not in (b"\r\n", b"\n", b""):
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip().lower()
+
+        if headers.get("transfer-encoding") == "chunked":
+            while size := int((await self.reader.readline()).split(b";")[0], 16):
+                await self.reader.readexactly(size + 2)
+            await self.reader.readline()
+        else:
+            await self.reader.readexactly(int(headers.get("content-length", 0)))
+
+        return status, headers.get("connection") != "close"
+
+    def close(self):
+        self.writer.close()
+
+
+class HttpConnectionPool:
+    def __init__(self, host: str, port: int, size: int):
+        self.host = host
+        self.port = port
+        self._idle: asyncio.Queue[HttpConnection | None] = asyncio.Queue()
+        for _ in range(size):
+            self._idle.put_nowait(None)
+
+    async def get(self, request: bytes) -> int:
+        connection = await self._idle.get()
+        try:
+            if connection is None:
+                connection = HttpConnection(*await asyncio.open_connection(self.host, self.port))
+            status, reusable = await connection.get(request)
+            if not reusable:
+                connection.close()
+                connection = None
+
+            return status
+
+        except Exception:
+            if connection is not None:
+                connection.close()
+            connection = None
+            raise
+
+        finally:
+            self._idle.put_nowait(connection)
+
+    async def close(self):
+        while not self._idle.empty():
+            connection = self._idle.get_nowait()
+            if connection is not None:
+                connection.close()
+
+
+@dataclass
+class EndpointStats:
+    # latencies of successful responses only, fast rejections would otherwise flatter the percentiles
+    latencies: list[float] = field(default_factory=list)
+    statuses: dict[int, int] = field(default_factory=dict)
+    # failed requests by status code, "connection" when no response arrived
+    errors: dict[str, int] = field(default_factory=dict)
+    dropped: int = 0
+
+    @property
+    def requests(self) -> int:
+        return sum(self.statuses.values()) + self.errors.get("connection", 0)
+
+    def record(self, status: int | None, latency: float):
+        if status is not None:
+            self.statuses[status] = self.statuses.get(status, 0) + 1
+        if status is None or status >= 500 or status in SHED_STATUSES:
+            key = str(status) if status is not None else "connection"
+            self.errors[key] = self.errors.get(key, 0) + 1
+        else:
+            self.latencies.append(latency)
+
+    def percentile(self, share: float) -> float:
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * share))] * 1000 if ordered else 0.0
+
+
+class ParameterModel:
+    """Realistic request parameters drawn from skewed distributions"""
+
+    def __init__(self, args: argparse.Namespace):
+        self.rng = random.Random(args.seed)
+        self.args = args
+        self.building_weights = zipf_cum_weights(args.buildings, 1.0)
+        self.activity_weights = zipf_cum_weights(args.activities, 1.0)
+        self.city_weights = zipf_cum_weights(len(CITIES), 1.0)
+
+    def page(self) -> int:
+        page = 1
+        while page < self.args.max_page and self.rng.random() < self.args.deep_page_share:
+            page += 1 + int(self.rng.expovariate(0.2))
+
+        return min(page, self.args.max_page)
+
+    def point(self) -> tuple[float, float]:
+        _, latitude, longitude = CITIES[pick(self.rng, self.city_weights)]
+        return round(self.rng.gauss(latitude, 0.08), 5), round(self.rng.gauss(longitude, 0.14), 5)
+
+    def scenarios(self) -> dict[str, Callable[[], str]]:
+        rng = self.rng
+
+        def bbox() -> str:
+            latitude, longitude = self.point()
+            half = rng.uniform(0.005, 0.05)
+            return "/organizations/in-bbox/?" + urlencode(
+                {
+                    "lat_min": latitude - half,
+                    "lon_min": longitude - half * 1.7,
+                    "lat_max": latitude + half,
+                    "lon_max": longitude + half * 1.7,
+                    "page": self.page(),
+                }
+            )
+
+        def radius() -> str:
+            latitude, longitude = self.point()
+            return "/organizations/in-radius/?" + urlencode(
+                {"latitude": latitude, "longitude": longitude, "radius": rng.uniform(0.3, 5), "page": self.page()}
+            )
+
+        return {
+            "by-building": lambda: "/organizations/by-building/?"
+            + urlencode({"building_id": pick(rng, self.building_weights) + 1, "page": self.page()}),
+            "by-activity": lambda: "/organizations/by-activity/?"
+            + urlencode({"activity_id": pick(rng, self.activity_weights) + 1, "page": self.page()}),
+            "by-nested-activity": lambda: "/organizations/by-nested-activity/?"
+            + urlencode({"activity_id": pick(rng, self.activity_weights) + 1, "page": self.page()}),
+            "by-id": lambda: f"/organizations/{rng.randint(1, self.args.organizations)}",
+            "in-radius": radius,
+            "in-bbox": bbox,
+            "search": lambda: "/organizations/search/?" + urlencode({"name": rng.choice(NAME_WORDS)}),
+            "suggest": lambda: "/suggest/?" + urlencode({"q": rng.choice(NAME_WORDS)[: rng.randint(1, 4)]}),
+        }
+
+
+def parse_mix(mix: str, available: dict) -> tuple[list[str], list[float]]:
+    names, weights = [], []
+    for item in mix.split(","):
+        name, _, weight = item.partition("=")
+        if name.strip() not in available:
+            raise ValueError(f"Unknown scenario {name}, available: {', '.join(available)}")
+        names.append(name.strip())
+        weights.append(float(weight or 1))
+
+    return names, weights
+
+
+async def run(args: argparse.Namespace) -> dict:
+    url = urlsplit(args.url)
+    pool = HttpConnectionPool(url.hostname, url.port or 80, args.connections)
+    model = ParameterModel(args)
+    scenarios = model.scenarios()
+    names, weights = parse_mix(args.mix, scenarios)
+    stats = {name: EndpointStats() for name in names}
+    header_lines = f"Host: {url.netloc}\r\n{settings.api_key_header}: {args.api_key}\r\nConnection: keep-alive\r\n"
+
+    in_flight = 0
+    tasks = set()
+
+    async def fire(name: str, path: str, scheduled: float):
+        nonlocal in_flight
+        in_flight += 1
+        status = None
+        try:
+            status = await pool.get(f"GET {path} HTTP/1.1\r\n{header_lines}\r\n".encode())
+        except Exception:
+            pass
+        finally:
+            stats[name].record(status, time.perf_counter() - scheduled)
+            in_flight -= 1
+
+    total = int(args.rate * args.duration)
+    started = time.perf_counter()
+    for number in range(total):
+        scheduled = started + number / args.rate
+        delay = scheduled - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+        name = model.rng.choices(names, weights)[0]
+        if in_flight >= args.max_in_flight:
+            stats[name].dropped += 1
+            continue
+
+        task = asyncio.create_task(fire(name, scenarios[name](), scheduled))
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+
+    if tasks:
+        await asyncio.wait(tasks)
+    elapsed = time.perf_counter() - started
+    await pool.close()
+
+    dropped = sum(endpoint.dropped for endpoint in stats.values())
+    report = {
+        "rate": args.rate,
+        "duration_s": elapsed,
+        "dropped_by_client": dropped,
+        "endpoints": {
+            name: {
+                "requests": endpoint.requests,
+                "dropped_by_client": endpoint.dropped,
+                # successful responses per second
+                "rps": len(endpoint.latencies) / elapsed,
+                "error_rate": sum(endpoint.errors.values()) / max(endpoint.requests, 1),
+                "errors": endpoint.errors,
+                "statuses": endpoint.statuses,
+                "p50_ms": endpoint.percentile(0.5),
+                "p95_ms": endpoint.percentile(0.95),
+                "p99_ms": endpoint.percentile(0.99),
+                "p999_ms": endpoint.percentile(0.999),
+            }
+            for name, endpoint in stats.items()
+        },
+    }
+
+    print(f"target {args.rate:.0f} rps for {elapsed:.1f}s, {dropped} requests dropped by the client")
+    print(
+        f"{'endpoint':<20}{'rps':>9}{'errors':>9}{'dropped':>9}{'p50':>10}{'p95':>10}{'p99':>10}{'p999':>10}   (ms)"
+        "   errors by status"
+    )
+    for name, endpoint in report["endpoints"].items():
+        errors = " ".join(f"{status}={count}" for status, count in sorted(endpoint["errors"].items()))
+        print(
+            f"{name:<20}{endpoint['rps']:>9.1f}{endpoint['error_rate']:>9.2%}{endpoint['dropped_by_client']:>9}"
+            f"{endpoint['p50_ms']:>10.1f}{endpoint['p95_ms']:>10.1f}{endpoint['p99_ms']:>10.1f}"
+            f"{endpoint['p999_ms']:>10.1f}   {errors}"
+        )
+
+    return report
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Open-loop load test of the organization API")
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--api-key", default=settings.api_key)
+    parser.add_argument("--rate", type=float, default=200, help="Arrival rate, requests per second")
+    parser.add_argument("--duration", type=float, default=30, help="Seconds")
+    parser.add_argument("--connections", type=int, default=64, help="Keep-alive connections")
+    parser.add_argument("--max-in-flight", type=int, default=10_000, help="Client-side safety cap")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="Weighted scenarios, name=weight,...")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--buildings", type=int, default=100_000, help="Building ids are drawn from 1..N")
+    parser.add_argument("--activities", type=int, default=168, help="Activity ids are drawn from 1..N")
+    parser.add_argument("--organizations", type=int, default=1_000_000, help="Organization ids are drawn from 1..N")
+    parser.add_argument("--max-page", type=int, default=200)
+    parser.add_argument("--deep-page-share", type=float, default=0.3, help="Chance to go past the next page")
+    parser.add_argument("--output", help="Write the report to this JSON file")
+
+    return parser
+
+
+def main():
+    args = build_parser().parse_args()
+
+    report = asyncio.run(run(args))
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(report, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""
+Per-call Python overhead of the fixed PostgresStorage queries: statements rebuilt on every call against the
+precompiled ones of repository.statements
+
+Without a database the benchmark times what happens before the compiled cache lookup: building the select with its
+loader options and generating its cache key (rebuilt), or binding the parameters of the prebuilt statement whose cache
+key is memoized (precompiled). With --database it times session.execute plus fetching the ORM objects against a seeded
+database and subtracts the time spent in the driver, so both variants run the same SQL.
+
+Usage (from the app directory):
+    python -m benchmarks.statement_overhead
+    python -m benchmarks.statement_overhead --database --iterations 500
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+from typing import Callable
+
+from benchmarks.storage_bench import (
+    DriverTimer,
+    get_cases,
+)
+from config import settings
+from database import sessionmanager
+from repository.samples import get_sample_parameters
+from repository.statements import STATEMENTS
+from sqlalchemy import event
+
+# stands in for sampled parameters when no database is used
+OFFLINE_PARAMETERS = {
+    "building_id": 1,
+    "activity_id": 1,
+    "root_activity_id": 1,
+    "name": "Рога и копыта",
+    "latitude": 55.75,
+    "longitude": 37.62,
+}
+
+
+def median_us(measure: Callable[[], float], iterations: int, warmup: int) -> float:
+    samples = [measure() for _ in range(warmup + iterations)][warmup:]
+
+    return statistics.median(samples) * 1e6
+
+
+def offline(args: argparse.Namespace) -> dict[str, tuple[float, float]]:
+    results = {}
+    for case in get_cases(OFFLINE_PARAMETERS, args.page, args.limit):
+        factory = STATEMENTS[case.name][1]
+
+        def rebuilt() -> float:
+            started = time.perf_counter()
+            _, params = case.build()
+            factory()._generate_cache_key()
+            return time.perf_counter() - started
+
+        def precompiled() -> float:
+            started = time.perf_counter()
+            statement, params = case.build()
+            statement._generate_cache_key()
+            return time.perf_counter() - started
+
+        results[case.name] = (
+            median_us(rebuilt, args.iterations, args.warmup),
+            median_us(precompiled, args.iterations, args.warmup),
+        )
+
+    return results
+
+
+async def online(args: argparse.Namespace) -> dict[str, tuple[float, float]]:
+    sessionmanager.init(
+        settings.postgres_url,
+        connect_args={"prepared_statement_cache_size": settings.db_prepared_statement_cache_size},
+    )
+    timer = DriverTimer()
+    event.listen(sessionmanager.engine.sync_engine, "before_cursor_execute", timer.before)
+    event.listen(sessionmanager.engine.sync_engine, "after_cursor_execute", timer.after)
+
+    results = {}
+    try:
+        async with sessionmanager.session() as session:
+            sample = await get_sample_parameters(session)
+            for case in get_cases(sample, args.page, args.limit):
+                factory = STATEMENTS[case.name][1]
+
+                async def overhead(rebuild: bool) -> float:
+                    timer.total = 0.0
+                    started = time.perf_counter()
+                    statement, params = case.build()
+                    if rebuild:
+                        statement = factory()
+                    result = await session.execute(statement, params)
+                    result.scalars().all()
+                    elapsed = time.perf_counter() - started - timer.total
+                    session.expunge_all()
+                    return elapsed
+
+                medians = []
+                for rebuild in (True, False):
+                    samples = [await overhead(rebuild) for _ in range(args.warmup + args.iterations)][args.warmup :]
+                    medians.append(statistics.median(samples) * 1e6)
+                results[case.name] = (medians[0], medians[1])
+    finally:
+        await sessionmanager.close()
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-call overhead of rebuilt and precompiled storage statements")
+    parser.add_argument("--database", action="store_true", help="Execute against the configured database")
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--warmup", type=int, default=100)
+    parser.add_argument("--page", type=int, default=1)
+    parser.add_argument("--limit", type=int, default=20)
+    args = parser.parse_args()
+
+    results = asyncio.run(online(args)) if args.database else offline(args)
+
+    scope = "session.execute without driver time" if args.database else "statement and cache key"
+    print(f"{'case':<20}{'rebuilt':>12}{'precompiled':>14}{'saved':>10}   (median, us, {scope})")
+    for name, (rebuilt, precompiled) in results.items():
+        print(f"{name:<20}{rebuilt:>12.1f}{precompiled:>14.1f}{rebuilt - precompiled:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,260 @@
+"""
+Microbenchmarks of the storage hot paths
+
+For every PostgresStorage query the time is split into phases:
+    build       binding the parameters of the precompiled statement
+    compile     compiling it for the asyncpg dialect without the statement cache
+    execute     time spent in the database driver (all statements, including selectinload follow-ups)
+    hydrate     the rest of session.execute and fetching ORM objects
+    validate    organizations_adapter / organization_adapter validate_python
+    dump        model_dump of every organization
+    json        json.dumps of the dumped organizations
+
+Results are saved as JSON, a previous result can be passed to flag regressions.
+
+Usage (from the app directory, against a seeded database):
+    python -m benchmarks.storage_bench --output bench.json --compare baseline.json
+"""
+
+import argparse
+import asyncio
+import json
+import platform
+import statistics
+import sys
+import time
+from dataclasses import dataclass
+from typing import Callable
+
+import pydantic
+import sqlalchemy
+from config import settings
+from database import sessionmanager
+from domain.adapters import (
+    organization_adapter,
+    organizations_adapter,
+)
+from domain.normalization import normalize_name
+from repository import statements
+from repository.samples import get_sample_parameters
+from sqlalchemy import (
+    Select,
+    event,
+)
+
+PHASES = ("build", "compile", "execute", "hydrate", "validate", "dump", "json")
+
+
+@dataclass
+class Case:
+    name: str
+    # the precompiled statement with the parameters of this call
+    build: Callable[[], tuple[Select, dict]]
+    single: bool = False
+
+
+class DriverTimer:
+    """Sums the time spent inside cursor.execute"""
+
+    def __init__(self):
+        self.total = 0.0
+        self._started = 0.0
+
+    def before(self, *args):
+        self._started = time.perf_counter()
+
+    def after(self, *args):
+        self.total += time.perf_counter() - self._started
+
+
+def get_cases(params: dict, page: int, limit: int) -> list[Case]:
+    offset = (page - 1) * limit
+    lat, lon = params["latitude"], params["longitude"]
+
+    return [
+        Case(
+            "by-building",
+            lambda: (
+                statements.ORGANIZATIONS_BY_BUILDING_ID,
+                {"building_id": params["building_id"], "offset": offset, "limit": limit},
+            ),
+        ),
+        Case(
+            "by-activity",
+            lambda: (
+                statements.ORGANIZATIONS_BY_ACTIVITY_ID,
+                {"activity_id": params["activity_id"], "offset": offset, "limit": limit},
+            ),
+        ),
+        Case("by-id", lambda: (statements.ORGANIZATION_BY_ID, {"organization_id": 1}), single=True),
+        Case("by-name", lambda: (statements.ORGANIZATION_BY_NAME, {"name": params["name"]}), single=True),
+        Case(
+            "search",
+            lambda: (
+                statements.ORGANIZATIONS_SEARCH_BY_NAME,
+                statements.search_by_name_params(normalize_name(params["name"][:5]), offset, limit),
+            ),
+        ),
+        Case(
+            "in-radius",
+            lambda: (statements.ORGANIZATIONS_IN_RADIUS, statements.in_radius_params(lat, lon, 1.0, offset, limit)),
+        ),
+        Case(
+            "in-bbox",
+            lambda: (
+                statements.ORGANIZATIONS_IN_BBOX,
+                {
+                    "lat_min": lat - 0.01,
+                    "lon_min": lon - 0.01,
+                    "lat_max": lat + 0.01,
+                    "lon_max": lon + 0.01,
+                    "offset": offset,
+                    "limit": limit,
+                },
+            ),
+        ),
+        Case(
+            "by-nested-activity",
+            lambda: (
+                statements.ORGANIZATIONS_BY_NESTED_ACTIVITY_ID,
+                {"activity_id": params["root_activity_id"], "offset": offset, "limit": limit},
+            ),
+        ),
+        Case(
+            "by-nested-activity-path",
+            lambda: (
+                statements.ORGANIZATIONS_BY_NESTED_ACTIVITY_PATH,
+                {"activity_id": params["root_activity_id"], "offset": offset, "limit": limit},
+            ),
+        ),
+    ]
+
+
+async def measure(session, case: Case, timer: DriverTimer, iterations: int, warmup: int) -> dict:
+    dialect = sessionmanager.engine.dialect
+    samples = {phase: [] for phase in PHASES}
+
+    for iteration in range(warmup + iterations):
+        started = time.perf_counter()
+        query, query_params = case.build()
+        built = time.perf_counter()
+        query.compile(dialect=dialect)
+        compiled = time.perf_counter()
+
+        timer.total = 0.0
+        result = await session.execute(query, query_params)
+        orm = result.scalars().first() if case.single else result.scalars().all()
+        executed = time.perf_counter()
+
+        dto = organization_adapter.validate_python(orm) if case.single else organizations_adapter.validate_python(orm)
+        validated = time.perf_counter()
+        dumped = dto.model_dump() if case.single else [organization.model_dump() for organization in dto]
+        dumped_at = time.perf_counter()
+        json.dumps(dumped, ensure_ascii=False)
+        encoded = time.perf_counter()
+
+        session.expunge_all()
+        if iteration < warmup:
+            continue
+
+        samples["build"].append(built - started)
+        samples["compile"].append(compiled - built)
+        samples["execute"].append(timer.total)
+        samples["hydrate"].append(executed - compiled - timer.total)
+        samples["validate"].append(validated - executed)
+        samples["dump"].append(dumped_at - validated)
+        samples["json"].append(encoded - dumped_at)
+
+    return {
+        phase: {
+            "median_us": statistics.median(values) * 1e6,
+            "p95_us": sorted(values)[int(len(values) * 0.95) - 1] * 1e6,
+            "mean_us": statistics.fmean(values) * 1e6,
+        }
+        for phase, values in samples.items()
+    }
+
+
+def compare(results: dict, baseline: dict, threshold: float, noise_floor_us: float) -> list[str]:
+    regressions = []
+    for case, phases in results.items():
+        for phase, stats in phases.items():
+            previous = baseline.get(case, {}).get(phase)
+            if not previous or max(stats["median_us"], previous["median_us"]) < noise_floor_us:
+                continue
+            ratio = stats["median_us"] / previous["median_us"] if previous["median_us"] else float("inf")
+            if ratio > threshold:
+                regressions.append(
+                    f"{case} {phase}: {previous['median_us']:.1f}us -> {stats['median_us']:.1f}us (x{ratio:.2f})"
+                )
+
+    return regressions
+
+
+async def run(args: argparse.Namespace) -> int:
+    sessionmanager.init(
+        settings.postgres_url,
+        connect_args={"prepared_statement_cache_size": settings.db_prepared_statement_cache_size},
+    )
+    timer = DriverTimer()
+    event.listen(sessionmanager.engine.sync_engine, "before_cursor_execute", timer.before)
+    event.listen(sessionmanager.engine.sync_engine, "after_cursor_execute", timer.after)
+
+    results = {}
+    try:
+        async with sessionmanager.session() as session:
+            params = await get_sample_parameters(session)
+            for case in get_cases(params, args.page, args.limit):
+                results[case.name] = await measure(session, case, timer, args.iterations, args.warmup)
+    finally:
+        await sessionmanager.close()
+
+    print(f"{'case':<20}" + "".join(f"{phase:>11}" for phase in PHASES) + "   (median, us)")
+    for case, phases in results.items():
+        print(f"{case:<20}" + "".join(f"{phases[phase]['median_us']:>11.1f}" for phase in PHASES))
+
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(
+                {
+                    "meta": {
+                        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                        "python": platform.python_version(),
+                        "sqlalchemy": sqlalchemy.__version__,
+                        "pydantic": pydantic.VERSION,
+                        "iterations": args.iterations,
+                        "page": args.page,
+                        "limit": args.limit,
+                    },
+                    "results": results,
+                },
+                file,
+                indent=2,
+            )
+
+    if args.compare:
+        with open(args.compare) as file:
+            regressions = compare(results, json.load(file)["results"], args.threshold, args.noise_floor)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        return 1 if regressions else 0
+
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Phase-by-phase microbenchmarks of PostgresStorage queries")
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--warmup", type=int, default=20)
+    parser.add_argument("--page", type=int, default=1)
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--output", help="Write results to this JSON file")
+    parser.add_argument("--compare", help="Baseline JSON file to compare with")
+    parser.add_argument("--threshold", type=float, default=1.25, help="Median slowdown ratio flagged as regression")
+    parser.add_argument("--noise-floor", type=float, default=5.0, help="Ignore phases faster than this, us")
+
+    sys.exit(asyncio.run(run(parser.parse_args())))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,42 @@
-from pydantic import computed_field
+from typing import Literal
+
+from pydantic import (
+    BaseModel,
+    Field,
+    computed_field,
+    model_validator,
+)
 from pydantic_settings import (
     BaseSettings,
     SettingsConfigDict,
 )
 
+# largest id of the int4 primary keys
+MAX_ID = 2**31 - 1
+
+
+class ApiKeySettings(BaseModel):
+    name: str
+    # requests per second, 0 disables the rate limit
+    rate: float = 0
+    # bucket capacity, defaults to one second worth of requests
+    burst: float = 0
+    # requests processed at once by one worker, 0 disables the cap
+    max_concurrency: int = 0
+
+
+class ShardSettings(BaseModel):
+    name: str
+    # postgresql:// DSN of the shard database
+    dsn: str
+    # buildings and organizations of the shard have ids from id_prefix * shard_id_stride to the next prefix
+    id_prefix: int = Field(ge=0)
+    # region holding the shard buildings, a point belongs to the first shard containing it
+    lat_min: float = -90.0
+    lat_max: float = 90.0
+    lon_min: float = -180.0
+    lon_max: float = 180.0
+
 
 class Settings(BaseSettings):
     postgres_host: str
@@ -12,19 +45,111 @@ class Settings(BaseSettings):
     postgres_user: str
     postgres_password: str
 
+    db_pool_size: int = 5
+    db_max_overflow: int = 10
+    db_pool_timeout: float = 10.0
+    # statements asyncpg keeps prepared per connection, covers every query shape with its selectinload variants
+    db_prepared_statement_cache_size: int = 500
+
     api_key_header: str
     api_key: str
+    api_key_rate: float = 0
+    api_key_burst: float = 0
+    api_key_max_concurrency: int = 0
+    # more keys as JSON: {"<key>": {"name": "tenant", "rate": 20, "burst": 40, "max_concurrency": 8}}
+    api_keys: dict[str, ApiKeySettings] = {}
+    # file mapped by all workers of the host to share rate limit buckets, empty keeps them per worker
+    rate_limit_shared_path: str = ""
 
     log_level: str
     log_format: str
     log_date_format: str
     log_path: str
+    # JSON lines with request ids instead of log_format lines
+    log_json: bool = True
+    # records waiting for the writer thread, low levels are sampled when it fills up and dropped when full
+    log_queue_size: int = 10_000
+
+    # "snapshot" serves storage queries from an in-memory copy loaded at startup,
+    # "mmap" from the file written by tools.build_snapshot, shared by all workers through the page cache,
+    # "sharded" from the shard databases, split by region with tools.split_shards
+    storage_backend: Literal["postgres", "snapshot", "mmap", "sharded"] = "postgres"
+    snapshot_reload_interval: int = 0
+    # a change notification rebuilds the in-memory snapshot once changes pause for the debounce (seconds),
+    # a steady stream of changes delays the rebuild by at most the max delay
+    snapshot_change_debounce: float = 1.0
+    snapshot_change_max_delay: float = 10.0
+    snapshot_path: str = "./snapshots/directory.snap"
+    # shards as JSON: [{"name": "moscow", "dsn": "postgresql://...", "id_prefix": 1, "lat_min": 55, ...}]
+    shards: list[ShardSettings] = []
+    shard_id_stride: int = Field(100_000_000, gt=0)
+    # how PostgresStorage reads activity subtrees: "closure" joins activities_closures,
+    # "path" range-scans the materialized activity paths
+    activity_hierarchy: Literal["closure", "path"] = "closure"
+
+    # keeps in-process indexes and snapshots in sync with the database through LISTEN/NOTIFY
+    change_listener_enabled: bool = True
+
+    # activity facet counts per snapped area, also dropped on change notifications
+    facet_cache_ttl: float = 60.0
+    facet_cache_size: int = 1024
+
+    # opens pool connections, runs every query once and fills hot caches before /health/ready reports ready
+    warmup_enabled: bool = True
+    warmup_timeout: float = 60.0
+
+    # /metrics endpoint with request, database and serialization timings
+    metrics_enabled: bool = True
+    # directory the workers of the host publish their metrics and readiness to, so /metrics and /health/ready answer
+    # for all of them, empty keeps both per worker. scripts/serve.sh sets it with web_concurrency, its worker count
+    worker_state_dir: str = ""
+    web_concurrency: int = Field(1, gt=0)
+
+    # bounds in-flight organisation requests per endpoint class derived from the pool size,
+    # excess requests wait up to the queue timeout and are rejected with 503 beyond it
+    admission_enabled: bool = True
+    admission_queue_size: int = 50
+    admission_queue_timeout: float = 0.5
+    # pool checkout wait (seconds) above which expensive endpoint classes get shed
+    admission_pool_wait_target: float = 0.05
+
+    # statements slower than the threshold (seconds, 0 disables) are logged, a sample of them with their plan
+    slow_query_threshold: float = 0.2
+    slow_query_explain_sample_rate: float = 0.1
+    # requests executing one statement this many times are reported as possible N+1, 0 disables
+    repeated_statement_threshold: int = 10
+
+    # /export/organizations/ and tools.export: rows per Arrow batch or Parquet row group, concurrent exports per worker
+    export_batch_size: int = 50_000
+    export_max_concurrency: int = 1
+
+    @model_validator(mode="after")
+    def check_shards(self) -> "Settings":
+        names = [shard.name for shard in self.shards]
+        prefixes = [shard.id_prefix for shard in self.shards]
+        if self.storage_backend == "sharded" and not self.shards:
+            raise ValueError("The sharded storage backend needs shards")
+        if len(set(names)) != len(names):
+            raise ValueError("Shard names must be unique")
+        if len(set(prefixes)) != len(prefixes):
+            raise ValueError("Shard id prefixes must be unique")
+        if prefixes and (max(prefixes) + 1) * self.shard_id_stride - 1 > MAX_ID:
+            raise ValueError(
+                f"Ids of shard id prefix {max(prefixes)} exceed {MAX_ID} with shard id stride {self.shard_id_stride}"
+            )
+
+        return self
 
     @computed_field
     @property
     def postgres_url(self) -> str:
         return f"postgresql+asyncpg://{self.postgres_user}:{self.postgres_password}@{self.postgres_host}:{self.postgres_port}/{self.postgres_db}"
 
+    @computed_field
+    @property
+    def postgres_dsn(self) -> str:
+        return f"postgresql://{self.postgres_user}:{self.postgres_password}@{self.postgres_host}:{self.postgres_port}/{self.postgres_db}"
+
     model_config = SettingsConfigDict(env_file=".env", extra="ignore")
 
 
@@ -29,8 +29,8 @@ class DatabaseSessionManager:
         self.engine: AsyncEngine | None = None
         self.sessionmaker: async_sessionmaker | None = None
 
-    def init(self, dsn: str):
-        self.engine = create_async_engine(dsn)
+    def init(self, dsn: str, **engine_kwargs):
+        self.engine = create_async_engine(dsn, **engine_kwargs)
         self.sessionmaker = async_sessionmaker(autocommit=False, bind=self.engine)
 
     async def close(self):
@@ -0,0 +1,158 @@
+"""
+Admission control in front of database backed endpoints
+
+Every endpoint class has its own bound on in-flight requests and a short FIFO queue. A request is rejected
+with 503 right away when the queue is full or when the expected queueing time exceeds the queue deadline,
+and after waiting for the deadline otherwise. Under connection pool pressure the bounds of expensive classes
+shrink first, so cheap lookups keep being served while geo scans are shed.
+"""
+
+import asyncio
+from collections import deque
+from dataclasses import dataclass
+from math import ceil
+from time import monotonic
+
+from config import settings
+from fastapi import HTTPException
+from observability.load import (
+    Ewma,
+    pool_wait,
+)
+from observability.metrics import (
+    ADMISSION_IN_FLIGHT,
+    ADMISSION_REJECTIONS,
+)
+from starlette.status import HTTP_503_SERVICE_UNAVAILABLE
+
+
+@dataclass(frozen=True)
+class EndpointClass:
+    """
+    name: Label of the class
+    limit: Requests processed at once without pool pressure
+    shed_share: Share of the limit removed under full pool pressure, 0 keeps the class at its limit
+    """
+
+    name: str
+    limit: int
+    shed_share: float
+
+
+class AdmissionController:
+    def __init__(
+        self,
+        endpoint_class: EndpointClass,
+        queue_size: int,
+        queue_timeout: float,
+        pool_wait_target: float,
+    ):
+        self.endpoint_class = endpoint_class
+        self.queue_size = queue_size
+        self.queue_timeout = queue_timeout
+        self.pool_wait_target = pool_wait_target
+        self.in_flight = 0
+        self.latency = Ewma()
+        self._waiters: deque[asyncio.Future] = deque()
+
+    @property
+    def limit(self) -> int:
+        """Current bound on in-flight requests, shrinking as the pool wait grows beyond the target"""
+        pressure = min(1.0, max(0.0, pool_wait.get() / self.pool_wait_target - 1.0))
+        return max(1, int(self.endpoint_class.limit * (1.0 - pressure * self.endpoint_class.shed_share)))
+
+    def _reject(self, reason: str, retry_after: float):
+        ADMISSION_REJECTIONS.inc(self.endpoint_class.name, reason)
+        raise HTTPException(
+            status_code=HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Server is overloaded, retry later",
+            headers={"Retry-After": str(max(1, ceil(retry_after)))},
+        )
+
+    async def acquire(self):
+        if self.in_flight < self.limit and not self._waiters:
+            self.in_flight += 1
+            return
+
+        if len(self._waiters) >= self.queue_size:
+            self._reject("queue_full", self.queue_timeout)
+
+        # requests ahead of this one drain at about limit / latency per second
+        expected_wait = (len(self._waiters) + 1) * self.latency.get() / self.limit
+        if expected_wait > self.queue_timeout:
+            self._reject("expected_wait", expected_wait)
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait_for(waiter, self.queue_timeout)
+        except asyncio.TimeoutError:
+            self._reject("queue_timeout", self.queue_timeout)
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # the slot was handed over right before the cancellation, pass it on
+                self.release()
+            raise
+        finally:
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+
+    def release(self, elapsed: float | None = None):
+        if elapsed is not None:
+            self.latency.observe(elapsed)
+
+        self.in_flight -= 1
+        while self._waiters and self.in_flight < self.limit:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                # the slot is handed over to the waiter, in_flight stays counted
+                self.in_flight += 1
+                waiter.set_result(None)
+
+        ADMISSION_IN_FLIGHT.set(self.in_flight, self.endpoint_class.name)
+
+
+def _build_controllers() -> dict[str, AdmissionController]:
+    capacity = settings.db_pool_size + settings.db_max_overflow
+    endpoint_classes = (
+        EndpointClass("cheap", limit=capacity, shed_share=0.0),
+        EndpointClass("list", limit=max(1, settings.db_pool_size), shed_share=0.5),
+        EndpointClass("geo", limit=max(1, settings.db_pool_size // 2), shed_share=0.9),
+    )
+
+    return {
+        endpoint_class.name: AdmissionController(
+            endpoint_class,
+            queue_size=settings.admission_queue_size,
+            queue_timeout=settings.admission_queue_timeout,
+            pool_wait_target=settings.admission_pool_wait_target,
+        )
+        for endpoint_class in endpoint_classes
+    }
+
+
+controllers = _build_controllers()
+
+
+def admit(endpoint_class: str):
+    """
+    Returns a dependency holding a slot of the endpoint class for the duration of the request
+    Args:
+        endpoint_class: "cheap", "list" or "geo"
+    """
+    controller = controllers[endpoint_class]
+
+    async def dependency():
+        if not settings.admission_enabled:
+            yield
+            return
+
+        await controller.acquire()
+        ADMISSION_IN_FLIGHT.set(controller.in_flight, endpoint_class)
+        started = monotonic()
+        try:
+            yield
+        finally:
+            controller.release(monotonic() - started)
+
+    return dependency
@@ -1,19 +1,47 @@
 from typing import Annotated
 
+from config import settings
 from database import get_db_session
 from fastapi import Depends
-from protocols.service import OrganizationService
+from protocols.service import (
+    BuildingService,
+    OrganizationService,
+)
 from protocols.storage import Storage
 from repository.postgres_repo import PostgresStorage
+from repository.sharded_repo import ShardedStorage
+from repository.sharding import shard_map
+from repository.snapshot import snapshot_manager
+from repository.snapshot_repo import SnapshotStorage
+from services.autocomplete import (
+    Autocomplete,
+    autocomplete,
+)
+from services.building_service import CustomBuildingService
 from services.organization_service import CustomOrganizationService
 from sqlalchemy.ext.asyncio import AsyncSession
 
 
 async def get_storage(session: Annotated[AsyncSession, Depends(get_db_session)]) -> Storage:
-    return PostgresStorage(session)
+    if settings.storage_backend in ("snapshot", "mmap"):
+        return SnapshotStorage(snapshot_manager.snapshot)
+    if settings.storage_backend == "sharded":
+        return ShardedStorage(shard_map, settings.activity_hierarchy)
+
+    return PostgresStorage(session, settings.activity_hierarchy)
 
 
 async def get_organization_service(
     storage: Annotated[Storage, Depends(get_storage)],
 ) -> OrganizationService:
     return CustomOrganizationService(storage)
+
+
+async def get_building_service(
+    storage: Annotated[Storage, Depends(get_storage)],
+) -> BuildingService:
+    return CustomBuildingService(storage)
+
+
+async def get_autocomplete() -> Autocomplete:
+    return autocomplete
@@ -1,6 +1,16 @@
-from domain.schemas import OrganizationRead
+from domain.schemas import (
+    ActivityFacetRead,
+    BuildingSummaryRead,
+    OrganizationRead,
+)
 from pydantic import TypeAdapter
 
 organization_adapter = TypeAdapter(OrganizationRead)
 
 organizations_adapter = TypeAdapter(list[OrganizationRead])
+
+activity_facets_adapter = TypeAdapter(list[ActivityFacetRead])
+
+building_summary_adapter = TypeAdapter(BuildingSummaryRead)
+
+building_summaries_adapter = TypeAdapter(list[BuildingSummaryRead])
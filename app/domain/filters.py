@@ -0,0 +1,62 @@
+from dataclasses import (
+    dataclass,
+    fields,
+)
+from typing import Literal
+
+FilterKind = Literal["building", "activity", "nested_activity", "radius", "bbox", "name", "address"]
+
+
+@dataclass(frozen=True)
+class OrganizationFilters:
+    """
+    Any combination of organization filters, all given filters must match
+    Radius needs latitude, longitude and radius, bounding box needs all four bounds
+    """
+
+    building_id: int | None = None
+    activity_id: int | None = None
+    nested_activity_id: int | None = None
+    latitude: float | None = None
+    longitude: float | None = None
+    radius: float | None = None
+    lat_min: float | None = None
+    lon_min: float | None = None
+    lat_max: float | None = None
+    lon_max: float | None = None
+    name: str | None = None
+    address: str | None = None
+
+    def __post_init__(self):
+        point = (self.latitude, self.longitude, self.radius)
+        if any(value is not None for value in point) and any(value is None for value in point):
+            raise ValueError("Radius filter needs latitude, longitude and radius")
+
+        bounds = (self.lat_min, self.lon_min, self.lat_max, self.lon_max)
+        if any(value is not None for value in bounds) and any(value is None for value in bounds):
+            raise ValueError("Bounding box filter needs lat_min, lon_min, lat_max and lon_max")
+
+        if all(getattr(self, field.name) is None for field in fields(self)):
+            raise ValueError("At least one filter is required")
+
+    @property
+    def kinds(self) -> list[FilterKind]:
+        """Returns the kinds of the given filters"""
+        present = {
+            "building": self.building_id is not None,
+            "activity": self.activity_id is not None,
+            "nested_activity": self.nested_activity_id is not None,
+            "radius": self.radius is not None,
+            "bbox": self.lat_min is not None,
+            "name": self.name is not None,
+            "address": self.address is not None,
+        }
+
+        return [kind for kind, given in present.items() if given]
+
+
+@dataclass(frozen=True)
+class RadiusQuery:
+    latitude: float
+    longitude: float
+    radius: float
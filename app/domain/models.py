@@ -4,10 +4,13 @@ from database import (
     Base,
     intpk,
 )
+from domain.normalization import normalize_name_sql
 from sqlalchemy import (
     CheckConstraint,
     Column,
+    Computed,
     ForeignKey,
+    Index,
     String,
     Table,
     UniqueConstraint,
@@ -23,6 +26,7 @@ organization_activity = Table(
     Base.metadata,
     Column("organization_id", ForeignKey("organizations.id"), primary_key=True),
     Column("activity_id", ForeignKey("activities.id"), primary_key=True),
+    Index("ix_organization_activity_activity_id_organization_id", "activity_id", "organization_id"),
 )
 
 
@@ -31,11 +35,22 @@ class Organization(Base):
 
     id: Mapped[intpk]
     name: Mapped[str] = mapped_column(String(255), unique=True, index=True)
+    search_name: Mapped[str] = mapped_column(String(255), Computed(normalize_name_sql("name"), persisted=True))
     phone: Mapped[str] = mapped_column(String(255))
     building_id: Mapped[int] = mapped_column(ForeignKey("buildings.id"))
     building: Mapped["Building"] = relationship(back_populates="organizations")
     activities: Mapped[List["Activity"]] = relationship(secondary=organization_activity, back_populates="organizations")
 
+    __table_args__ = (
+        Index("ix_organizations_building_id_id", "building_id", "id"),
+        Index(
+            "ix_organizations_search_name_trgm",
+            "search_name",
+            postgresql_using="gin",
+            postgresql_ops={"search_name": "gin_trgm_ops"},
+        ),
+    )
+
 
 class Building(Base):
     __tablename__ = "buildings"
@@ -49,6 +64,7 @@ class Building(Base):
     __table_args__ = (
         CheckConstraint("latitude >= -90 AND latitude <= 90", name="latitude_range_check"),
         CheckConstraint("longitude >= -180 AND latitude <= 180", name="longitude_range_check"),
+        Index("ix_buildings_latitude_longitude", "latitude", "longitude"),
     )
 
 
@@ -57,10 +73,16 @@ class Activity(Base):
 
     id: Mapped[intpk]
     name: Mapped[str] = mapped_column(String(50))
+    # materialized path: ids from the root down to the activity, each followed by a dot ("1.4.17."),
+    # and the number of ancestors, kept next to the closure table by the bulk ingest
+    path: Mapped[str] = mapped_column(String(1024), server_default="", deferred=True)
+    depth: Mapped[int] = mapped_column(server_default="0", deferred=True)
     organizations: Mapped[List[Organization]] = relationship(
         secondary=organization_activity, back_populates="activities"
     )
 
+    __table_args__ = (Index("ix_activities_path", "path", postgresql_ops={"path": "text_pattern_ops"}),)
+
 
 class ActivityClosure(Base):
     __tablename__ = "activities_closures"
@@ -70,4 +92,7 @@ class ActivityClosure(Base):
     descendant_id: Mapped[int] = mapped_column(ForeignKey("activities.id", ondelete="CASCADE"))
     depth: Mapped[int]
 
-    __table_args__ = (UniqueConstraint("ancestor_id", "descendant_id", name="uq_ancestor_descendant"),)
+    __table_args__ = (
+        UniqueConstraint("ancestor_id", "descendant_id", name="uq_ancestor_descendant"),
+        Index("ix_activities_closures_ancestor_id_depth_descendant_id", "ancestor_id", "depth", "descendant_id"),
+    )
@@ -0,0 +1,198 @@
+import re
+import struct
+import unicodedata
+from functools import lru_cache
+
+# Latin letters that look exactly like Cyrillic ones once lowercased ("OOO" typed in Latin is "ООО").
+# Both strings must stay in sync: the same pairs are used by the `search_name` generated column in Postgres,
+# whose migrations keep a frozen copy of normalize_name_sql, so changing the folds needs a new migration.
+LATIN_LOOKALIKES = "aeopcxykmthb"
+CYRILLIC_LOOKALIKES = "аеорсхукмтнв"
+# Cyrillic letters searched as another Cyrillic letter ("ёлка" is found by "елка")
+CYRILLIC_FOLDS = {"ё": "е"}
+
+_folded_from = LATIN_LOOKALIKES + "".join(CYRILLIC_FOLDS)
+_folded_to = CYRILLIC_LOOKALIKES + "".join(CYRILLIC_FOLDS.values())
+_folds_table = str.maketrans(_folded_from, _folded_to)
+
+_whitespace_re = re.compile(r"\s+")
+
+
+def normalize_name(value: str) -> str:
+    """
+    Normalizes a name for searching: Unicode NFKC, lower case, Latin lookalikes folded to Cyrillic, ё folded to е,
+    single spaces
+    Args:
+        value: Raw name
+
+    Returns:
+        str: Normalized name
+    """
+    value = unicodedata.normalize("NFKC", value).lower().translate(_folds_table)
+
+    return _whitespace_re.sub(" ", value).strip()
+
+
+def normalize_name_sql(column: str) -> str:
+    """
+    Returns the Postgres expression mirroring `normalize_name` for the given column,
+    normalize(..., NFKC) needs a UTF8 database
+    Args:
+        column: Column name
+
+    Returns:
+        str: SQL expression
+    """
+    return (
+        f"btrim(regexp_replace(translate(lower(normalize({column}, NFKC)), "
+        f"'{_folded_from}', '{_folded_to}'), '\\s+', ' ', 'g'))"
+    )
+
+
+# pg_trgm splits words on anything that is not a letter or a digit
+_word_re = re.compile(r"[^\W_]+")
+
+
+def trigram_list(value: str) -> list[str]:
+    """
+    Returns pg_trgm style trigrams in text order: every word is padded with two spaces in front and one behind
+    Args:
+        value: Normalized text
+
+    Returns:
+        list[str]: Trigrams, repeated ones included
+    """
+    result = []
+    for word in _word_re.findall(value):
+        padded = f"  {word} "
+        result.extend(padded[position : position + 3] for position in range(len(padded) - 2))
+
+    return result
+
+
+def trigrams(value: str) -> set[str]:
+    """
+    Returns the distinct pg_trgm style trigrams of a text
+    Args:
+        value: Normalized text
+
+    Returns:
+        set[str]: Trigrams
+    """
+    return set(trigram_list(value))
+
+
+_float4 = struct.Struct("f")
+
+
+@lru_cache(maxsize=65536)
+def _similarity(count: int, query_length: int, extent_length: int) -> float:
+    # CALCSML of pg_trgm, computed in float4
+    return _float4.unpack(_float4.pack(count / (query_length + extent_length - count)))[0]
+
+
+def word_similarity_bound(shared: int, query_length: int) -> float:
+    """
+    Returns the upper bound of word_similarity for a value sharing some of the query trigrams: no extent of the value
+    can have more of them in common with the query, and the extent itself counts in the denominator
+    Args:
+        shared: Number of distinct query trigrams the value has
+        query_length: Number of distinct query trigrams
+
+    Returns:
+        float: Highest possible similarity
+    """
+    return _similarity(shared, query_length, shared) if query_length else 0.0
+
+
+def word_similarity(query: str, value: str, query_trigrams: set[str] | None = None) -> float:
+    """
+    Returns pg_trgm word_similarity: the greatest similarity between the query trigrams and any continuous extent
+    of the value trigrams, a port of iterate_word_similarity with its float4 arithmetic so rankings match Postgres
+    Args:
+        query: Normalized query
+        value: Normalized text
+        query_trigrams: Trigrams of the query when already known
+
+    Returns:
+        float: Similarity from 0 to 1
+    """
+    if query_trigrams is None:
+        query_trigrams = trigrams(query)
+    value_trigrams = trigram_list(value)
+    query_length = len(query_trigrams)
+    if not query_length:
+        return 0.0
+
+    last_positions: dict[str, int] = {}
+    lower, count, extent_length, best = -1, 0, 0, 0.0
+    for position, trigram in enumerate(value_trigrams):
+        found = trigram in query_trigrams
+        if lower >= 0 or found:
+            if last_positions.get(trigram, -1) < 0:
+                extent_length += 1
+                count += found
+            last_positions[trigram] = position
+        if not found:
+            continue
+
+        if lower == -1:
+            lower, extent_length = position, 1
+        current = _similarity(count, query_length, extent_length)
+
+        # moving the lower bound right may drop trigrams missing from the query and raise the similarity
+        previous_lower, lower_count, lower_length = lower, count, extent_length
+        for candidate in range(lower, position + 1):
+            similarity = _similarity(lower_count, query_length, lower_length)
+            if similarity > current:
+                current, lower, count, extent_length = similarity, candidate, lower_count, lower_length
+            candidate_trigram = value_trigrams[candidate]
+            if last_positions[candidate_trigram] == candidate:
+                lower_length -= 1
+                lower_count -= candidate_trigram in query_trigrams
+
+        best = max(best, current)
+        for dropped in range(previous_lower, lower):
+            if last_positions[value_trigrams[dropped]] == dropped:
+                last_positions[value_trigrams[dropped]] = -1
+
+    return best
+
+
+class WordSimilarity:
+    """
+    word_similarity of one query against many values. Trigrams before the first and after the last one shared with
+    the query do not change the result, so a value is cut down to its words from the first to the last word sharing
+    a trigram and every distinct cut is scored once.
+    """
+
+    def __init__(self, query: str):
+        self.query = query
+        self.query_trigrams = trigrams(query)
+        self._query_characters = set(query)
+        self._sharing: dict[str, bool] = {}
+        self._scores: dict[tuple[str, ...], float] = {}
+
+    def __call__(self, value: str) -> float:
+        words = _word_re.findall(value)
+        sharing = [position for position, word in enumerate(words) if self._shares_trigrams(word)]
+        if not sharing:
+            return 0.0
+
+        span = tuple(words[sharing[0] : sharing[-1] + 1])
+        score = self._scores.get(span)
+        if score is None:
+            score = self._scores[span] = word_similarity(self.query, " ".join(span), self.query_trigrams)
+
+        return score
+
+    def _shares_trigrams(self, word: str) -> bool:
+        # every trigram has a character of its word, numbers and other words without query characters are skipped
+        if self._query_characters.isdisjoint(word):
+            return False
+
+        shares = self._sharing.get(word)
+        if shares is None:
+            shares = self._sharing[word] = not self.query_trigrams.isdisjoint(trigram_list(word))
+
+        return shares
@@ -1,6 +1,9 @@
+from typing import Literal
+
 from pydantic import (
     BaseModel,
     ConfigDict,
+    Field,
 )
 
 
@@ -16,6 +19,22 @@ class BuildingRead(BaseModel):
     model_config = ConfigDict(from_attributes=True)
 
 
+class BuildingSummaryRead(BaseModel):
+    id: int
+    address: str
+    latitude: float
+    longitude: float
+    organization_count: int
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class BuildingPageRead(BaseModel):
+    buildings: list[BuildingSummaryRead]
+    # pass as after_id to get the next page, None on the last page
+    next_after_id: int | None
+
+
 class OrganizationRead(BaseModel):
     id: int
     name: str
@@ -24,3 +43,41 @@ class OrganizationRead(BaseModel):
     activities: list[ActivityRead]
 
     model_config = ConfigDict(from_attributes=True)
+
+
+class SuggestionRead(BaseModel):
+    kind: Literal["organization", "activity"]
+    id: int
+    name: str
+    weight: float
+
+
+class ActivityFacetRead(BaseModel):
+    id: int
+    name: str
+    count: int
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class BatchRadiusQuery(BaseModel):
+    id: str = Field(max_length=64, description="Client id of the query, echoed in the result")
+    latitude: float = Field(ge=-90, le=90)
+    longitude: float = Field(ge=-180, le=180)
+    radius: float = Field(gt=0, le=50, description="Radius in kilometers")
+
+
+class BatchRadiusRequest(BaseModel):
+    queries: list[BatchRadiusQuery] = Field(min_length=1, max_length=500)
+    limit: int = Field(20, ge=1, le=100, description="Maximum organizations per query, the lowest ids first")
+
+
+class BatchRadiusResult(BaseModel):
+    id: str
+    organization_ids: list[int]
+
+
+class BatchRadiusRead(BaseModel):
+    results: list[BatchRadiusResult]
+    # every organization found by any query, once
+    organizations: list[OrganizationRead]
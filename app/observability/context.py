@@ -0,0 +1,35 @@
+from collections import Counter
+from contextvars import ContextVar
+from dataclasses import (
+    dataclass,
+    field,
+)
+
+from starlette.types import Scope
+
+
+@dataclass
+class RequestStats:
+    """Per-request database counters filled in by the engine instrumentation"""
+
+    scope: Scope | None = None
+    queries: int = 0
+    db_seconds: float = 0.0
+    # statement text -> executions, repeated texts hint at per-row loading
+    statements: Counter[str] = field(default_factory=Counter)
+
+    @property
+    def endpoint(self) -> str:
+        if self.scope is None:
+            return "-"
+
+        route = self.scope.get("route")
+        route_path = route.path if route is not None else "unmatched"
+        query_string = self.scope.get("query_string", b"").decode("latin-1")
+        path = f"{self.scope['path']}?{query_string}" if query_string else self.scope["path"]
+
+        return f"{self.scope['method']} {path} ({route_path})"
+
+
+request_id: ContextVar[str | None] = ContextVar("request_id", default=None)
+request_stats: ContextVar[RequestStats | None] = ContextVar("request_stats", default=None)
@@ -0,0 +1,40 @@
+from time import perf_counter
+
+from observability.context import request_stats
+from observability.metrics import (
+    DB_POOL_CHECKED_OUT,
+    DB_STATEMENT_DURATION,
+    registry,
+)
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+
+def instrument_engine(engine: AsyncEngine, database: str = "primary", metrics: bool = True):
+    """
+    Times every statement at the driver level and counts it against the current request
+    Args:
+        engine: Engine to instrument
+        database: Label of the pool gauge, the shard name for shard engines
+        metrics: Also records statement durations and the pool gauge, the per-request counts are always kept
+    """
+    sync_engine = engine.sync_engine
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        context._metrics_started = perf_counter()
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = perf_counter() - context._metrics_started
+        if metrics:
+            DB_STATEMENT_DURATION.observe(elapsed)
+
+        stats = request_stats.get()
+        if stats is not None:
+            stats.queries += 1
+            stats.db_seconds += elapsed
+            stats.statements[statement] += 1
+
+    if metrics:
+        registry.add_collector(lambda: DB_POOL_CHECKED_OUT.set(sync_engine.pool.checkedout(), database))
@@ -0,0 +1,25 @@
+from time import monotonic
+
+
+class Ewma:
+    """
+    Exponentially weighted moving average of samples that fades out while no samples arrive,
+    so a value observed before load was shed does not keep shedding forever
+    """
+
+    def __init__(self, alpha: float = 0.1, idle_half_life: float = 2.0):
+        self.alpha = alpha
+        self.idle_half_life = idle_half_life
+        self.value = 0.0
+        self._updated_at = monotonic()
+
+    def observe(self, sample: float):
+        self.value = self.get() + self.alpha * (sample - self.get())
+        self._updated_at = monotonic()
+
+    def get(self) -> float:
+        return self.value * 0.5 ** ((monotonic() - self._updated_at) / self.idle_half_life)
+
+
+# connection pool checkout wait of this worker, fed by PostgresStorage and read by admission control
+pool_wait = Ewma()
@@ -0,0 +1,148 @@
+"""
+Logging pipeline keeping file I/O off the event loop
+
+Log calls only put the record on a bounded queue, a QueueListener thread formats and writes them. Messages whose
+arguments cannot change in the meantime are merged with them in that thread as well. When the queue fills up, low
+level records are sampled and, once it is full, records are dropped instead of blocking.
+"""
+
+import json
+import logging
+import queue
+import random
+from collections.abc import Mapping
+from datetime import (
+    date,
+    datetime,
+    timedelta,
+    timezone,
+)
+from decimal import Decimal
+from logging.handlers import (
+    QueueHandler,
+    QueueListener,
+)
+from uuid import UUID
+
+from observability.context import request_id
+from observability.metrics import LOG_RECORDS_DROPPED
+
+# attributes every LogRecord has, anything else was passed through extra= and ends up in the JSON document
+_RECORD_ATTRIBUTES = frozenset(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "request_id"}
+# message arguments of these types are formatted in the listener thread, anything else when the record is logged
+_IMMUTABLE_ARGUMENTS = (str, bytes, int, float, Decimal, date, timedelta, UUID, BaseException, type(None))
+
+
+def _immutable_arguments(args: tuple | Mapping) -> bool:
+    values = args.values() if isinstance(args, Mapping) else args
+    return all(isinstance(value, _IMMUTABLE_ARGUMENTS) for value in values)
+
+
+class JsonFormatter(logging.Formatter):
+    """Formats records as one JSON document per line"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        document = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "request_id": getattr(record, "request_id", None),
+            "module": record.module,
+            "line": record.lineno,
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES:
+                document[key] = value
+
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            document["exception"] = record.exc_text
+
+        return json.dumps(document, ensure_ascii=False, default=str)
+
+
+class DroppingQueueHandler(QueueHandler):
+    """
+    Puts records on a bounded queue without ever blocking the caller
+    Once the queue is filled above load_threshold, records below WARNING are kept with probability
+    load_sample_rate. Records that do not fit are counted and dropped.
+    """
+
+    def __init__(self, log_queue: queue.Queue, load_threshold: float = 0.5, load_sample_rate: float = 0.1):
+        super().__init__(log_queue)
+        self.load_size = int(log_queue.maxsize * load_threshold) if log_queue.maxsize > 0 else 0
+        self.load_sample_rate = load_sample_rate
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # formatting happens in the listener thread, only resolve what depends on the calling context
+        if not isinstance(record.msg, str) or (record.args and not _immutable_arguments(record.args)):
+            record.msg = record.getMessage()
+            record.args = None
+        record.request_id = request_id.get()
+
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            LOG_RECORDS_DROPPED.inc(record.levelname, "full")
+
+    def emit(self, record: logging.LogRecord):
+        if (
+            self.load_size
+            and record.levelno < logging.WARNING
+            and self.queue.qsize() >= self.load_size
+            and random.random() >= self.load_sample_rate
+        ):
+            LOG_RECORDS_DROPPED.inc(record.levelname, "sampled")
+            return
+
+        super().emit(record)
+
+
+class BlockingStopQueueListener(QueueListener):
+    """Waits for room for the stop sentinel so a full queue is still flushed on shutdown"""
+
+    def enqueue_sentinel(self):
+        self.queue.put(self._sentinel)
+
+
+def setup_logging(
+    level: str,
+    path: str,
+    json_format: bool = True,
+    text_format: str | None = None,
+    date_format: str | None = None,
+    queue_size: int = 10_000,
+) -> QueueListener:
+    """
+    Routes the root logger through a bounded queue to a file written by a background thread
+    Args:
+        level: Root logger level
+        path: Log file path
+        json_format: Writes JSON documents instead of text_format lines
+        text_format: Format of text lines
+        date_format: Date format of text lines
+        queue_size: Maximum number of records waiting to be written
+
+    Returns:
+        QueueListener: Started listener, stop it on shutdown to flush the queue
+    """
+    file_handler = logging.FileHandler(path, mode="a", encoding="utf-8")
+    file_handler.setFormatter(JsonFormatter() if json_format else logging.Formatter(text_format, date_format))
+
+    log_queue: queue.Queue = queue.Queue(maxsize=queue_size)
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+        handler.close()
+    root.addHandler(DroppingQueueHandler(log_queue))
+    root.setLevel(level.upper())
+
+    listener = BlockingStopQueueListener(log_queue, file_handler, respect_handler_level=True)
+    listener.start()
+
+    return listener
@@ -0,0 +1,265 @@
+"""
+Minimal Prometheus-style metrics
+
+Metrics are plain dictionaries keyed by label values and are updated from the event loop thread only, so no locking
+is needed and an observation costs a dict lookup and a bisect. Every worker process keeps its own registry, with
+a shared worker state directory (services.worker_state) the workers publish dumps of it and /metrics renders
+the sum over all workers of the host.
+"""
+
+from abc import (
+    ABC,
+    abstractmethod,
+)
+from bisect import bisect_left
+from contextlib import contextmanager
+from time import perf_counter
+from typing import (
+    Callable,
+    Iterable,
+    Iterator,
+)
+
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+_label_escapes = str.maketrans({"\\": "\\\\", '"': '\\"', "\n": "\\n"})
+
+
+def _format_labels(names: tuple[str, ...], values: tuple[str, ...], extra: str = "") -> str:
+    # route templates and API key names may hold any character, the exposition format escapes \, " and newlines
+    pairs = [f'{name}="{str(value).translate(_label_escapes)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Metric(ABC):
+    type = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+
+    @abstractmethod
+    def samples(self) -> Iterator[str]:
+        """Yields the exposition lines of every label combination"""
+
+    @abstractmethod
+    def dump(self) -> list:
+        """Returns the values of every label combination as JSON-serializable rows"""
+
+    @abstractmethod
+    def merge(self, rows: list):
+        """Adds rows returned by dump of the same metric in another process"""
+
+    def fresh(self) -> "Metric":
+        """Returns an empty metric with the same name, documentation and labels"""
+        return type(self)(self.name, self.documentation, self.labelnames)
+
+    def render(self) -> str:
+        return "\n".join(
+            [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type}", *self.samples()]
+        )
+
+
+class Counter(Metric):
+    type = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: dict[tuple[str, ...], float] = {}
+
+    def inc(self, *labels: str, amount: float = 1.0):
+        self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def samples(self) -> Iterator[str]:
+        for labels, value in self._values.items():
+            yield f"{self.name}{_format_labels(self.labelnames, labels)} {value}"
+
+    def dump(self) -> list:
+        return [[list(labels), value] for labels, value in self._values.items()]
+
+    def merge(self, rows: list):
+        for labels, value in rows:
+            self.inc(*labels, amount=value)
+
+
+class Gauge(Metric):
+    type = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: dict[tuple[str, ...], float] = {}
+
+    def set(self, value: float, *labels: str):
+        self._values[labels] = value
+
+    def inc(self, *labels: str, amount: float = 1.0):
+        self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def dec(self, *labels: str, amount: float = 1.0):
+        self._values[labels] = self._values.get(labels, 0.0) - amount
+
+    def samples(self) -> Iterator[str]:
+        for labels, value in self._values.items():
+            yield f"{self.name}{_format_labels(self.labelnames, labels)} {value}"
+
+    def dump(self) -> list:
+        return [[list(labels), value] for labels, value in self._values.items()]
+
+    def merge(self, rows: list):
+        for labels, value in rows:
+            self.inc(*labels, amount=value)
+
+
+class Histogram(Metric):
+    type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = buckets
+        # per label values: counts per bucket (the last one is +Inf) and the sum
+        self._counts: dict[tuple[str, ...], list[int]] = {}
+        self._sums: dict[tuple[str, ...], float] = {}
+
+    def observe(self, value: float, *labels: str):
+        counts = self._counts.get(labels)
+        if counts is None:
+            counts = self._counts[labels] = [0] * (len(self.buckets) + 1)
+            self._sums[labels] = 0.0
+
+        counts[bisect_left(self.buckets, value)] += 1
+        self._sums[labels] += value
+
+    @contextmanager
+    def time(self, *labels: str):
+        started = perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(perf_counter() - started, *labels)
+
+    def samples(self) -> Iterator[str]:
+        for labels, counts in self._counts.items():
+            cumulative = 0
+            for bound, count in zip((*self.buckets, "+Inf"), counts):
+                cumulative += count
+                bucket_labels = _format_labels(self.labelnames, labels, 'le="' + str(bound) + '"')
+                yield f"{self.name}_bucket{bucket_labels} {cumulative}"
+            yield f"{self.name}_sum{_format_labels(self.labelnames, labels)} {self._sums[labels]}"
+            yield f"{self.name}_count{_format_labels(self.labelnames, labels)} {cumulative}"
+
+    def dump(self) -> list:
+        return [[list(labels), counts, self._sums[labels]] for labels, counts in self._counts.items()]
+
+    def merge(self, rows: list):
+        for labels, counts, total in rows:
+            labels = tuple(labels)
+            merged = self._counts.setdefault(labels, [0] * (len(self.buckets) + 1))
+            for bucket, count in enumerate(counts):
+                merged[bucket] += count
+            self._sums[labels] = self._sums.get(labels, 0.0) + total
+
+    def fresh(self) -> "Histogram":
+        return Histogram(self.name, self.documentation, self.labelnames, self.buckets)
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: list[Metric] = []
+        self._collectors: list[Callable[[], None]] = []
+
+    def register(self, metric: Metric) -> Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def add_collector(self, collector: Callable[[], None]):
+        """Adds a callback refreshing gauges right before rendering"""
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        for collector in self._collectors:
+            collector()
+
+        return "\n".join(metric.render() for metric in self._metrics) + "\n"
+
+    def dump(self) -> dict[str, list]:
+        """Returns the values of every metric as JSON-serializable rows keyed by metric name"""
+        for collector in self._collectors:
+            collector()
+
+        return {metric.name: metric.dump() for metric in self._metrics}
+
+    def render_merged(self, dumps: Iterable[tuple[dict[str, list], bool]]) -> str:
+        """
+        Renders the sum of registry dumps taken in several processes
+        Args:
+            dumps: Dumps with whether their process is still running, gauges of exited processes are left out
+                while their counters and histograms keep counting
+
+        Returns:
+            str: Metrics in the Prometheus text exposition format
+        """
+        merged = [metric.fresh() for metric in self._metrics]
+        for dump, alive in dumps:
+            for metric in merged:
+                if metric.name in dump and (alive or not isinstance(metric, Gauge)):
+                    metric.merge(dump[metric.name])
+
+        return "\n".join(metric.render() for metric in merged) + "\n"
+
+
+registry = Registry()
+
+HTTP_REQUEST_DURATION = registry.register(
+    Histogram("http_request_duration_seconds", "HTTP request latency", ("method", "route", "status"))
+)
+HTTP_REQUESTS_IN_FLIGHT = registry.register(Gauge("http_requests_in_flight", "HTTP requests being processed"))
+DB_QUERIES_PER_REQUEST = registry.register(
+    Histogram(
+        "db_queries_per_request",
+        "SQL statements issued per HTTP request",
+        ("route",),
+        buckets=(0, 1, 2, 3, 5, 8, 13, 21, 50, 100),
+    )
+)
+DB_STATEMENT_DURATION = registry.register(
+    Histogram("db_statement_duration_seconds", "Time spent in the database driver per SQL statement")
+)
+DB_SESSION_EXECUTE_DURATION = registry.register(
+    Histogram("db_session_execute_seconds", "Time spent in session.execute including ORM loading")
+)
+DB_POOL_CHECKOUT_DURATION = registry.register(
+    Histogram("db_pool_checkout_seconds", "Time waiting for a connection from the pool")
+)
+DB_POOL_CHECKED_OUT = registry.register(
+    Gauge("db_pool_checked_out", "Connections currently checked out", ("database",))
+)
+DB_SLOW_STATEMENTS = registry.register(Counter("db_slow_statements_total", "Statements over the slow query threshold"))
+DB_REPEATED_STATEMENT_REQUESTS = registry.register(
+    Counter("db_repeated_statement_requests_total", "Requests flagged for repeating one statement (N+1)", ("route",))
+)
+SERIALIZATION_DURATION = registry.register(
+    Histogram("serialization_duration_seconds", "Time spent in pydantic validation and dumping", ("stage",))
+)
+LOG_RECORDS_DROPPED = registry.register(
+    Counter("log_records_dropped_total", "Log records dropped by the logging queue", ("level", "reason"))
+)
+API_KEY_REJECTIONS = registry.register(
+    Counter("api_key_rejections_total", "Requests rejected by per API key limits", ("key",))
+)
+ADMISSION_IN_FLIGHT = registry.register(
+    Gauge("admission_in_flight", "Requests admitted per endpoint class", ("endpoint_class",))
+)
+ADMISSION_REJECTIONS = registry.register(
+    Counter("admission_rejections_total", "Requests shed by admission control", ("endpoint_class", "reason"))
+)
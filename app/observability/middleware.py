@@ -0,0 +1,121 @@
+from time import perf_counter
+from uuid import uuid4
+
+from observability.context import (
+    RequestStats,
+    request_id,
+    request_stats,
+)
+from observability.metrics import (
+    DB_QUERIES_PER_REQUEST,
+    HTTP_REQUEST_DURATION,
+    HTTP_REQUESTS_IN_FLIGHT,
+)
+from observability.slow_queries import check_repeated_statements
+from starlette.types import (
+    ASGIApp,
+    Message,
+    Receive,
+    Scope,
+    Send,
+)
+
+
+def _route_path(scope: Scope) -> str:
+    route = scope.get("route")
+
+    return route.path if route is not None else "unmatched"
+
+
+class RequestStatsMiddleware:
+    """
+    Pure ASGI middleware collecting the SQL statements of every request into RequestStats, independent of metrics
+    Requests repeating one statement at least repeated_statement_threshold times are reported as possible N+1
+    """
+
+    def __init__(self, app: ASGIApp, repeated_statement_threshold: int = 0):
+        self.app = app
+        self.repeated_statement_threshold = repeated_statement_threshold
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats(scope=scope)
+        token = request_stats.set(stats)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            request_stats.reset(token)
+            if self.repeated_statement_threshold:
+                check_repeated_statements(stats, _route_path(scope), self.repeated_statement_threshold)
+
+
+class MetricsMiddleware:
+    """
+    Pure ASGI middleware recording latency, in-flight requests and SQL statements per request,
+    runs inside RequestStatsMiddleware
+    Requests are labelled by route template rather than by path to keep the number of series bounded
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+
+        async def send_with_status(message: Message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        HTTP_REQUESTS_IN_FLIGHT.inc()
+        started = perf_counter()
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = perf_counter() - started
+            HTTP_REQUESTS_IN_FLIGHT.dec()
+
+            route_path = _route_path(scope)
+            stats = request_stats.get()
+            HTTP_REQUEST_DURATION.observe(elapsed, scope["method"], route_path, str(status))
+            DB_QUERIES_PER_REQUEST.observe(stats.queries if stats is not None else 0, route_path)
+
+
+class RequestIdMiddleware:
+    """
+    Pure ASGI middleware binding a request id to the context for log records
+    The id is taken from the X-Request-ID header when the client sends one and echoed in the response
+    """
+
+    header = b"x-request-id"
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        value = next((value for name, value in scope["headers"] if name == self.header), b"")[:64]
+        current_id = value.decode("latin-1") if value else uuid4().hex
+
+        async def send_with_request_id(message: Message):
+            if message["type"] == "http.response.start":
+                message["headers"] = [*message.get("headers", ()), (self.header, current_id.encode("latin-1"))]
+            await send(message)
+
+        token = request_id.set(current_id)
+        try:
+            await self.app(scope, receive, send_with_request_id)
+        finally:
+            request_id.reset(token)
@@ -0,0 +1,177 @@
+import asyncio
+import json
+import logging
+import random
+from time import (
+    monotonic,
+    perf_counter,
+)
+
+import asyncpg
+from observability.context import (
+    RequestStats,
+    request_stats,
+)
+from observability.metrics import (
+    DB_REPEATED_STATEMENT_REQUESTS,
+    DB_SLOW_STATEMENTS,
+)
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+MAX_LOGGED_LENGTH = 2000
+
+
+def _shorten(value: str) -> str:
+    return value if len(value) <= MAX_LOGGED_LENGTH else value[:MAX_LOGGED_LENGTH] + "..."
+
+
+class SlowQueryLog:
+    """
+    Logs statements slower than a threshold with their bound parameters and the endpoint that issued them
+
+    A sample of slow statements is explained (plain EXPLAIN, the statement is not executed again) on a separate
+    connection to the database that ran it, in a background task, so the request never waits for it. At most one
+    EXPLAIN runs at a time and every statement text is explained at most once per explain_interval seconds.
+    """
+
+    def __init__(
+        self,
+        dsn: str,
+        threshold: float,
+        explain_sample_rate: float = 0.1,
+        explain_interval: float = 60.0,
+        explain_timeout: float = 5.0,
+    ):
+        self.dsn = dsn
+        self.threshold = threshold
+        self.explain_sample_rate = explain_sample_rate
+        self.explain_interval = explain_interval
+        self.explain_timeout = explain_timeout
+        self._explained_at: dict[str, float] = {}
+        self._explain_lock = asyncio.Lock()
+        # dsn -> connection explaining the statements of that database
+        self._explain_connections: dict[str, asyncpg.Connection] = {}
+        self._tasks: set[asyncio.Task] = set()
+
+    def install(self, engine: AsyncEngine, dsn: str | None = None):
+        """
+        Watches the statements of an engine
+        Args:
+            engine: Engine to watch
+            dsn: Database of the engine for EXPLAIN, the dsn of the log by default
+        """
+        sync_engine = engine.sync_engine
+        dsn = dsn or self.dsn
+
+        @event.listens_for(sync_engine, "before_cursor_execute")
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            context._slow_query_started = perf_counter()
+
+        @event.listens_for(sync_engine, "after_cursor_execute")
+        def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            elapsed = perf_counter() - context._slow_query_started
+            if elapsed >= self.threshold:
+                self._on_slow_statement(statement, parameters, elapsed, executemany, dsn)
+
+    def _on_slow_statement(self, statement: str, parameters, elapsed: float, executemany: bool, dsn: str):
+        stats = request_stats.get()
+        endpoint = stats.endpoint if stats is not None else "-"
+        DB_SLOW_STATEMENTS.inc()
+        logging.warning(
+            "Slow statement %.1f ms from %s: %s parameters %s",
+            elapsed * 1000,
+            endpoint,
+            _shorten(statement),
+            _shorten(repr(parameters)),
+        )
+
+        if executemany or not self._should_explain(statement):
+            return
+
+        task = asyncio.get_running_loop().create_task(self._explain(statement, parameters, endpoint, dsn))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def _should_explain(self, statement: str) -> bool:
+        if statement.split(None, 1)[0].upper() not in ("SELECT", "WITH"):
+            return False
+        if self._explain_lock.locked() or random.random() >= self.explain_sample_rate:
+            return False
+
+        now = monotonic()
+        if now - self._explained_at.get(statement, float("-inf")) < self.explain_interval:
+            return False
+        self._explained_at[statement] = now
+
+        if len(self._explained_at) > 1000:
+            self._explained_at = {
+                text: at for text, at in self._explained_at.items() if now - at < self.explain_interval
+            }
+
+        return True
+
+    async def _explain(self, statement: str, parameters, endpoint: str, dsn: str):
+        if self._explain_lock.locked():
+            return
+
+        async with self._explain_lock:
+            try:
+                connection = self._explain_connections.get(dsn)
+                if connection is None or connection.is_closed():
+                    connection = await asyncpg.connect(dsn, timeout=self.explain_timeout)
+                    self._explain_connections[dsn] = connection
+
+                plan = await connection.fetchval(
+                    f"EXPLAIN (FORMAT JSON) {statement}", *(parameters or ()), timeout=self.explain_timeout
+                )
+            except Exception as exc:
+                logging.error("Error while explaining slow statement from %s - %s", endpoint, exc)
+                await self._close_connection(dsn)
+                return
+
+        plan = json.loads(plan) if isinstance(plan, str) else plan
+        logging.warning(
+            "Plan of slow statement from %s: %s", endpoint, json.dumps(plan[0]["Plan"], separators=(",", ":"))
+        )
+
+    async def _close_connection(self, dsn: str):
+        connection = self._explain_connections.pop(dsn, None)
+        if connection is not None:
+            try:
+                await connection.close(timeout=self.explain_timeout)
+            except Exception:
+                connection.terminate()
+
+    async def close(self):
+        for task in list(self._tasks):
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        for dsn in list(self._explain_connections):
+            await self._close_connection(dsn)
+
+
+def check_repeated_statements(stats: RequestStats, route_path: str, threshold: int):
+    """
+    Flags a request that executed the same statement text at least threshold times, which usually means a
+    relationship is loaded row by row instead of in one go
+    Args:
+        stats: Statistics of the finished request
+        route_path: Route template of the request
+        threshold: Number of executions of one statement that is considered suspicious
+    """
+    if stats.queries < threshold or not stats.statements:
+        return
+
+    statement, executions = stats.statements.most_common(1)[0]
+    if executions < threshold:
+        return
+
+    DB_REPEATED_STATEMENT_REQUESTS.inc(route_path)
+    logging.warning(
+        "Possible N+1 in %s: %s statements, %s of them identical: %s",
+        stats.endpoint,
+        stats.queries,
+        executions,
+        _shorten(statement),
+    )
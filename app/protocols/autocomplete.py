@@ -0,0 +1,7 @@
+from typing import Protocol
+
+
+class AutocompleteSource(Protocol):
+    async def get_organization_entries(self, ids: list[int] | None = None) -> list[tuple[int, str, float]]: ...
+
+    async def get_activity_entries(self, ids: list[int] | None = None) -> list[tuple[int, str, float]]: ...
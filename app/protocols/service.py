@@ -1,5 +1,8 @@
 from typing import Protocol
 
+from domain.filters import OrganizationFilters
+from domain.schemas import BatchRadiusRequest
+
 
 class OrganizationService(Protocol):
     async def get_organizations_by_building_id_with_pagination(
@@ -14,6 +17,8 @@ class OrganizationService(Protocol):
 
     async def get_organization_by_name(self, name: str) -> dict: ...
 
+    async def search_organizations_by_name_with_pagination(self, name: str, page: int, limit: int) -> list[dict]: ...
+
     async def get_organizations_in_radius_with_pagination(
         self, latitude: float, longitude: float, radius: float, page: int, limit: int
     ) -> list[dict]: ...
@@ -25,3 +30,23 @@ class OrganizationService(Protocol):
     async def get_organizations_by_nested_activity_id_with_pagination(
         self, activity_id: int, page: int, limit: int
     ) -> list[dict]: ...
+
+    async def search_organizations_with_pagination(
+        self, filters: OrganizationFilters, page: int, limit: int
+    ) -> list[dict]: ...
+
+    async def get_activity_facets_in_area(self, area: OrganizationFilters) -> list[dict]: ...
+
+    async def get_organizations_in_radius_batch(self, request: BatchRadiusRequest) -> dict: ...
+
+
+class BuildingService(Protocol):
+    async def get_building_by_id(self, building_id: int) -> dict: ...
+
+    async def get_buildings_in_bbox(
+        self, lat_min: float, lon_min: float, lat_max: float, lon_max: float, after_id: int, limit: int
+    ) -> dict: ...
+
+    async def get_buildings_in_radius(
+        self, latitude: float, longitude: float, radius: float, after_id: int, limit: int
+    ) -> dict: ...
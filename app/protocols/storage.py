@@ -1,6 +1,14 @@
 from typing import Protocol
 
-from domain.schemas import OrganizationRead
+from domain.filters import (
+    OrganizationFilters,
+    RadiusQuery,
+)
+from domain.schemas import (
+    ActivityFacetRead,
+    BuildingSummaryRead,
+    OrganizationRead,
+)
 
 
 class Storage(Protocol):
@@ -16,6 +24,10 @@ class Storage(Protocol):
 
     async def get_organization_by_name(self, name: str) -> OrganizationRead | None: ...
 
+    async def search_organizations_by_name_with_pagination(
+        self, name: str, page: int, limit: int
+    ) -> list[OrganizationRead] | None: ...
+
     async def get_organizations_in_radius_with_pagination(
         self, latitude: float, longitude: float, radius: float, page: int, limit: int
     ) -> list[OrganizationRead] | None: ...
@@ -27,3 +39,23 @@ class Storage(Protocol):
     async def get_organizations_by_nested_activity_id_with_pagination(
         self, activity_id: int, page: int, limit: int
     ) -> list[OrganizationRead] | None: ...
+
+    async def search_organizations_with_pagination(
+        self, filters: OrganizationFilters, page: int, limit: int
+    ) -> list[OrganizationRead] | None: ...
+
+    async def get_activity_facets(self, filters: OrganizationFilters) -> list[ActivityFacetRead]: ...
+
+    async def get_organizations_in_radius_batch(
+        self, queries: list[RadiusQuery], limit: int
+    ) -> tuple[list[list[int]], list[OrganizationRead]]: ...
+
+    async def get_building_by_id(self, building_id: int) -> BuildingSummaryRead | None: ...
+
+    async def get_buildings_in_bbox(
+        self, lat_min: float, lon_min: float, lat_max: float, lon_max: float, after_id: int, limit: int
+    ) -> list[BuildingSummaryRead]: ...
+
+    async def get_buildings_in_radius(
+        self, latitude: float, longitude: float, radius: float, after_id: int, limit: int
+    ) -> list[BuildingSummaryRead]: ...
@@ -0,0 +1,137 @@
+import asyncio
+from collections import defaultdict
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+
+from database import DatabaseSessionManager
+from domain.models import (
+    Activity,
+    Organization,
+    organization_activity,
+)
+from protocols.autocomplete import AutocompleteSource
+from repository.sharding import ShardMap
+from sqlalchemy import (
+    func,
+    select,
+)
+from sqlalchemy.ext.asyncio import AsyncSession
+
+
+class PostgresAutocompleteSource:
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def get_organization_entries(self, ids: list[int] | None = None) -> list[tuple[int, str, float]]:
+        """
+        Returns organization names weighted by the number of their activities
+        Args:
+            ids: Organization ids, all organizations when not given
+
+        Returns:
+            list[tuple[int, str, float]]: Organization id, name and weight
+        """
+        query = (
+            select(Organization.id, Organization.name, func.count(organization_activity.c.activity_id))
+            .outerjoin(organization_activity, organization_activity.c.organization_id == Organization.id)
+            .group_by(Organization.id)
+        )
+        if ids is not None:
+            query = query.where(Organization.id.in_(ids))
+
+        result = await self.session.execute(query)
+
+        return [(id_, name, float(weight)) for id_, name, weight in result.all()]
+
+    async def get_activity_entries(self, ids: list[int] | None = None) -> list[tuple[int, str, float]]:
+        """
+        Returns activity names weighted by the number of organizations having the activity
+        Args:
+            ids: Activity ids, all activities when not given
+
+        Returns:
+            list[tuple[int, str, float]]: Activity id, name and weight
+        """
+        query = (
+            select(Activity.id, Activity.name, func.count(organization_activity.c.organization_id))
+            .outerjoin(organization_activity, organization_activity.c.activity_id == Activity.id)
+            .group_by(Activity.id)
+        )
+        if ids is not None:
+            query = query.where(Activity.id.in_(ids))
+
+        result = await self.session.execute(query)
+
+        return [(id_, name, float(weight)) for id_, name, weight in result.all()]
+
+
+class ShardedAutocompleteSource:
+    """
+    Autocomplete entries read from every shard: organizations come with the ids of their shard, which the sharded
+    storage routes by, activities exist in every shard and their weights are summed
+    """
+
+    def __init__(self, shards: ShardMap):
+        self.shards = shards
+
+    async def get_organization_entries(self, ids: list[int] | None = None) -> list[tuple[int, str, float]]:
+        """
+        Returns organization names weighted by the number of their activities
+        Args:
+            ids: Organization ids, all organizations when not given
+
+        Returns:
+            list[tuple[int, str, float]]: Organization id, name and weight
+        """
+        shard_ids = {shard: None for shard in self.shards.shards}
+        if ids is not None:
+            shard_ids = defaultdict(list)
+            for id_ in ids:
+                shard = self.shards.for_id(id_)
+                if shard is not None:
+                    shard_ids[shard].append(id_)
+
+        async def read(shard, ids):
+            async with shard.sessionmanager.session() as session:
+                return await PostgresAutocompleteSource(session).get_organization_entries(ids)
+
+        results = await asyncio.gather(*(read(shard, ids) for shard, ids in shard_ids.items()))
+
+        return [entry for entries in results for entry in entries]
+
+    async def get_activity_entries(self, ids: list[int] | None = None) -> list[tuple[int, str, float]]:
+        """
+        Returns activity names weighted by the number of organizations having the activity in all shards
+        Args:
+            ids: Activity ids, all activities when not given
+
+        Returns:
+            list[tuple[int, str, float]]: Activity id, name and weight
+        """
+
+        async def read(shard):
+            async with shard.sessionmanager.session() as session:
+                return await PostgresAutocompleteSource(session).get_activity_entries(ids)
+
+        names, weights = {}, defaultdict(float)
+        for entries in await asyncio.gather(*(read(shard) for shard in self.shards.shards)):
+            for id_, name, weight in entries:
+                names[id_] = name
+                weights[id_] += weight
+
+        return [(id_, name, weights[id_]) for id_, name in names.items()]
+
+
+@asynccontextmanager
+async def open_postgres_autocomplete_source(
+    sessionmanager: DatabaseSessionManager,
+) -> AsyncIterator[AutocompleteSource]:
+    """Autocomplete source over a session of the database, closed on exit"""
+    async with sessionmanager.session() as session:
+        yield PostgresAutocompleteSource(session)
+
+
+@asynccontextmanager
+async def open_sharded_autocomplete_source(shards: ShardMap) -> AsyncIterator[AutocompleteSource]:
+    """Autocomplete source over the shards, every read opens its own shard sessions"""
+    yield ShardedAutocompleteSource(shards)
@@ -0,0 +1,301 @@
+import json
+import time
+from dataclasses import (
+    dataclass,
+    field,
+)
+from typing import (
+    AsyncIterable,
+    Iterable,
+)
+
+import asyncpg
+from domain.models import (
+    Activity,
+    Building,
+    Organization,
+)
+from services.change_listener import CHANGE_CHANNEL
+
+# Guards the closure rebuild against cycles in the parent references of the loaded activities
+MAX_HIERARCHY_DEPTH = 64
+
+BuildingRecord = tuple[int, str, float, float]
+ActivityRecord = tuple[int, str, int | None]
+OrganizationRecord = tuple[int, str, str, int, list[int]]
+
+# seq numbers the rows in COPY order, a row staged again for the same id replaces the earlier ones
+STAGING_TABLES = """
+CREATE TEMP TABLE stage_buildings (
+    seq bigserial, id integer, address text, latitude float8, longitude float8
+) ON COMMIT DROP;
+CREATE TEMP TABLE stage_activities (seq bigserial, id integer, name text, parent_id integer) ON COMMIT DROP;
+CREATE TEMP TABLE stage_organizations (
+    seq bigserial, id integer, name text, phone text, building_id integer, activity_ids integer[]
+) ON COMMIT DROP;
+"""
+
+# the last staged row of an id wins, it is kept before the checks so a rejected last row leaves the id untouched
+# instead of letting an earlier row through
+DROP_SUPERSEDED = """
+DELETE FROM {table} s
+WHERE EXISTS (SELECT 1 FROM {table} l WHERE l.id = s.id AND l.seq > s.seq)
+"""
+
+# staged rows that would not fit the real tables are rejected and counted instead of failing the whole load,
+# longitudes are held to -180..180 although longitude_range_check only bounds them from below
+REJECT_BUILDINGS = f"""
+DELETE FROM stage_buildings
+WHERE id IS NULL OR address IS NULL OR latitude IS NULL OR longitude IS NULL
+    OR length(address) > {Building.address.type.length}
+    OR NOT latitude BETWEEN -90 AND 90
+    OR NOT longitude BETWEEN -180 AND 180
+"""
+
+# organizations linking to a rejected activity lose that link, activities below it become roots
+REJECT_ACTIVITIES = f"""
+DELETE FROM stage_activities
+WHERE id IS NULL OR name IS NULL OR length(name) > {Activity.name.type.length}
+"""
+
+# also rejects organizations referencing a building that is neither loaded nor already present, so their
+# current activity links are kept
+REJECT_ORGANIZATIONS = f"""
+DELETE FROM stage_organizations s
+WHERE s.id IS NULL OR s.name IS NULL OR s.phone IS NULL OR s.building_id IS NULL
+    OR length(s.name) > {Organization.name.type.length}
+    OR length(s.phone) > {Organization.phone.type.length}
+    OR NOT EXISTS (SELECT 1 FROM buildings b WHERE b.id = s.building_id)
+"""
+
+# organization names are unique: every staged organization sharing its name with another staged one is rejected,
+# so is one taking the name of an existing organization, even if that organization is renamed by the same load,
+# since the unique index is checked row by row
+REJECT_ORGANIZATION_NAME_CONFLICTS = """
+DELETE FROM stage_organizations s
+WHERE s.name IN (SELECT name FROM stage_organizations GROUP BY name HAVING count(*) > 1)
+    OR EXISTS (SELECT 1 FROM organizations o WHERE o.name = s.name AND o.id <> s.id)
+"""
+
+UPSERT_BUILDINGS = """
+INSERT INTO buildings (id, address, latitude, longitude)
+SELECT id, address, latitude, longitude FROM stage_buildings
+ON CONFLICT (id) DO UPDATE
+SET address = EXCLUDED.address, latitude = EXCLUDED.latitude, longitude = EXCLUDED.longitude
+"""
+
+UPSERT_ACTIVITIES = """
+INSERT INTO activities (id, name)
+SELECT id, name FROM stage_activities
+ON CONFLICT (id) DO UPDATE SET name = EXCLUDED.name
+"""
+
+UPSERT_ORGANIZATIONS = """
+INSERT INTO organizations (id, name, phone, building_id)
+SELECT id, name, phone, building_id FROM stage_organizations
+ON CONFLICT (id) DO UPDATE SET name = EXCLUDED.name, phone = EXCLUDED.phone, building_id = EXCLUDED.building_id
+"""
+
+DELETE_ORGANIZATION_ACTIVITIES = """
+DELETE FROM organization_activity oa
+USING stage_organizations s
+WHERE oa.organization_id = s.id
+"""
+
+# links to unknown activities are dropped
+INSERT_ORGANIZATION_ACTIVITIES = """
+INSERT INTO organization_activity (organization_id, activity_id)
+SELECT DISTINCT o.id, a.id
+FROM stage_organizations s
+JOIN organizations o ON o.id = s.id
+CROSS JOIN LATERAL unnest(s.activity_ids) AS link(activity_id)
+JOIN activities a ON a.id = link.activity_id
+ON CONFLICT DO NOTHING
+"""
+
+# parent edges: loaded activities take the parent from the input, others keep their current parent
+BUILD_ACTIVITY_CLOSURE = f"""
+CREATE TEMP TABLE stage_activity_closures ON COMMIT DROP AS
+WITH RECURSIVE edges AS (
+    SELECT s.id AS child_id, s.parent_id
+    FROM stage_activities s
+    JOIN activities p ON p.id = s.parent_id
+    UNION ALL
+    SELECT c.descendant_id, c.ancestor_id
+    FROM activities_closures c
+    WHERE c.depth = 1 AND NOT EXISTS (SELECT 1 FROM stage_activities s WHERE s.id = c.descendant_id)
+), closure AS (
+    SELECT id AS ancestor_id, id AS descendant_id, 0 AS depth FROM activities
+    UNION ALL
+    SELECT e.parent_id, c.descendant_id, c.depth + 1
+    FROM closure c
+    JOIN edges e ON e.child_id = c.ancestor_id
+    WHERE c.depth < {MAX_HIERARCHY_DEPTH}
+)
+SELECT ancestor_id, descendant_id, min(depth) AS depth FROM closure GROUP BY ancestor_id, descendant_id
+"""
+
+# the closure is replaced by difference rather than truncated, so readers are never blocked
+DELETE_STALE_CLOSURES = """
+DELETE FROM activities_closures c
+WHERE NOT EXISTS (
+    SELECT 1 FROM stage_activity_closures n
+    WHERE n.ancestor_id = c.ancestor_id AND n.descendant_id = c.descendant_id AND n.depth = c.depth
+)
+"""
+
+INSERT_NEW_CLOSURES = """
+INSERT INTO activities_closures (ancestor_id, descendant_id, depth)
+SELECT n.ancestor_id, n.descendant_id, n.depth
+FROM stage_activity_closures n
+WHERE NOT EXISTS (
+    SELECT 1 FROM activities_closures c WHERE c.ancestor_id = n.ancestor_id AND c.descendant_id = n.descendant_id
+)
+"""
+
+# materialized paths follow the new closure, only the activities whose path changed are written
+UPDATE_ACTIVITY_PATHS = """
+UPDATE activities a
+SET path = p.path, depth = p.depth
+FROM (
+    SELECT
+        descendant_id AS id,
+        string_agg(ancestor_id::text || '.', '' ORDER BY depth DESC) AS path,
+        max(depth) AS depth
+    FROM stage_activity_closures
+    GROUP BY descendant_id
+) AS p
+WHERE p.id = a.id AND (a.path IS DISTINCT FROM p.path OR a.depth IS DISTINCT FROM p.depth)
+"""
+
+# sequences only move forward, a shard keeps the start of its id range set by tools.split_shards
+SYNC_SEQUENCES = """
+SELECT setval(
+    pg_get_serial_sequence(t.name, 'id'),
+    greatest(t.max_id, pg_sequence_last_value(pg_get_serial_sequence(t.name, 'id')::regclass), 1)
+)
+FROM (
+    VALUES
+        ('buildings', (SELECT max(id) FROM buildings)),
+        ('activities', (SELECT max(id) FROM activities)),
+        ('organizations', (SELECT max(id) FROM organizations)),
+        ('activities_closures', (SELECT max(id) FROM activities_closures))
+) AS t(name, max_id)
+"""
+
+
+@dataclass
+class PhaseReport:
+    name: str
+    rows: int
+    seconds: float
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows / self.seconds if self.seconds else 0.0
+
+
+@dataclass
+class IngestReport:
+    phases: list[PhaseReport] = field(default_factory=list)
+
+    @property
+    def seconds(self) -> float:
+        return sum(phase.seconds for phase in self.phases)
+
+    def __str__(self) -> str:
+        lines = [
+            f"{phase.name:<32} {phase.rows:>12} rows {phase.seconds:>9.2f}s {phase.rows_per_second:>12.0f} rows/s"
+            for phase in self.phases
+        ]
+        lines.append(f"{'total':<32} {'':>12}      {self.seconds:>9.2f}s")
+
+        return "\n".join(lines)
+
+
+class PostgresBulkIngest:
+    """
+    Loads buildings, activities and organizations through COPY into temporary staging tables and merges them into
+    the real tables with set-based statements, all in one transaction
+
+    Row-level change notifications are suppressed, listeners get a single resync notification on commit.
+    """
+
+    def __init__(self, connection: asyncpg.Connection):
+        self.connection = connection
+        self.report = IngestReport()
+
+    async def run(
+        self,
+        buildings: Iterable[BuildingRecord] | AsyncIterable[BuildingRecord] = (),
+        activities: Iterable[ActivityRecord] | AsyncIterable[ActivityRecord] = (),
+        organizations: Iterable[OrganizationRecord] | AsyncIterable[OrganizationRecord] = (),
+    ) -> IngestReport:
+        """
+        Streams the records into the database
+        Args:
+            buildings: Building id, address, latitude and longitude
+            activities: Activity id, name and parent activity id or None for roots
+            organizations: Organization id, name, phone, building id and activity ids
+
+        Returns:
+            IngestReport: Rows and timings per phase
+        """
+        async with self.connection.transaction():
+            await self.connection.execute("SET LOCAL app.suppress_change_notify = 'on'")
+            await self.connection.execute(STAGING_TABLES)
+
+            await self._copy("stage_buildings", ["id", "address", "latitude", "longitude"], buildings)
+            await self._copy("stage_activities", ["id", "name", "parent_id"], activities)
+            await self._copy(
+                "stage_organizations", ["id", "name", "phone", "building_id", "activity_ids"], organizations
+            )
+
+            for entity in ("buildings", "activities", "organizations"):
+                await self._execute(f"drop superseded {entity}", DROP_SUPERSEDED.format(table=f"stage_{entity}"))
+
+            await self._execute("reject buildings", REJECT_BUILDINGS)
+            await self._execute("reject activities", REJECT_ACTIVITIES)
+            await self._execute("upsert buildings", UPSERT_BUILDINGS)
+            await self._execute("upsert activities", UPSERT_ACTIVITIES)
+            await self._execute("reject organizations", REJECT_ORGANIZATIONS)
+            await self._execute("reject organization name conflicts", REJECT_ORGANIZATION_NAME_CONFLICTS)
+            await self._execute("upsert organizations", UPSERT_ORGANIZATIONS)
+            await self._execute("delete organization activities", DELETE_ORGANIZATION_ACTIVITIES)
+            await self._execute("insert organization activities", INSERT_ORGANIZATION_ACTIVITIES)
+
+            if await self.connection.fetchval("SELECT EXISTS (SELECT 1 FROM stage_activities)"):
+                await self._execute("build activity closure", BUILD_ACTIVITY_CLOSURE)
+                await self._execute("delete stale closure rows", DELETE_STALE_CLOSURES)
+                await self._execute("insert new closure rows", INSERT_NEW_CLOSURES)
+                await self._execute("update activity paths", UPDATE_ACTIVITY_PATHS)
+
+            await self.connection.execute(SYNC_SEQUENCES)
+            await self.connection.execute("SELECT pg_notify($1, $2)", CHANGE_CHANNEL, json.dumps({"op": "resync"}))
+
+        return self.report
+
+    async def _copy(self, table: str, columns: list[str], records: Iterable | AsyncIterable):
+        rows = 0
+
+        async def counted():
+            nonlocal rows
+            if isinstance(records, AsyncIterable):
+                async for record in records:
+                    rows += 1
+                    yield record
+            else:
+                for record in records:
+                    rows += 1
+                    yield record
+
+        started = time.perf_counter()
+        await self.connection.copy_records_to_table(table, records=counted(), columns=columns)
+        self.report.phases.append(PhaseReport(f"copy {table}", rows, time.perf_counter() - started))
+
+    async def _execute(self, name: str, statement: str):
+        started = time.perf_counter()
+        status = await self.connection.execute(statement)
+        # command tags look like "INSERT 0 42", "DELETE 42" or "SELECT 42"
+        rows = int(status.rsplit(" ", 1)[-1]) if status.rsplit(" ", 1)[-1].isdigit() else 0
+        self.report.phases.append(PhaseReport(name, rows, time.perf_counter() - started))
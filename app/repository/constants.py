@@ -1,3 +1,16 @@
 EARTH_RADIUS_KM = 6371
 
 NESTED_DEPTH = 3
+
+# pg_trgm default for the <% operator (pg_trgm.word_similarity_threshold), mirrored by in-process search
+WORD_SIMILARITY_THRESHOLD = 0.6
+
+# composite search planner: grid cell of the organization density histogram (degrees), seconds statistics stay fresh
+# and guessed shares of organizations matching a name or address filter, which have no cheap statistics
+DENSITY_CELL_DEGREES = 0.1
+FILTER_STATISTICS_TTL = 300
+NAME_FILTER_SELECTIVITY = 0.001
+ADDRESS_FILTER_SELECTIVITY = 0.01
+
+# escape character of LIKE patterns built in Python, the one SQLAlchemy autoescape uses
+LIKE_ESCAPE = "/"
@@ -0,0 +1,41 @@
+from typing import AsyncIterator
+
+import asyncpg
+
+# column order is the order of services.export.export_schema()
+EXPORT_ORGANIZATIONS = """
+SELECT
+    o.id,
+    o.name,
+    o.phone,
+    o.building_id,
+    b.address,
+    b.latitude,
+    b.longitude,
+    ARRAY(
+        SELECT oa.activity_id FROM organization_activity oa WHERE oa.organization_id = o.id ORDER BY oa.activity_id
+    ) AS activity_ids
+FROM organizations o
+JOIN buildings b ON b.id = o.building_id
+ORDER BY o.id
+"""
+
+
+class PostgresExportSource:
+    def __init__(self, connection: asyncpg.Connection):
+        self.connection = connection
+
+    async def batches(self, batch_size: int) -> AsyncIterator[list[asyncpg.Record]]:
+        """
+        Reads organizations with their building and activity ids through a server-side cursor
+        The whole export sees one snapshot of the database, rows are never loaded all at once
+        Args:
+            batch_size: Rows per batch
+
+        Returns:
+            AsyncIterator[list[asyncpg.Record]]: Batches of rows ordered by organization id
+        """
+        async with self.connection.transaction(isolation="repeatable_read", readonly=True):
+            cursor = await self.connection.cursor(EXPORT_ORGANIZATIONS)
+            while rows := await cursor.fetch(batch_size):
+                yield rows
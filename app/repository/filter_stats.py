@@ -0,0 +1,241 @@
+"""
+Cardinality estimates for the composite search planner
+
+Statistics are small aggregates (organizations per activity, activity subtrees, a coarse grid of organization
+density) loaded from Postgres and kept for FILTER_STATISTICS_TTL seconds, or derived once per snapshot. An estimate
+is then a few dictionary lookups, so choosing the driving filter costs no database round trip.
+"""
+
+import asyncio
+import math
+from collections import defaultdict
+from dataclasses import dataclass
+from time import monotonic
+
+from domain.filters import (
+    FilterKind,
+    OrganizationFilters,
+)
+from domain.models import (
+    ActivityClosure,
+    Building,
+    Organization,
+    organization_activity,
+)
+from repository.constants import (
+    ADDRESS_FILTER_SELECTIVITY,
+    DENSITY_CELL_DEGREES,
+    FILTER_STATISTICS_TTL,
+    NAME_FILTER_SELECTIVITY,
+    NESTED_DEPTH,
+)
+from repository.geo import radius_bounding_box
+from repository.snapshot import Snapshot
+from sqlalchemy import (
+    func,
+    select,
+)
+from sqlalchemy.ext.asyncio import AsyncSession
+
+
+@dataclass(frozen=True)
+class FilterStatistics:
+    organization_count: int
+    building_count: int
+    activity_organization_counts: dict[int, int]
+    # activity id -> ids of the activity and its descendants down to NESTED_DEPTH
+    nested_activities: dict[int, tuple[int, ...]]
+    # (latitude cell, longitude cell) -> organizations
+    density: dict[tuple[int, int], int]
+    cell: float = DENSITY_CELL_DEGREES
+
+    def estimate(self, kind: FilterKind, filters: OrganizationFilters) -> float:
+        """
+        Returns the expected number of organizations matching one filter alone
+        Args:
+            kind: Filter kind
+            filters: Filters holding the parameters of the kind
+
+        Returns:
+            float: Expected number of organizations
+        """
+        if kind == "building":
+            return self.organization_count / max(self.building_count, 1)
+        if kind == "activity":
+            return self.activity_organization_counts.get(filters.activity_id, 0)
+        if kind == "nested_activity":
+            return min(
+                self.organization_count,
+                sum(
+                    self.activity_organization_counts.get(activity_id, 0)
+                    for activity_id in self.nested_activities.get(filters.nested_activity_id, ())
+                ),
+            )
+        if kind == "bbox":
+            return self._estimate_box(filters.lat_min, filters.lat_max, filters.lon_min, filters.lon_max)
+        if kind == "radius":
+            lat_min, lat_max, lon_min, lon_max = radius_bounding_box(
+                filters.latitude, filters.longitude, filters.radius
+            )
+            if lon_min is None:
+                return self._estimate_box(lat_min, lat_max, -180.0, 180.0)
+            # a circle covers pi / 4 of its bounding square
+            return self._estimate_box(lat_min, lat_max, lon_min, lon_max) * math.pi / 4
+        if kind == "name":
+            return self.organization_count * NAME_FILTER_SELECTIVITY
+
+        return self.organization_count * ADDRESS_FILTER_SELECTIVITY
+
+    def _estimate_box(self, lat_min: float, lat_max: float, lon_min: float, lon_max: float) -> float:
+        """Sums the density cells overlapping the box, partially covered cells in proportion to the overlap"""
+        first_lat, last_lat = math.floor(lat_min / self.cell), math.floor(lat_max / self.cell)
+        first_lon, last_lon = math.floor(lon_min / self.cell), math.floor(lon_max / self.cell)
+
+        if (last_lat - first_lat + 1) * (last_lon - first_lon + 1) > len(self.density):
+            cells = [
+                (cell, count)
+                for cell, count in self.density.items()
+                if first_lat <= cell[0] <= last_lat and first_lon <= cell[1] <= last_lon
+            ]
+        else:
+            cells = [
+                ((lat_cell, lon_cell), self.density[lat_cell, lon_cell])
+                for lat_cell in range(first_lat, last_lat + 1)
+                for lon_cell in range(first_lon, last_lon + 1)
+                if (lat_cell, lon_cell) in self.density
+            ]
+
+        total = 0.0
+        for (lat_cell, lon_cell), count in cells:
+            lat_share = self._overlap(lat_min, lat_max, lat_cell, -90.0, 90.0)
+            lon_share = self._overlap(lon_min, lon_max, lon_cell, -180.0, 180.0)
+            total += count * lat_share * lon_share
+
+        return total
+
+    def _overlap(self, low: float, high: float, cell: int, axis_min: float, axis_max: float) -> float:
+        """
+        Share of a cell covered by the range [low, high] of one axis. A cell is cut to the coordinate range, the cell
+        starting at its upper edge (latitude 90, longitude 180) holds points on the edge only and counts as a whole
+        when the range reaches the edge
+        """
+        start, end = max(cell * self.cell, axis_min), min((cell + 1) * self.cell, axis_max)
+        if end <= start:
+            return 1.0 if low <= start <= high else 0.0
+
+        return max(min(high, end) - max(low, start), 0.0) / (end - start)
+
+
+async def load_filter_statistics(session: AsyncSession) -> FilterStatistics:
+    """
+    Aggregates filter statistics in the database
+    Args:
+        session: Database session
+
+    Returns:
+        FilterStatistics: Statistics
+    """
+    organization_count = await session.scalar(select(func.count()).select_from(Organization))
+    building_count = await session.scalar(select(func.count()).select_from(Building))
+
+    activity_counts = await session.execute(
+        select(organization_activity.c.activity_id, func.count()).group_by(organization_activity.c.activity_id)
+    )
+
+    nested_activities = defaultdict(list)
+    closures = await session.execute(
+        select(ActivityClosure.ancestor_id, ActivityClosure.descendant_id).where(ActivityClosure.depth <= NESTED_DEPTH)
+    )
+    for ancestor_id, descendant_id in closures:
+        nested_activities[ancestor_id].append(descendant_id)
+
+    lat_cell = func.floor(Building.latitude / DENSITY_CELL_DEGREES)
+    lon_cell = func.floor(Building.longitude / DENSITY_CELL_DEGREES)
+    density = await session.execute(
+        select(lat_cell, lon_cell, func.count(Organization.id))
+        .join(Organization, Organization.building_id == Building.id)
+        .group_by(lat_cell, lon_cell)
+    )
+
+    return FilterStatistics(
+        organization_count=organization_count,
+        building_count=building_count,
+        activity_organization_counts=dict(activity_counts.tuples().all()),
+        nested_activities={ancestor_id: tuple(ids) for ancestor_id, ids in nested_activities.items()},
+        density={(int(lat), int(lon)): count for lat, lon, count in density},
+    )
+
+
+def snapshot_filter_statistics(snapshot: Snapshot) -> FilterStatistics:
+    """
+    Derives filter statistics from a snapshot
+    Args:
+        snapshot: Snapshot
+
+    Returns:
+        FilterStatistics: Statistics
+    """
+    activity_ids = snapshot.activity_ids
+    offsets = snapshot.activity_org_offsets
+    nested_activities = {}
+    for activity, activity_id in enumerate(activity_ids):
+        start, end = snapshot.closure_offsets[activity], snapshot.closure_offsets[activity + 1]
+        nested_activities[activity_id] = tuple(
+            activity_ids[descendant]
+            for descendant, depth in zip(snapshot.closure_descendants[start:end], snapshot.closure_depths[start:end])
+            if depth <= NESTED_DEPTH
+        )
+
+    density = defaultdict(int)
+    for building in range(len(snapshot.building_ids)):
+        cell = (
+            math.floor(snapshot.building_latitudes[building] / DENSITY_CELL_DEGREES),
+            math.floor(snapshot.building_longitudes[building] / DENSITY_CELL_DEGREES),
+        )
+        density[cell] += snapshot.building_org_offsets[building + 1] - snapshot.building_org_offsets[building]
+
+    return FilterStatistics(
+        organization_count=len(snapshot.org_ids),
+        building_count=len(snapshot.building_ids),
+        activity_organization_counts={
+            activity_id: offsets[activity + 1] - offsets[activity] for activity, activity_id in enumerate(activity_ids)
+        },
+        nested_activities=nested_activities,
+        density=dict(density),
+    )
+
+
+class FilterStatisticsCache:
+    """
+    Keeps database statistics for ttl seconds. Only one request refreshes them, the others keep using
+    the stale statistics meanwhile
+    """
+
+    def __init__(self, ttl: float = FILTER_STATISTICS_TTL):
+        self.ttl = ttl
+        self._statistics: FilterStatistics | None = None
+        self._loaded_at = 0.0
+        self._lock = asyncio.Lock()
+        self._snapshot: Snapshot | None = None
+        self._snapshot_statistics: FilterStatistics | None = None
+
+    async def get(self, session: AsyncSession) -> FilterStatistics:
+        if self._statistics is not None and (monotonic() - self._loaded_at < self.ttl or self._lock.locked()):
+            return self._statistics
+
+        async with self._lock:
+            if self._statistics is None or monotonic() - self._loaded_at >= self.ttl:
+                self._statistics = await load_filter_statistics(session)
+                self._loaded_at = monotonic()
+
+        return self._statistics
+
+    def for_snapshot(self, snapshot: Snapshot) -> FilterStatistics:
+        if self._snapshot is not snapshot:
+            self._snapshot_statistics = snapshot_filter_statistics(snapshot)
+            self._snapshot = snapshot
+
+        return self._snapshot_statistics
+
+
+filter_statistics = FilterStatisticsCache()
@@ -0,0 +1,53 @@
+import math
+
+from repository.constants import EARTH_RADIUS_KM
+
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+
+
+def radius_bounding_box(
+    latitude: float, longitude: float, radius: float
+) -> tuple[float, float, float | None, float | None]:
+    """
+    Returns the bounding box enclosing a circle on the sphere, used as an index-friendly prefilter for radius queries
+    Args:
+        latitude: Latitude of the center
+        longitude: Longitude of the center
+        radius: Radius in kilometers
+
+    Returns:
+        tuple: Minimum and maximum latitude, minimum and maximum longitude or None when the circle reaches a pole or
+            crosses the antimeridian and longitude can't be bounded
+    """
+    lat_delta = radius / KM_PER_DEGREE
+    lat_min = max(latitude - lat_delta, -90.0)
+    lat_max = min(latitude + lat_delta, 90.0)
+
+    if lat_min <= -90.0 or lat_max >= 90.0:
+        return lat_min, lat_max, None, None
+
+    lon_delta = lat_delta / math.cos(math.radians(max(abs(lat_min), abs(lat_max))))
+    if longitude - lon_delta < -180.0 or longitude + lon_delta > 180.0:
+        return lat_min, lat_max, None, None
+
+    return lat_min, lat_max, longitude - lon_delta, longitude + lon_delta
+
+
+def great_circle_distance(latitude: float, longitude: float, other_latitude: float, other_longitude: float) -> float:
+    """
+    Returns the distance between two points in kilometers, same spherical law of cosines as the SQL radius queries
+    Args:
+        latitude: Latitude of the first point
+        longitude: Longitude of the first point
+        other_latitude: Latitude of the second point
+        other_longitude: Longitude of the second point
+
+    Returns:
+        float: Distance in kilometers
+    """
+    lat, other_lat = math.radians(latitude), math.radians(other_latitude)
+    cosine = math.cos(lat) * math.cos(other_lat) * math.cos(
+        math.radians(other_longitude) - math.radians(longitude)
+    ) + math.sin(lat) * math.sin(other_lat)
+
+    return EARTH_RADIUS_KM * math.acos(min(1.0, max(-1.0, cosine)))
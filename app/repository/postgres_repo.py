@@ -1,34 +1,95 @@
+from time import perf_counter
+
 from domain.adapters import (
+    activity_facets_adapter,
+    building_summaries_adapter,
+    building_summary_adapter,
     organization_adapter,
     organizations_adapter,
 )
-from domain.models import (
-    Activity,
-    ActivityClosure,
-    Building,
-    Organization,
-    organization_activity,
+from domain.filters import (
+    OrganizationFilters,
+    RadiusQuery,
+)
+from domain.normalization import normalize_name
+from domain.schemas import (
+    ActivityFacetRead,
+    BuildingSummaryRead,
+    OrganizationRead,
+)
+from observability.load import pool_wait
+from observability.metrics import (
+    DB_POOL_CHECKOUT_DURATION,
+    DB_SESSION_EXECUTE_DURATION,
+    SERIALIZATION_DURATION,
+)
+from repository.filter_stats import (
+    FilterStatisticsCache,
+    filter_statistics,
+)
+from repository.planner import plan_filters
+from repository.queries import (
+    ActivityHierarchy,
+    activity_facets_query,
+    building_by_id_query,
+    buildings_in_bbox_query,
+    buildings_in_radius_query,
+    organization_ids_in_radius_batch_query,
+    organizations_by_filters_query,
+    organizations_by_ids_query,
 )
-from domain.schemas import OrganizationRead
-from repository.constants import (
-    EARTH_RADIUS_KM,
-    NESTED_DEPTH,
+from repository.statements import (
+    ORGANIZATION_BY_ID,
+    ORGANIZATION_BY_NAME,
+    ORGANIZATIONS_BY_ACTIVITY_ID,
+    ORGANIZATIONS_BY_BUILDING_ID,
+    ORGANIZATIONS_BY_NESTED_ACTIVITY_ID,
+    ORGANIZATIONS_BY_NESTED_ACTIVITY_PATH,
+    ORGANIZATIONS_IN_BBOX,
+    ORGANIZATIONS_IN_RADIUS,
+    ORGANIZATIONS_SEARCH_BY_NAME,
+    ORGANIZATIONS_SEARCH_BY_NAME_RANKED,
+    in_radius_params,
+    search_by_name_params,
 )
 from sqlalchemy import (
-    distinct,
-    func,
-    select,
+    Executable,
+    Result,
 )
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import (
-    joinedload,
-    selectinload,
-)
 
 
 class PostgresStorage:
-    def __init__(self, session: AsyncSession):
+    def __init__(
+        self,
+        session: AsyncSession,
+        hierarchy: ActivityHierarchy = "closure",
+        statistics: FilterStatisticsCache = filter_statistics,
+    ):
         self.session = session
+        self.hierarchy = hierarchy
+        # planner statistics of the database behind the session, every shard keeps its own
+        self.statistics = statistics
+
+    async def _execute(self, query: Executable, params: dict | None = None) -> Result:
+        """
+        Executes a query, timing the pool checkout separately when the session has no connection yet
+        Args:
+            query: Query to execute
+            params: Values of its bound parameters
+
+        Returns:
+            Result: Query result
+        """
+        if not self.session.in_transaction():
+            started = perf_counter()
+            await self.session.connection()
+            waited = perf_counter() - started
+            DB_POOL_CHECKOUT_DURATION.observe(waited)
+            pool_wait.observe(waited)
+
+        with DB_SESSION_EXECUTE_DURATION.time():
+            return await self.session.execute(query, params)
 
     async def get_organizations_by_building_id_with_pagination(
         self, building_id: int, page: int, limit: int
@@ -44,23 +105,17 @@ class PostgresStorage:
             list[OrganizationRead]: List of organizations
         """
         offset: int = (page - 1) * limit
-        query = (
-            select(Organization)
-            .options(joinedload(Organization.building), selectinload(Organization.activities))
-            .filter_by(building_id=building_id)
-            .order_by(Organization.id)
-            .offset(offset)
-            .limit(limit)
+        result = await self._execute(
+            ORGANIZATIONS_BY_BUILDING_ID, {"building_id": building_id, "offset": offset, "limit": limit}
         )
 
-        result = await self.session.execute(query)
-
         organizations_orm = result.scalars().all()
 
         if not result:
             return
 
-        organizations_dto = organizations_adapter.validate_python(organizations_orm)
+        with SERIALIZATION_DURATION.time("validate"):
+            organizations_dto = organizations_adapter.validate_python(organizations_orm)
 
         return organizations_dto
 
@@ -79,24 +134,17 @@ class PostgresStorage:
 
         """
         offset: int = (page - 1) * limit
-        query = (
-            select(Organization)
-            .join(Organization.activities)
-            .filter(Activity.id == activity_id)
-            .options(joinedload(Organization.building), selectinload(Organization.activities))
-            .order_by(Organization.id)
-            .offset(offset)
-            .limit(limit)
+        result = await self._execute(
+            ORGANIZATIONS_BY_ACTIVITY_ID, {"activity_id": activity_id, "offset": offset, "limit": limit}
         )
 
-        result = await self.session.execute(query)
-
         organizations_orm = result.scalars().all()
 
         if not result:
             return
 
-        organizations_dto = organizations_adapter.validate_python(organizations_orm)
+        with SERIALIZATION_DURATION.time("validate"):
+            organizations_dto = organizations_adapter.validate_python(organizations_orm)
 
         return organizations_dto
 
@@ -109,20 +157,15 @@ class PostgresStorage:
         Returns:
             OrganizationRead: Organization
         """
-        query = (
-            select(Organization)
-            .where(Organization.id == organization_id)
-            .options(joinedload(Organization.building), selectinload(Organization.activities))
-        )
-
-        result = await self.session.execute(query)
+        result = await self._execute(ORGANIZATION_BY_ID, {"organization_id": organization_id})
 
         organization_orm = result.scalars().first()
 
         if not organization_orm:
             return
 
-        organization_dto = organization_adapter.validate_python(organization_orm)
+        with SERIALIZATION_DURATION.time("validate"):
+            organization_dto = organization_adapter.validate_python(organization_orm)
 
         return organization_dto
 
@@ -135,23 +178,73 @@ class PostgresStorage:
         Returns:
             OrganizationRead: Organization
         """
-        query = (
-            select(Organization)
-            .where(Organization.name == name)
-            .options(joinedload(Organization.building), selectinload(Organization.activities))
-        )
-
-        result = await self.session.execute(query)
+        result = await self._execute(ORGANIZATION_BY_NAME, {"name": name})
 
         organization_orm = result.scalars().first()
 
         if not organization_orm:
             return
 
-        organization_dto = organization_adapter.validate_python(organization_orm)
+        with SERIALIZATION_DURATION.time("validate"):
+            organization_dto = organization_adapter.validate_python(organization_orm)
 
         return organization_dto
 
+    async def search_organizations_by_name_with_pagination(
+        self, name: str, page: int, limit: int
+    ) -> list[OrganizationRead] | None:
+        """
+        Returns a ranked list of organizations whose name matches by substring, prefix or trigram similarity
+        Exact matches go first, then prefix matches, then the rest by word similarity
+        Args:
+            name: Part of organization name, case and Latin/Cyrillic lookalikes are ignored
+            page: Page number
+            limit: Limit of items per page
+
+        Returns:
+            list[OrganizationRead]: List of organizations
+        """
+        offset: int = (page - 1) * limit
+        result = await self._execute(
+            ORGANIZATIONS_SEARCH_BY_NAME, search_by_name_params(normalize_name(name), offset, limit)
+        )
+
+        organizations_orm = result.scalars().all()
+
+        if not result:
+            return
+
+        with SERIALIZATION_DURATION.time("validate"):
+            organizations_dto = organizations_adapter.validate_python(organizations_orm)
+
+        return organizations_dto
+
+    async def search_organizations_by_name_ranked(
+        self, name: str, limit: int
+    ) -> list[tuple[tuple[bool, bool, float, int], OrganizationRead]]:
+        """
+        Returns the first organizations of search_organizations_by_name_with_pagination with their sort keys,
+        so result lists of several databases can be merged in the same order
+        Args:
+            name: Part of organization name, case and Latin/Cyrillic lookalikes are ignored
+            limit: Number of organizations
+
+        Returns:
+            list[tuple]: Sort key (not exact, not prefix, negated similarity, id) and organization, in key order
+        """
+        result = await self._execute(
+            ORGANIZATIONS_SEARCH_BY_NAME_RANKED, search_by_name_params(normalize_name(name), 0, limit)
+        )
+        rows = result.all()
+
+        with SERIALIZATION_DURATION.time("validate"):
+            organizations_dto = organizations_adapter.validate_python([row.Organization for row in rows])
+
+        return [
+            ((not row.exact, not row.prefix, -row.similarity, organization.id), organization)
+            for row, organization in zip(rows, organizations_dto)
+        ]
+
     async def get_organizations_in_radius_with_pagination(
         self, latitude: float, longitude: float, radius: float, page: int, limit: int
     ) -> list[OrganizationRead] | None:
@@ -168,33 +261,17 @@ class PostgresStorage:
             list[OrganizationRead]: List of organizations
         """
         offset: int = (page - 1) * limit
-        query = (
-            select(Organization)
-            .join(Organization.building)
-            .filter(
-                EARTH_RADIUS_KM
-                * func.acos(
-                    func.cos(func.radians(latitude))
-                    * func.cos(func.radians(Building.latitude))
-                    * func.cos(func.radians(Building.longitude) - func.radians(longitude))
-                    + func.sin(func.radians(latitude)) * func.sin(func.radians(Building.latitude))
-                )
-                <= radius
-            )
-            .options(joinedload(Organization.building), selectinload(Organization.activities))
-            .order_by(Organization.id)
-            .offset(offset)
-            .limit(limit)
+        result = await self._execute(
+            ORGANIZATIONS_IN_RADIUS, in_radius_params(latitude, longitude, radius, offset, limit)
         )
 
-        result = await self.session.execute(query)
-
         organizations_orm = result.scalars().all()
 
         if not result:
             return
 
-        organizations_dto = organizations_adapter.validate_python(organizations_orm)
+        with SERIALIZATION_DURATION.time("validate"):
+            organizations_dto = organizations_adapter.validate_python(organizations_orm)
 
         return organizations_dto
 
@@ -214,24 +291,25 @@ class PostgresStorage:
             list[OrganizationRead]: List of organizations
         """
         offset: int = (page - 1) * limit
-        query = (
-            select(Organization)
-            .join(Organization.building)
-            .filter(Building.latitude.between(lat_min, lat_max), Building.longitude.between(lon_min, lon_max))
-            .options(joinedload(Organization.building), selectinload(Organization.activities))
-            .order_by(Organization.id)
-            .offset(offset)
-            .limit(limit)
+        result = await self._execute(
+            ORGANIZATIONS_IN_BBOX,
+            {
+                "lat_min": lat_min,
+                "lon_min": lon_min,
+                "lat_max": lat_max,
+                "lon_max": lon_max,
+                "offset": offset,
+                "limit": limit,
+            },
         )
 
-        result = await self.session.execute(query)
-
         organizations_orm = result.scalars().all()
 
         if not result:
             return
 
-        organizations_dto = organizations_adapter.validate_python(organizations_orm)
+        with SERIALIZATION_DURATION.time("validate"):
+            organizations_dto = organizations_adapter.validate_python(organizations_orm)
 
         return organizations_dto
 
@@ -248,31 +326,167 @@ class PostgresStorage:
             list[OrganizationRead]: List of organizations
         """
         offset: int = (page - 1) * limit
-
-        ids_subq = (
-            select(distinct(organization_activity.c.organization_id).label("org_id"))
-            .join(ActivityClosure, organization_activity.c.activity_id == ActivityClosure.descendant_id)
-            .where(ActivityClosure.ancestor_id == activity_id, ActivityClosure.depth <= NESTED_DEPTH)
-            .order_by(organization_activity.c.organization_id)
-            .offset(offset)
-            .limit(limit)
-            .subquery()
+        statement = (
+            ORGANIZATIONS_BY_NESTED_ACTIVITY_PATH if self.hierarchy == "path" else ORGANIZATIONS_BY_NESTED_ACTIVITY_ID
         )
+        result = await self._execute(statement, {"activity_id": activity_id, "offset": offset, "limit": limit})
 
-        query = (
-            select(Organization)
-            .join(ids_subq, Organization.id == ids_subq.c.org_id)
-            .options(joinedload(Organization.building), selectinload(Organization.activities))
-            .order_by(Organization.id)
-        )
+        organizations_orm = result.scalars().all()
+
+        if not result:
+            return
+
+        with SERIALIZATION_DURATION.time("validate"):
+            organizations_dto = organizations_adapter.validate_python(organizations_orm)
+
+        return organizations_dto
+
+    async def search_organizations_with_pagination(
+        self, filters: OrganizationFilters, page: int, limit: int
+    ) -> list[OrganizationRead] | None:
+        """
+        Returns a list of organizations matching all given filters with pagination
+        The filter with the cheapest estimated candidate set drives the query, the others filter its candidates
+        Args:
+            filters: Any combination of organization filters
+            page: Page number
+            limit: Limit of items per page
 
-        result = await self.session.execute(query)
+        Returns:
+            list[OrganizationRead]: List of organizations ordered by id
+        """
+        offset: int = (page - 1) * limit
+        plan = plan_filters(filters, await self.statistics.get(self.session))
+        query = organizations_by_filters_query(filters, plan, offset, limit, self.hierarchy)
+
+        result = await self._execute(query)
 
         organizations_orm = result.scalars().all()
 
         if not result:
             return
 
-        organizations_dto = organizations_adapter.validate_python(organizations_orm)
+        with SERIALIZATION_DURATION.time("validate"):
+            organizations_dto = organizations_adapter.validate_python(organizations_orm)
 
         return organizations_dto
+
+    async def get_activity_facets(self, filters: OrganizationFilters) -> list[ActivityFacetRead]:
+        """
+        Returns the number of organizations matching the filters per activity, rolled up the activity tree
+        Args:
+            filters: Any combination of organization filters
+
+        Returns:
+            list[ActivityFacetRead]: Activities with their counts, the largest first
+        """
+        plan = plan_filters(filters, await self.statistics.get(self.session))
+        query = activity_facets_query(filters, plan, self.hierarchy)
+
+        result = await self._execute(query)
+
+        with SERIALIZATION_DURATION.time("validate"):
+            facets_dto = activity_facets_adapter.validate_python(result.all())
+
+        return facets_dto
+
+    async def get_organizations_in_radius_batch(
+        self, queries: list[RadiusQuery], limit: int
+    ) -> tuple[list[list[int]], list[OrganizationRead]]:
+        """
+        Answers many radius queries with two statements: matching ids of all queries, then the organizations once
+        Args:
+            queries: Radius queries
+            limit: Maximum organizations per query, the lowest ids first
+
+        Returns:
+            tuple: Organization ids per query in query order and every found organization once, ordered by id
+        """
+        result = await self._execute(organization_ids_in_radius_batch_query(queries, limit))
+
+        organization_ids: list[list[int]] = [[] for _ in queries]
+        for query_index, organization_id in result:
+            organization_ids[query_index].append(organization_id)
+
+        found = sorted({organization_id for ids in organization_ids for organization_id in ids})
+        if not found:
+            return organization_ids, []
+
+        result = await self._execute(organizations_by_ids_query(found))
+
+        organizations_orm = result.scalars().all()
+
+        with SERIALIZATION_DURATION.time("validate"):
+            organizations_dto = organizations_adapter.validate_python(organizations_orm)
+
+        return organization_ids, organizations_dto
+
+    async def get_building_by_id(self, building_id: int) -> BuildingSummaryRead | None:
+        """
+        Returns a building with the number of its organizations
+        Args:
+            building_id: Building id
+
+        Returns:
+            BuildingSummaryRead: Building
+        """
+        result = await self._execute(building_by_id_query(building_id))
+
+        building_row = result.first()
+
+        if not building_row:
+            return
+
+        with SERIALIZATION_DURATION.time("validate"):
+            building_dto = building_summary_adapter.validate_python(building_row)
+
+        return building_dto
+
+    async def get_buildings_in_bbox(
+        self, lat_min: float, lon_min: float, lat_max: float, lon_max: float, after_id: int, limit: int
+    ) -> list[BuildingSummaryRead]:
+        """
+        Returns a keyset page of buildings in bounding box with the number of organizations in each
+        Args:
+            lat_min: Minimum latitude
+            lon_min: Minimum longitude
+            lat_max: Maximum latitude
+            lon_max: Maximum longitude
+            after_id: Only buildings with a greater id are returned
+            limit: Limit of items per page
+
+        Returns:
+            list[BuildingSummaryRead]: List of buildings ordered by id
+        """
+        query = buildings_in_bbox_query(lat_min, lon_min, lat_max, lon_max, after_id, limit)
+
+        result = await self._execute(query)
+
+        with SERIALIZATION_DURATION.time("validate"):
+            buildings_dto = building_summaries_adapter.validate_python(result.all())
+
+        return buildings_dto
+
+    async def get_buildings_in_radius(
+        self, latitude: float, longitude: float, radius: float, after_id: int, limit: int
+    ) -> list[BuildingSummaryRead]:
+        """
+        Returns a keyset page of buildings in radius with the number of organizations in each
+        Args:
+            latitude: Latitude
+            longitude: Longitude
+            radius: Radius in kilometers
+            after_id: Only buildings with a greater id are returned
+            limit: Limit of items per page
+
+        Returns:
+            list[BuildingSummaryRead]: List of buildings ordered by id
+        """
+        query = buildings_in_radius_query(latitude, longitude, radius, after_id, limit)
+
+        result = await self._execute(query)
+
+        with SERIALIZATION_DURATION.time("validate"):
+            buildings_dto = building_summaries_adapter.validate_python(result.all())
+
+        return buildings_dto
@@ -0,0 +1,471 @@
+"""
+Query constructors of PostgresStorage, kept apart so that building and compiling can be measured separately
+
+The fixed query shapes are *_statement factories with bound parameters, repository.statements builds each of them
+once, the rest are built per call from their arguments.
+"""
+
+from typing import Literal
+
+from domain.filters import (
+    FilterKind,
+    OrganizationFilters,
+    RadiusQuery,
+)
+from domain.models import (
+    Activity,
+    ActivityClosure,
+    Building,
+    Organization,
+    organization_activity,
+)
+from domain.normalization import normalize_name
+from repository.constants import (
+    EARTH_RADIUS_KM,
+    LIKE_ESCAPE,
+    NESTED_DEPTH,
+)
+from repository.geo import radius_bounding_box
+from sqlalchemy import (
+    ARRAY,
+    BindParameter,
+    ColumnElement,
+    Float,
+    Integer,
+    Select,
+    String,
+    Subquery,
+    and_,
+    any_,
+    bindparam,
+    cast,
+    column,
+    distinct,
+    exists,
+    func,
+    literal,
+    or_,
+    select,
+    values,
+)
+from sqlalchemy.orm import (
+    aliased,
+    joinedload,
+    selectinload,
+)
+
+# "closure" reads subtrees from activities_closures, "path" from the materialized paths of activities
+ActivityHierarchy = Literal["closure", "path"]
+
+
+def _building_distance(
+    latitude: float | ColumnElement[float], longitude: float | ColumnElement[float]
+) -> ColumnElement[float]:
+    """
+    Great-circle distance in kilometers from the point to Building, the spherical law of cosines
+    The cosine is clamped, rounding can push it past 1 for a building at the point itself and acos would fail
+    """
+    cosine = func.cos(func.radians(latitude)) * func.cos(func.radians(Building.latitude)) * func.cos(
+        func.radians(Building.longitude) - func.radians(longitude)
+    ) + func.sin(func.radians(latitude)) * func.sin(func.radians(Building.latitude))
+
+    return EARTH_RADIUS_KM * func.acos(func.least(1.0, func.greatest(-1.0, cosine)))
+
+
+def _page_params() -> tuple[BindParameter[int], BindParameter[int]]:
+    return bindparam("offset", type_=Integer), bindparam("limit", type_=Integer)
+
+
+def organizations_by_building_id_statement() -> Select:
+    offset, limit = _page_params()
+
+    return (
+        select(Organization)
+        .options(joinedload(Organization.building), selectinload(Organization.activities))
+        .where(Organization.building_id == bindparam("building_id", type_=Integer))
+        .order_by(Organization.id)
+        .offset(offset)
+        .limit(limit)
+    )
+
+
+def organizations_by_activity_id_statement() -> Select:
+    offset, limit = _page_params()
+
+    return (
+        select(Organization)
+        .join(Organization.activities)
+        .filter(Activity.id == bindparam("activity_id", type_=Integer))
+        .options(joinedload(Organization.building), selectinload(Organization.activities))
+        .order_by(Organization.id)
+        .offset(offset)
+        .limit(limit)
+    )
+
+
+def organization_by_id_statement() -> Select:
+    return (
+        select(Organization)
+        .where(Organization.id == bindparam("organization_id", type_=Integer))
+        .options(joinedload(Organization.building), selectinload(Organization.activities))
+    )
+
+
+def organization_by_name_statement() -> Select:
+    return (
+        select(Organization)
+        .where(Organization.name == bindparam("name", type_=String))
+        .options(joinedload(Organization.building), selectinload(Organization.activities))
+    )
+
+
+def organizations_search_by_name_statement(ranked: bool = False) -> Select:
+    """
+    Parameters: name is the normalized name, contains_pattern and prefix_pattern are LIKE patterns of it escaped
+    with LIKE_ESCAPE, autoescape of contains() and startswith() only works with literal values.
+    Ranked statements also return the exact, prefix and similarity columns the rows are ordered by.
+    """
+    offset, limit = _page_params()
+    name = bindparam("name", type_=String)
+    exact = Organization.search_name == name
+    prefix = Organization.search_name.like(bindparam("prefix_pattern", type_=String), escape=LIKE_ESCAPE)
+    similarity = func.word_similarity(name, Organization.search_name)
+
+    columns = [Organization]
+    if ranked:
+        columns += [exact.label("exact"), prefix.label("prefix"), similarity.label("similarity")]
+
+    return (
+        select(*columns)
+        .where(
+            or_(
+                Organization.search_name.like(bindparam("contains_pattern", type_=String), escape=LIKE_ESCAPE),
+                name.op("<%")(Organization.search_name),
+            )
+        )
+        .options(joinedload(Organization.building), selectinload(Organization.activities))
+        .order_by(exact.desc(), prefix.desc(), similarity.desc(), Organization.id)
+        .offset(offset)
+        .limit(limit)
+    )
+
+
+def organizations_in_radius_statement() -> Select:
+    """Parameters: latitude, longitude and radius, the bounding box of the circle from radius_bounding_box"""
+    offset, limit = _page_params()
+
+    return (
+        select(Organization)
+        .join(Organization.building)
+        .filter(
+            Building.latitude.between(bindparam("lat_min", type_=Float), bindparam("lat_max", type_=Float)),
+            Building.longitude.between(bindparam("lon_min", type_=Float), bindparam("lon_max", type_=Float)),
+        )
+        .filter(
+            _building_distance(bindparam("latitude", type_=Float), bindparam("longitude", type_=Float))
+            <= bindparam("radius", type_=Float)
+        )
+        .options(joinedload(Organization.building), selectinload(Organization.activities))
+        .order_by(Organization.id)
+        .offset(offset)
+        .limit(limit)
+    )
+
+
+def organizations_in_bbox_statement() -> Select:
+    offset, limit = _page_params()
+
+    return (
+        select(Organization)
+        .join(Organization.building)
+        .filter(
+            Building.latitude.between(bindparam("lat_min", type_=Float), bindparam("lat_max", type_=Float)),
+            Building.longitude.between(bindparam("lon_min", type_=Float), bindparam("lon_max", type_=Float)),
+        )
+        .options(joinedload(Organization.building), selectinload(Organization.activities))
+        .order_by(Organization.id)
+        .offset(offset)
+        .limit(limit)
+    )
+
+
+def activity_pairs(hierarchy: ActivityHierarchy, max_depth: int = NESTED_DEPTH) -> Subquery:
+    """
+    Ancestor and descendant ids of activities at most max_depth levels apart, every activity paired with itself
+    Args:
+        hierarchy: Source of the pairs
+        max_depth: Maximum number of levels between an ancestor and its descendant
+
+    Returns:
+        Subquery: Columns ancestor_id and descendant_id
+    """
+    if hierarchy == "closure":
+        return (
+            select(ActivityClosure.ancestor_id, ActivityClosure.descendant_id)
+            .where(ActivityClosure.depth <= max_depth)
+            .subquery("activity_pairs")
+        )
+
+    # the paths of a subtree start with the path of its root, so with text_pattern_ops they are one index range
+    # (~<~ '~' sorts after the digits and the dot); going up, the ancestor ids are read off the path of the descendant
+    ancestor, descendant = aliased(Activity, name="ancestor"), aliased(Activity, name="descendant")
+    ancestor_ids = cast(func.string_to_array(func.rtrim(descendant.path, "."), "."), ARRAY(Integer))
+    return (
+        select(ancestor.id.label("ancestor_id"), descendant.id.label("descendant_id"))
+        .join(
+            descendant,
+            and_(
+                descendant.path.op("~>=~")(ancestor.path),
+                descendant.path.op("~<~")(ancestor.path.concat("~")),
+                ancestor.id == any_(ancestor_ids),
+                descendant.depth <= ancestor.depth + max_depth,
+            ),
+        )
+        .subquery("activity_pairs")
+    )
+
+
+def organizations_by_nested_activity_id_statement(hierarchy: ActivityHierarchy = "closure") -> Select:
+    offset, limit = _page_params()
+    pairs = activity_pairs(hierarchy)
+    ids_subq = (
+        select(distinct(organization_activity.c.organization_id).label("org_id"))
+        .join(pairs, organization_activity.c.activity_id == pairs.c.descendant_id)
+        .where(pairs.c.ancestor_id == bindparam("activity_id", type_=Integer))
+        .order_by(organization_activity.c.organization_id)
+        .offset(offset)
+        .limit(limit)
+        .subquery()
+    )
+
+    return (
+        select(Organization)
+        .join(ids_subq, Organization.id == ids_subq.c.org_id)
+        .options(joinedload(Organization.building), selectinload(Organization.activities))
+        .order_by(Organization.id)
+    )
+
+
+def _filter_condition(
+    kind: FilterKind, filters: OrganizationFilters, hierarchy: ActivityHierarchy
+) -> ColumnElement[bool]:
+    """Condition of one filter over Organization joined with its Building"""
+    if kind == "building":
+        return Organization.building_id == filters.building_id
+    if kind == "activity":
+        return exists().where(
+            organization_activity.c.organization_id == Organization.id,
+            organization_activity.c.activity_id == filters.activity_id,
+        )
+    if kind == "nested_activity":
+        pairs = activity_pairs(hierarchy)
+        return exists().where(
+            organization_activity.c.organization_id == Organization.id,
+            organization_activity.c.activity_id == pairs.c.descendant_id,
+            pairs.c.ancestor_id == filters.nested_activity_id,
+        )
+    if kind == "bbox":
+        return and_(
+            Building.latitude.between(filters.lat_min, filters.lat_max),
+            Building.longitude.between(filters.lon_min, filters.lon_max),
+        )
+    if kind == "radius":
+        lat_min, lat_max, lon_min, lon_max = radius_bounding_box(filters.latitude, filters.longitude, filters.radius)
+        conditions = [Building.latitude.between(lat_min, lat_max)]
+        if lon_min is not None:
+            conditions.append(Building.longitude.between(lon_min, lon_max))
+        conditions.append(_building_distance(filters.latitude, filters.longitude) <= filters.radius)
+        return and_(*conditions)
+    if kind == "name":
+        normalized_name = normalize_name(filters.name)
+        return or_(
+            Organization.search_name.contains(normalized_name, autoescape=True),
+            literal(normalized_name).op("<%")(Organization.search_name),
+        )
+
+    return Building.address.icontains(filters.address, autoescape=True)
+
+
+def _driver_ids_query(kind: FilterKind, filters: OrganizationFilters, hierarchy: ActivityHierarchy) -> Select:
+    """Ids of the organizations matching the driving filter, read through the index serving that filter"""
+    if kind == "activity":
+        return select(organization_activity.c.organization_id.label("id")).where(
+            organization_activity.c.activity_id == filters.activity_id
+        )
+    if kind == "nested_activity":
+        pairs = activity_pairs(hierarchy)
+        return (
+            select(distinct(organization_activity.c.organization_id).label("id"))
+            .join(pairs, organization_activity.c.activity_id == pairs.c.descendant_id)
+            .where(pairs.c.ancestor_id == filters.nested_activity_id)
+        )
+    if kind in ("bbox", "radius", "address"):
+        return select(Organization.id).join(Organization.building).where(_filter_condition(kind, filters, hierarchy))
+
+    return select(Organization.id).where(_filter_condition(kind, filters, hierarchy))
+
+
+def _filtered(
+    query: Select, filters: OrganizationFilters, plan: list[FilterKind], hierarchy: ActivityHierarchy
+) -> Select:
+    """Restricts a query over Organization to the candidates of the driving filter matching the other filters"""
+    driver, *rest = plan
+    candidates = _driver_ids_query(driver, filters, hierarchy).cte("candidates").prefix_with("MATERIALIZED")
+
+    query = query.join(candidates, Organization.id == candidates.c.id)
+    if any(kind in ("bbox", "radius", "address") for kind in rest):
+        query = query.join(Organization.building)
+
+    return query.where(*(_filter_condition(kind, filters, hierarchy) for kind in rest))
+
+
+def organizations_by_filters_query(
+    filters: OrganizationFilters,
+    plan: list[FilterKind],
+    offset: int,
+    limit: int,
+    hierarchy: ActivityHierarchy = "closure",
+) -> Select:
+    """
+    Composite search: the first filter of the plan is evaluated first in a materialized CTE, so Postgres can't
+    reorder it, the remaining filters are checked against its candidates only
+    """
+    return (
+        _filtered(select(Organization), filters, plan, hierarchy)
+        .options(joinedload(Organization.building), selectinload(Organization.activities))
+        .order_by(Organization.id)
+        .offset(offset)
+        .limit(limit)
+    )
+
+
+def activity_facets_query(
+    filters: OrganizationFilters, plan: list[FilterKind], hierarchy: ActivityHierarchy = "closure"
+) -> Select:
+    """
+    Organizations matching the filters counted per activity in one grouped pass, an organization counts
+    towards its activities and their ancestors up to NESTED_DEPTH levels above, once per ancestor
+    """
+    matching = _filtered(select(Organization.id), filters, plan, hierarchy).cte("matching")
+    pairs = activity_pairs(hierarchy)
+    count = func.count(distinct(organization_activity.c.organization_id)).label("count")
+
+    return (
+        select(pairs.c.ancestor_id.label("id"), Activity.name, count)
+        .select_from(matching)
+        .join(organization_activity, organization_activity.c.organization_id == matching.c.id)
+        .join(pairs, pairs.c.descendant_id == organization_activity.c.activity_id)
+        .join(Activity, Activity.id == pairs.c.ancestor_id)
+        .group_by(pairs.c.ancestor_id, Activity.name)
+        .order_by(count.desc(), pairs.c.ancestor_id)
+    )
+
+
+def organization_ids_in_radius_batch_query(queries: list[RadiusQuery], limit: int) -> Select:
+    """
+    (query index, organization id) pairs of many radius queries in one statement: the query points are a VALUES
+    list, each point probes the building coordinates index with its bounding box and distances are computed for
+    the surviving pairs only. Every query keeps its limit lowest organization ids
+    """
+    rows = []
+    for index, query in enumerate(queries):
+        lat_min, lat_max, lon_min, lon_max = radius_bounding_box(query.latitude, query.longitude, query.radius)
+        if lon_min is None:
+            lon_min, lon_max = -180.0, 180.0
+        rows.append((index, query.latitude, query.longitude, query.radius, lat_min, lat_max, lon_min, lon_max))
+
+    points = values(
+        column("query_index", Integer),
+        column("latitude", Float),
+        column("longitude", Float),
+        column("radius", Float),
+        column("lat_min", Float),
+        column("lat_max", Float),
+        column("lon_min", Float),
+        column("lon_max", Float),
+        name="points",
+    ).data(rows)
+
+    rank = func.row_number().over(partition_by=points.c.query_index, order_by=Organization.id).label("rank")
+    pairs = (
+        select(points.c.query_index, Organization.id.label("organization_id"), rank)
+        .select_from(points)
+        .join(
+            Building,
+            and_(
+                Building.latitude.between(points.c.lat_min, points.c.lat_max),
+                Building.longitude.between(points.c.lon_min, points.c.lon_max),
+            ),
+        )
+        .join(Organization, Organization.building_id == Building.id)
+        .where(_building_distance(points.c.latitude, points.c.longitude) <= points.c.radius)
+        .subquery()
+    )
+
+    return (
+        select(pairs.c.query_index, pairs.c.organization_id)
+        .where(pairs.c.rank <= limit)
+        .order_by(pairs.c.query_index, pairs.c.organization_id)
+    )
+
+
+def organizations_by_ids_query(organization_ids: list[int]) -> Select:
+    return (
+        select(Organization)
+        .where(Organization.id.in_(organization_ids))
+        .options(joinedload(Organization.building), selectinload(Organization.activities))
+        .order_by(Organization.id)
+    )
+
+
+def _building_summaries(page: Subquery) -> Select:
+    """Adds the organization count to a page of buildings, counted on the building_id index for the page rows only"""
+    organization_count = select(func.count()).where(Organization.building_id == page.c.id).scalar_subquery()
+
+    return select(
+        page.c.id, page.c.address, page.c.latitude, page.c.longitude, organization_count.label("organization_count")
+    ).order_by(page.c.id)
+
+
+def _buildings_page(*conditions: ColumnElement[bool], after_id: int, limit: int) -> Subquery:
+    """Keyset page of buildings: ids after the last one the client has seen, so deep pages cost as much as the first"""
+    return (
+        select(Building.id, Building.address, Building.latitude, Building.longitude)
+        .where(*conditions, Building.id > after_id)
+        .order_by(Building.id)
+        .limit(limit)
+        .subquery("page")
+    )
+
+
+def building_by_id_query(building_id: int) -> Select:
+    page = (
+        select(Building.id, Building.address, Building.latitude, Building.longitude)
+        .where(Building.id == building_id)
+        .subquery("page")
+    )
+
+    return _building_summaries(page)
+
+
+def buildings_in_bbox_query(
+    lat_min: float, lon_min: float, lat_max: float, lon_max: float, after_id: int, limit: int
+) -> Select:
+    page = _buildings_page(
+        Building.latitude.between(lat_min, lat_max),
+        Building.longitude.between(lon_min, lon_max),
+        after_id=after_id,
+        limit=limit,
+    )
+
+    return _building_summaries(page)
+
+
+def buildings_in_radius_query(latitude: float, longitude: float, radius: float, after_id: int, limit: int) -> Select:
+    lat_min, lat_max, lon_min, lon_max = radius_bounding_box(latitude, longitude, radius)
+
+    conditions = [Building.latitude.between(lat_min, lat_max), _building_distance(latitude, longitude) <= radius]
+    if lon_min is not None:
+        conditions.append(Building.longitude.between(lon_min, lon_max))
+
+    return _building_summaries(_buildings_page(*conditions, after_id=after_id, limit=limit))
@@ -0,0 +1,72 @@
+from domain.models import (
+    Activity,
+    ActivityClosure,
+    Building,
+    Organization,
+    organization_activity,
+)
+from sqlalchemy import (
+    func,
+    select,
+)
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import (
+    joinedload,
+    selectinload,
+)
+
+
+async def get_sample_parameters(session: AsyncSession) -> dict:
+    """Picks representative parameters: the busiest building and activity, a root activity, an existing name"""
+    building_id = await session.scalar(
+        select(Organization.building_id).group_by(Organization.building_id).order_by(func.count().desc()).limit(1)
+    )
+    activity_id = await session.scalar(
+        select(organization_activity.c.activity_id)
+        .group_by(organization_activity.c.activity_id)
+        .order_by(func.count().desc())
+        .limit(1)
+    )
+    root_activity_id = await session.scalar(
+        select(ActivityClosure.ancestor_id)
+        .group_by(ActivityClosure.ancestor_id)
+        .order_by(func.count().desc(), ActivityClosure.ancestor_id)
+        .limit(1)
+    )
+    name = await session.scalar(select(Organization.name).order_by(Organization.id).limit(1))
+    building = (
+        await session.execute(select(Building.latitude, Building.longitude).where(Building.id == building_id))
+    ).one()
+
+    return {
+        "building_id": building_id,
+        "activity_id": activity_id,
+        "root_activity_id": root_activity_id or await session.scalar(select(func.min(Activity.id))),
+        "name": name,
+        "latitude": building.latitude,
+        "longitude": building.longitude,
+    }
+
+
+async def get_warmup_parameters(session: AsyncSession) -> dict | None:
+    """Cheap parameters taken from the first organization, enough to exercise every query once"""
+    organization = await session.scalar(
+        select(Organization)
+        .options(joinedload(Organization.building), selectinload(Organization.activities))
+        .order_by(Organization.id)
+        .limit(1)
+    )
+    if organization is None:
+        return None
+
+    activity_id = organization.activities[0].id if organization.activities else 1
+
+    return {
+        "organization_id": organization.id,
+        "building_id": organization.building_id,
+        "activity_id": activity_id,
+        "root_activity_id": activity_id,
+        "name": organization.name,
+        "latitude": organization.building.latitude,
+        "longitude": organization.building.longitude,
+    }
@@ -0,0 +1,404 @@
+import asyncio
+import heapq
+from collections import Counter
+from itertools import islice
+from operator import (
+    attrgetter,
+    itemgetter,
+)
+from typing import (
+    Awaitable,
+    Callable,
+    Iterable,
+    TypeVar,
+)
+
+from domain.filters import (
+    OrganizationFilters,
+    RadiusQuery,
+)
+from domain.schemas import (
+    ActivityFacetRead,
+    BuildingSummaryRead,
+    OrganizationRead,
+)
+from repository.geo import radius_bounding_box
+from repository.postgres_repo import PostgresStorage
+from repository.queries import ActivityHierarchy
+from repository.sharding import (
+    Shard,
+    ShardMap,
+)
+
+T = TypeVar("T")
+
+
+class ShardedStorage:
+    """
+    Storage over shard databases split by region, every shard is queried through its own PostgresStorage
+
+    Point lookups go to the shard owning the id, area queries only to the shards whose region overlaps the area, the
+    rest to every shard. Fanned out queries run in parallel and each shard returns the first offset + limit rows,
+    the merge keeps the global order, so a page costs more the deeper it is.
+    """
+
+    def __init__(self, shards: ShardMap, hierarchy: ActivityHierarchy = "closure"):
+        self.shards = shards
+        self.hierarchy = hierarchy
+
+    async def _on(self, shard: Shard, call: Callable[[PostgresStorage], Awaitable[T]]) -> T:
+        async with shard.sessionmanager.session() as session:
+            return await call(PostgresStorage(session, self.hierarchy, shard.filter_statistics))
+
+    async def _fan_out(self, shards: list[Shard], call: Callable[[PostgresStorage], Awaitable[T]]) -> list[T]:
+        return list(await asyncio.gather(*(self._on(shard, call) for shard in shards)))
+
+    async def _merged_page(
+        self,
+        shards: list[Shard],
+        call: Callable[[PostgresStorage, int], Awaitable[list[OrganizationRead] | None]],
+        page: int,
+        limit: int,
+    ) -> list[OrganizationRead]:
+        """
+        Returns a page of organizations ordered by id from the shards
+        Args:
+            shards: Shards to query
+            call: Query of one shard returning the first rows by id, gets the number of rows to return
+            page: Page number
+            limit: Limit of items per page
+
+        Returns:
+            list[OrganizationRead]: List of organizations
+        """
+        offset: int = (page - 1) * limit
+        pages = await self._fan_out(shards, lambda storage: call(storage, offset + limit))
+
+        return list(islice(heapq.merge(*(rows or [] for rows in pages), key=attrgetter("id")), offset, offset + limit))
+
+    def _area_shards(self, latitude: float, longitude: float, radius: float) -> list[Shard]:
+        return self.shards.overlapping(*radius_bounding_box(latitude, longitude, radius))
+
+    def _filter_shards(self, filters: OrganizationFilters) -> list[Shard]:
+        shards = self.shards.shards
+        if filters.building_id is not None:
+            owner = self.shards.for_id(filters.building_id)
+            shards = [shard for shard in shards if shard is owner]
+        if filters.radius is not None:
+            area = self._area_shards(filters.latitude, filters.longitude, filters.radius)
+            shards = [shard for shard in shards if shard in area]
+        if filters.lat_min is not None:
+            shards = [
+                shard
+                for shard in shards
+                if shard.overlaps(filters.lat_min, filters.lat_max, filters.lon_min, filters.lon_max)
+            ]
+
+        return shards
+
+    async def get_organizations_by_building_id_with_pagination(
+        self, building_id: int, page: int, limit: int
+    ) -> list[OrganizationRead] | None:
+        """
+        Returns a list of organizations by building id with pagination from the shard owning the building
+        Args:
+            building_id: Building id
+            page: Page number
+            limit: Limit of items per page
+
+        Returns:
+            list[OrganizationRead]: List of organizations
+        """
+        shard = self.shards.for_id(building_id)
+        if not shard:
+            return
+
+        return await self._on(
+            shard, lambda storage: storage.get_organizations_by_building_id_with_pagination(building_id, page, limit)
+        )
+
+    async def get_organizations_by_activity_id_with_pagination(
+        self, activity_id: int, page: int, limit: int
+    ) -> list[OrganizationRead] | None:
+        """
+        Returns a list of organizations by activity id with pagination, merged from every shard
+        Args:
+            activity_id: Activity id
+            page: Page number
+            limit: Limit of items per page
+
+        Returns:
+            list[OrganizationRead]: List of organizations
+        """
+        return await self._merged_page(
+            self.shards.shards,
+            lambda storage, rows: storage.get_organizations_by_activity_id_with_pagination(activity_id, 1, rows),
+            page,
+            limit,
+        )
+
+    async def get_organization_by_id(self, organization_id: int) -> OrganizationRead | None:
+        """
+        Returns an organization by id from the shard owning the id
+        Args:
+            organization_id: Organization id
+
+        Returns:
+            OrganizationRead: Organization
+        """
+        shard = self.shards.for_id(organization_id)
+        if not shard:
+            return
+
+        return await self._on(shard, lambda storage: storage.get_organization_by_id(organization_id))
+
+    async def get_organization_by_name(self, name: str) -> OrganizationRead | None:
+        """
+        Returns an organization by name, names are unique within a shard and looked up on every shard
+        Args:
+            name: Organization name
+
+        Returns:
+            OrganizationRead: Organization with the lowest id among the shards
+        """
+        found = await self._fan_out(self.shards.shards, lambda storage: storage.get_organization_by_name(name))
+
+        return min((organization for organization in found if organization), key=attrgetter("id"), default=None)
+
+    async def search_organizations_by_name_with_pagination(
+        self, name: str, page: int, limit: int
+    ) -> list[OrganizationRead] | None:
+        """
+        Returns a ranked list of organizations whose name matches by substring, prefix or trigram similarity
+        Every shard returns its first rows with the keys it ordered them by, the merge keeps that order
+        Args:
+            name: Part of organization name, case and Latin/Cyrillic lookalikes are ignored
+            page: Page number
+            limit: Limit of items per page
+
+        Returns:
+            list[OrganizationRead]: List of organizations
+        """
+        offset: int = (page - 1) * limit
+        pages = await self._fan_out(
+            self.shards.shards, lambda storage: storage.search_organizations_by_name_ranked(name, offset + limit)
+        )
+        merged = heapq.merge(*pages, key=itemgetter(0))
+
+        return [organization for _, organization in islice(merged, offset, offset + limit)]
+
+    async def get_organizations_in_radius_with_pagination(
+        self, latitude: float, longitude: float, radius: float, page: int, limit: int
+    ) -> list[OrganizationRead] | None:
+        """
+        Returns a list of organizations in radius with pagination from the shards overlapping the circle
+        Args:
+            latitude: Latitude
+            longitude: Longitude
+            radius: Radius in kilometers
+            page: Page number
+            limit: Limit of items per page
+
+        Returns:
+            list[OrganizationRead]: List of organizations
+        """
+        return await self._merged_page(
+            self._area_shards(latitude, longitude, radius),
+            lambda storage, rows: storage.get_organizations_in_radius_with_pagination(
+                latitude, longitude, radius, 1, rows
+            ),
+            page,
+            limit,
+        )
+
+    async def get_organizations_in_bbox_with_pagination(
+        self, lat_min: float, lon_min: float, lat_max: float, lon_max: float, page: int, limit: int
+    ) -> list[OrganizationRead] | None:
+        """
+        Returns a list of organizations in bounding box with pagination from the shards overlapping the box
+        Args:
+            lat_min: Minimum latitude
+            lon_min: Minimum longitude
+            lat_max: Maximum latitude
+            lon_max: Maximum longitude
+            page: Page number
+            limit: Limit of items per page
+        Returns:
+            list[OrganizationRead]: List of organizations
+        """
+        return await self._merged_page(
+            self.shards.overlapping(lat_min, lat_max, lon_min, lon_max),
+            lambda storage, rows: storage.get_organizations_in_bbox_with_pagination(
+                lat_min, lon_min, lat_max, lon_max, 1, rows
+            ),
+            page,
+            limit,
+        )
+
+    async def get_organizations_by_nested_activity_id_with_pagination(
+        self, activity_id: int, page: int, limit: int
+    ) -> list[OrganizationRead] | None:
+        """
+        Returns a list of organizations with nested activities by activity id with pagination, merged from every shard
+        Args:
+            activity_id: Activity id
+            page: Page number
+            limit: Limit of items per page
+        Returns:
+            list[OrganizationRead]: List of organizations
+        """
+        return await self._merged_page(
+            self.shards.shards,
+            lambda storage, rows: storage.get_organizations_by_nested_activity_id_with_pagination(activity_id, 1, rows),
+            page,
+            limit,
+        )
+
+    async def search_organizations_with_pagination(
+        self, filters: OrganizationFilters, page: int, limit: int
+    ) -> list[OrganizationRead] | None:
+        """
+        Returns a list of organizations matching all given filters with pagination
+        Building and area filters narrow the shards queried, every shard plans the query on its own statistics
+        Args:
+            filters: Any combination of organization filters
+            page: Page number
+            limit: Limit of items per page
+
+        Returns:
+            list[OrganizationRead]: List of organizations ordered by id
+        """
+        return await self._merged_page(
+            self._filter_shards(filters),
+            lambda storage, rows: storage.search_organizations_with_pagination(filters, 1, rows),
+            page,
+            limit,
+        )
+
+    async def get_activity_facets(self, filters: OrganizationFilters) -> list[ActivityFacetRead]:
+        """
+        Returns the number of organizations matching the filters per activity, summed over the shards
+        Args:
+            filters: Any combination of organization filters
+
+        Returns:
+            list[ActivityFacetRead]: Activities with their counts, the largest first
+        """
+        shard_facets = await self._fan_out(
+            self._filter_shards(filters), lambda storage: storage.get_activity_facets(filters)
+        )
+
+        counts: Counter[int] = Counter()
+        names: dict[int, str] = {}
+        for facets in shard_facets:
+            for facet in facets:
+                counts[facet.id] += facet.count
+                names[facet.id] = facet.name
+
+        return [
+            ActivityFacetRead.model_construct(id=activity_id, name=names[activity_id], count=count)
+            for activity_id, count in sorted(counts.items(), key=lambda item: (-item[1], item[0]))
+        ]
+
+    async def get_organizations_in_radius_batch(
+        self, queries: list[RadiusQuery], limit: int
+    ) -> tuple[list[list[int]], list[OrganizationRead]]:
+        """
+        Answers many radius queries, every shard gets the queries overlapping its region in one batch
+        Args:
+            queries: Radius queries
+            limit: Maximum organizations per query, the lowest ids first
+
+        Returns:
+            tuple: Organization ids per query in query order and every found organization once, ordered by id
+        """
+        shard_queries: dict[Shard, list[int]] = {}
+        for index, query in enumerate(queries):
+            for shard in self._area_shards(query.latitude, query.longitude, query.radius):
+                shard_queries.setdefault(shard, []).append(index)
+
+        async def on_shard(shard: Shard) -> tuple[list[int], tuple[list[list[int]], list[OrganizationRead]]]:
+            indexes = shard_queries[shard]
+            answer = await self._on(
+                shard, lambda storage: storage.get_organizations_in_radius_batch([queries[i] for i in indexes], limit)
+            )
+            return indexes, answer
+
+        answers = await asyncio.gather(*(on_shard(shard) for shard in shard_queries))
+
+        found: list[list[int]] = [[] for _ in queries]
+        organizations: dict[int, OrganizationRead] = {}
+        for indexes, (organization_ids, shard_organizations) in answers:
+            for index, ids in zip(indexes, organization_ids):
+                found[index].extend(ids)
+            organizations.update((organization.id, organization) for organization in shard_organizations)
+
+        organization_ids = [sorted(ids)[:limit] for ids in found]
+        kept = sorted({organization_id for ids in organization_ids for organization_id in ids})
+
+        return organization_ids, [organizations[organization_id] for organization_id in kept]
+
+    async def get_building_by_id(self, building_id: int) -> BuildingSummaryRead | None:
+        """
+        Returns a building with the number of its organizations from the shard owning the id
+        Args:
+            building_id: Building id
+
+        Returns:
+            BuildingSummaryRead: Building
+        """
+        shard = self.shards.for_id(building_id)
+        if not shard:
+            return
+
+        return await self._on(shard, lambda storage: storage.get_building_by_id(building_id))
+
+    async def get_buildings_in_bbox(
+        self, lat_min: float, lon_min: float, lat_max: float, lon_max: float, after_id: int, limit: int
+    ) -> list[BuildingSummaryRead]:
+        """
+        Returns a keyset page of buildings in bounding box from the shards overlapping the box
+        Args:
+            lat_min: Minimum latitude
+            lon_min: Minimum longitude
+            lat_max: Maximum latitude
+            lon_max: Maximum longitude
+            after_id: Only buildings with a greater id are returned
+            limit: Limit of items per page
+
+        Returns:
+            list[BuildingSummaryRead]: List of buildings ordered by id
+        """
+        pages = await self._fan_out(
+            self.shards.overlapping(lat_min, lat_max, lon_min, lon_max),
+            lambda storage: storage.get_buildings_in_bbox(lat_min, lon_min, lat_max, lon_max, after_id, limit),
+        )
+
+        return self._merged_buildings(pages, limit)
+
+    async def get_buildings_in_radius(
+        self, latitude: float, longitude: float, radius: float, after_id: int, limit: int
+    ) -> list[BuildingSummaryRead]:
+        """
+        Returns a keyset page of buildings in radius from the shards overlapping the circle
+        Args:
+            latitude: Latitude
+            longitude: Longitude
+            radius: Radius in kilometers
+            after_id: Only buildings with a greater id are returned
+            limit: Limit of items per page
+
+        Returns:
+            list[BuildingSummaryRead]: List of buildings ordered by id
+        """
+        pages = await self._fan_out(
+            self._area_shards(latitude, longitude, radius),
+            lambda storage: storage.get_buildings_in_radius(latitude, longitude, radius, after_id, limit),
+        )
+
+        return self._merged_buildings(pages, limit)
+
+    @staticmethod
+    def _merged_buildings(pages: Iterable[list[BuildingSummaryRead]], limit: int) -> list[BuildingSummaryRead]:
+        # keyset pages need no offset, the first rows of every shard after after_id are enough
+        return list(islice(heapq.merge(*pages, key=attrgetter("id")), limit))
@@ -0,0 +1,99 @@
+import asyncio
+
+from config import (
+    ShardSettings,
+    settings,
+)
+from database import DatabaseSessionManager
+from repository.filter_stats import FilterStatisticsCache
+
+
+class Shard:
+    """One shard database holding the buildings of a region with their organizations and every activity"""
+
+    def __init__(self, config: ShardSettings):
+        self.name = config.name
+        self.dsn = config.dsn
+        self.id_prefix = config.id_prefix
+        self.lat_min, self.lat_max = config.lat_min, config.lat_max
+        self.lon_min, self.lon_max = config.lon_min, config.lon_max
+        self.sessionmanager = DatabaseSessionManager()
+        # the composite search is planned on the data of this shard, not on whichever database loaded first
+        self.filter_statistics = FilterStatisticsCache()
+
+    @property
+    def url(self) -> str:
+        return self.dsn.replace("postgresql://", "postgresql+asyncpg://", 1)
+
+    def contains(self, latitude: float, longitude: float) -> bool:
+        return self.lat_min <= latitude <= self.lat_max and self.lon_min <= longitude <= self.lon_max
+
+    def overlaps(self, lat_min: float, lat_max: float, lon_min: float | None, lon_max: float | None) -> bool:
+        """
+        Checks whether the region of the shard intersects the bounding box
+        Args:
+            lat_min: Minimum latitude
+            lat_max: Maximum latitude
+            lon_min: Minimum longitude, None when longitude is not bounded
+            lon_max: Maximum longitude, None when longitude is not bounded
+
+        Returns:
+            bool: True if the shard may hold buildings in the box
+        """
+        if lat_max < self.lat_min or lat_min > self.lat_max:
+            return False
+
+        return lon_min is None or not (lon_max < self.lon_min or lon_min > self.lon_max)
+
+
+class ShardMap:
+    """
+    Routes building and organization ids and geographic areas to shards
+
+    Ids carry their shard: a shard with id_prefix p holds ids from p * id_stride up to (p + 1) * id_stride,
+    so a point lookup needs no directory.
+    """
+
+    def __init__(self, shards: list[ShardSettings], id_stride: int):
+        self.shards = [Shard(config) for config in shards]
+        self.id_stride = id_stride
+        self._by_prefix = {shard.id_prefix: shard for shard in self.shards}
+
+    def init(self, **engine_kwargs):
+        """
+        Creates the engines of all shards
+        Args:
+            engine_kwargs: Arguments of create_async_engine, the pool settings apply to every shard
+        """
+        for shard in self.shards:
+            shard.sessionmanager.init(shard.url, **engine_kwargs)
+
+    async def close(self):
+        await asyncio.gather(*(shard.sessionmanager.close() for shard in self.shards if shard.sessionmanager.engine))
+
+    def for_id(self, id_: int) -> Shard | None:
+        return self._by_prefix.get(id_ // self.id_stride)
+
+    def for_point(self, latitude: float, longitude: float) -> Shard | None:
+        return next((shard for shard in self.shards if shard.contains(latitude, longitude)), None)
+
+    def overlapping(self, lat_min: float, lat_max: float, lon_min: float | None, lon_max: float | None) -> list[Shard]:
+        return [shard for shard in self.shards if shard.overlaps(lat_min, lat_max, lon_min, lon_max)]
+
+    def global_id(self, shard: Shard, local_id: int) -> int:
+        """
+        Returns the id of a row of the unsharded database inside the id range of the shard
+        Args:
+            shard: Shard receiving the row
+            local_id: Id in the unsharded database, below id_stride
+
+        Returns:
+            int: Id in the shard
+        """
+        if not 0 < local_id < self.id_stride:
+            raise ValueError(f"Id {local_id} doesn't fit the shard id stride {self.id_stride}")
+
+        return shard.id_prefix * self.id_stride + local_id
+
+
+shard_map = ShardMap(settings.shards, settings.shard_id_stride)
@@ -0,0 +1,327 @@
+import asyncio
+import logging
+from array import array
+from bisect import bisect_left
+from collections import defaultdict
+from dataclasses import dataclass
+from time import monotonic
+from typing import (
+    Awaitable,
+    Callable,
+    Iterable,
+    Sequence,
+)
+
+from config import settings
+from database import DatabaseSessionManager
+from domain.models import (
+    Activity,
+    ActivityClosure,
+    Building,
+    Organization,
+    organization_activity,
+)
+from domain.normalization import trigrams
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+
+@dataclass(frozen=True)
+class StringColumn:
+    """Strings stored back to back in one UTF-8 heap, the i-th string is heap[offsets[i]:offsets[i + 1]]"""
+
+    offsets: Sequence[int]
+    heap: bytes | memoryview
+
+    @classmethod
+    def from_strings(cls, values: Iterable[str]) -> "StringColumn":
+        offsets = array("q", [0])
+        heap = bytearray()
+        for value in values:
+            heap += value.encode()
+            offsets.append(len(heap))
+
+        return cls(offsets, bytes(heap))
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, index: int) -> str:
+        return str(self.heap[self.offsets[index] : self.offsets[index + 1]], "utf-8")
+
+
+@dataclass(frozen=True)
+class Snapshot:
+    """
+    Column-oriented, read-only copy of the directory
+
+    Entities are addressed by their position (index) in the id-sorted id columns, references between entities are
+    stored as indexes. One-to-many relations are CSR pairs: the items of entity i are items[offsets[i]:offsets[i + 1]].
+    """
+
+    org_ids: Sequence[int]
+    org_names: StringColumn
+    org_search_names: StringColumn
+    org_phones: StringColumn
+    org_buildings: Sequence[int]
+    org_name_order: Sequence[int]
+    org_activity_offsets: Sequence[int]
+    org_activities: Sequence[int]
+
+    building_ids: Sequence[int]
+    building_addresses: StringColumn
+    building_latitudes: Sequence[float]
+    building_longitudes: Sequence[float]
+    building_latitude_order: Sequence[int]
+    building_org_offsets: Sequence[int]
+    building_orgs: Sequence[int]
+
+    activity_ids: Sequence[int]
+    activity_names: StringColumn
+    activity_org_offsets: Sequence[int]
+    activity_orgs: Sequence[int]
+    closure_offsets: Sequence[int]
+    closure_descendants: Sequence[int]
+    closure_depths: Sequence[int]
+
+    # name search index: sorted pg_trgm trigrams of the search names, each with the organizations having it
+    trigram_keys: StringColumn
+    trigram_org_offsets: Sequence[int]
+    trigram_orgs: Sequence[int]
+
+    @staticmethod
+    def find(ids: Sequence[int], id_: int) -> int | None:
+        """Returns the index of the id in a sorted id column"""
+        index = bisect_left(ids, id_)
+        if index < len(ids) and ids[index] == id_:
+            return index
+
+    def find_org_by_name(self, name: str) -> int | None:
+        """Returns the index of the organization with exactly this name"""
+        position = bisect_left(self.org_name_order, name, key=self.org_names.__getitem__)
+        if position < len(self.org_name_order) and self.org_names[self.org_name_order[position]] == name:
+            return self.org_name_order[position]
+
+    def find_trigram_orgs(self, trigram: str) -> Sequence[int]:
+        """Returns the ordered indexes of the organizations whose search name has the trigram"""
+        position = bisect_left(range(len(self.trigram_keys)), trigram, key=self.trigram_keys.__getitem__)
+        if position < len(self.trigram_keys) and self.trigram_keys[position] == trigram:
+            return self.trigram_orgs[self.trigram_org_offsets[position] : self.trigram_org_offsets[position + 1]]
+
+        return ()
+
+
+def _csr(groups: list[list[int]]) -> tuple[array, array]:
+    offsets = array("q", [0])
+    items = array("i")
+    for group in groups:
+        items.extend(group)
+        offsets.append(len(items))
+
+    return offsets, items
+
+
+def build_snapshot(
+    organizations: Sequence[tuple[int, str, str, str, int]],
+    buildings: Sequence[tuple[int, str, float, float]],
+    activities: Sequence[tuple[int, str]],
+    organization_activities: Iterable[tuple[int, int]],
+    closures: Iterable[tuple[int, int, int]],
+) -> Snapshot:
+    """
+    Builds a snapshot from rows ordered by id
+    Args:
+        organizations: Organization id, name, search name, phone and building id
+        buildings: Building id, address, latitude and longitude
+        activities: Activity id and name
+        organization_activities: Organization id and activity id pairs
+        closures: Ancestor id, descendant id and depth
+
+    Returns:
+        Snapshot: Snapshot
+    """
+    building_index = {row[0]: index for index, row in enumerate(buildings)}
+    activity_index = {row[0]: index for index, row in enumerate(activities)}
+    org_index = {row[0]: index for index, row in enumerate(organizations)}
+
+    org_activities: list[list[int]] = [[] for _ in organizations]
+    activity_orgs: list[list[int]] = [[] for _ in activities]
+    for org_id, activity_id in organization_activities:
+        org_activities[org_index[org_id]].append(activity_index[activity_id])
+        activity_orgs[activity_index[activity_id]].append(org_index[org_id])
+
+    building_orgs: list[list[int]] = [[] for _ in buildings]
+    for index, row in enumerate(organizations):
+        building_orgs[building_index[row[4]]].append(index)
+
+    closure_rows: list[list[tuple[int, int]]] = [[] for _ in activities]
+    for ancestor_id, descendant_id, depth in closures:
+        closure_rows[activity_index[ancestor_id]].append((depth, activity_index[descendant_id]))
+
+    closure_offsets = array("q", [0])
+    closure_descendants = array("i")
+    closure_depths = array("i")
+    for rows in closure_rows:
+        for depth, descendant in sorted(rows):
+            closure_descendants.append(descendant)
+            closure_depths.append(depth)
+        closure_offsets.append(len(closure_descendants))
+
+    trigram_orgs: dict[str, list[int]] = defaultdict(list)
+    for index, row in enumerate(organizations):
+        for trigram in trigrams(row[2]):
+            trigram_orgs[trigram].append(index)
+    trigram_keys = sorted(trigram_orgs)
+
+    org_activity_offsets, org_activity_items = _csr(org_activities)
+    trigram_org_offsets, trigram_org_items = _csr([trigram_orgs[trigram] for trigram in trigram_keys])
+    activity_org_offsets, activity_org_items = _csr([sorted(orgs) for orgs in activity_orgs])
+    building_org_offsets, building_org_items = _csr(building_orgs)
+
+    return Snapshot(
+        org_ids=array("q", (row[0] for row in organizations)),
+        org_names=StringColumn.from_strings(row[1] for row in organizations),
+        org_search_names=StringColumn.from_strings(row[2] for row in organizations),
+        org_phones=StringColumn.from_strings(row[3] for row in organizations),
+        org_buildings=array("i", (building_index[row[4]] for row in organizations)),
+        org_name_order=array("i", sorted(range(len(organizations)), key=lambda index: organizations[index][1])),
+        org_activity_offsets=org_activity_offsets,
+        org_activities=org_activity_items,
+        building_ids=array("q", (row[0] for row in buildings)),
+        building_addresses=StringColumn.from_strings(row[1] for row in buildings),
+        building_latitudes=array("d", (row[2] for row in buildings)),
+        building_longitudes=array("d", (row[3] for row in buildings)),
+        building_latitude_order=array("i", sorted(range(len(buildings)), key=lambda index: buildings[index][2])),
+        building_org_offsets=building_org_offsets,
+        building_orgs=building_org_items,
+        activity_ids=array("q", (row[0] for row in activities)),
+        activity_names=StringColumn.from_strings(row[1] for row in activities),
+        activity_org_offsets=activity_org_offsets,
+        activity_orgs=activity_org_items,
+        closure_offsets=closure_offsets,
+        closure_descendants=closure_descendants,
+        closure_depths=closure_depths,
+        trigram_keys=StringColumn.from_strings(trigram_keys),
+        trigram_org_offsets=trigram_org_offsets,
+        trigram_orgs=trigram_org_items,
+    )
+
+
+async def load_snapshot(session: AsyncSession) -> Snapshot:
+    """
+    Reads the whole directory from the database in one repeatable read transaction,
+    the snapshot is built in a worker thread so the event loop keeps serving requests meanwhile
+    Args:
+        session: Database session
+
+    Returns:
+        Snapshot: Snapshot
+    """
+    await session.connection(execution_options={"isolation_level": "REPEATABLE READ"})
+
+    organizations = (
+        await session.execute(
+            select(
+                Organization.id,
+                Organization.name,
+                Organization.search_name,
+                Organization.phone,
+                Organization.building_id,
+            ).order_by(Organization.id)
+        )
+    ).all()
+    buildings = (
+        await session.execute(
+            select(Building.id, Building.address, Building.latitude, Building.longitude).order_by(Building.id)
+        )
+    ).all()
+    activities = (await session.execute(select(Activity.id, Activity.name).order_by(Activity.id))).all()
+    organization_activities = (
+        await session.execute(
+            select(organization_activity.c.organization_id, organization_activity.c.activity_id).order_by(
+                organization_activity.c.organization_id, organization_activity.c.activity_id
+            )
+        )
+    ).all()
+    closures = (
+        await session.execute(select(ActivityClosure.ancestor_id, ActivityClosure.descendant_id, ActivityClosure.depth))
+    ).all()
+
+    return await asyncio.to_thread(
+        build_snapshot, organizations, buildings, activities, organization_activities, closures
+    )
+
+
+class SnapshotManager:
+    """Holds the current snapshot, a reload builds a new snapshot aside and swaps the reference in one assignment"""
+
+    def __init__(self, debounce: float = 0.0, max_delay: float = 0.0):
+        self.snapshot: Snapshot | None = None
+        self.debounce = debounce
+        self.max_delay = max_delay
+        self._reload_lock = asyncio.Lock()
+        self._reload_task: asyncio.Task | None = None
+        self._reload_pending = False
+        self._requested_at = 0.0
+
+    async def reload(self, sessionmanager: DatabaseSessionManager):
+        """Loads a new snapshot from the database and swaps it in"""
+        async with self._reload_lock:
+            async with sessionmanager.session() as session:
+                snapshot = await load_snapshot(session)
+
+            self.swap(snapshot)
+
+    def request_reload(self, sessionmanager: DatabaseSessionManager):
+        """
+        Schedules a reload in the background once requests pause for debounce seconds, but no later than max_delay
+        after the first one, requests arriving during a reload cause exactly one more reload
+        """
+        self._reload_pending = True
+        self._requested_at = monotonic()
+        if self._reload_task is None or self._reload_task.done():
+            self._reload_task = asyncio.create_task(self._reload_while_pending(sessionmanager))
+
+    async def _reload_while_pending(self, sessionmanager: DatabaseSessionManager):
+        while self._reload_pending:
+            first_requested_at = self._requested_at
+            while True:
+                now = monotonic()
+                wait = min(self._requested_at + self.debounce, first_requested_at + self.max_delay) - now
+                if wait <= 0:
+                    break
+                await asyncio.sleep(wait)
+
+            self._reload_pending = False
+            try:
+                await self.reload(sessionmanager)
+            except Exception as exc:
+                logging.error("Error while reloading snapshot - %s", exc)
+
+    def swap(self, snapshot: Snapshot):
+        """Makes the snapshot current, storages created before keep the previous one until they are done"""
+        self.snapshot = snapshot
+        logging.info(
+            "Snapshot swapped: %s organizations, %s buildings, %s activities.",
+            len(snapshot.org_ids),
+            len(snapshot.building_ids),
+            len(snapshot.activity_ids),
+        )
+
+    async def reload_periodically(self, interval: int, reload: Callable[[], Awaitable]):
+        """Calls reload every interval seconds until cancelled, a failed reload keeps the current snapshot"""
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await reload()
+            except Exception as exc:
+                logging.error("Error while reloading snapshot - %s", exc)
+
+
+snapshot_manager = SnapshotManager(settings.snapshot_change_debounce, settings.snapshot_change_max_delay)
+
+
+class SnapshotNotLoadedException(Exception):
+    def __init__(self, message="Snapshot is not loaded"):
+        self.message = message
+        super().__init__(self.message)
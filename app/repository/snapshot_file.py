@@ -0,0 +1,129 @@
+"""
+Binary snapshot file, mapped into memory so that every worker process serves queries from one page-cache copy
+
+Layout (little endian):
+    header      magic "NBSNAP02", u32 section count, u32 reserved
+    directory   per section: 48 bytes of name, 1 byte typecode, 7 bytes padding, u64 offset, u64 item count
+    sections    raw column data, every section starts at an 8-byte boundary
+
+Array columns of the snapshot become one section, string columns become "<name>.offsets" and "<name>.heap" sections.
+"""
+
+import mmap
+import os
+import struct
+from array import array
+from dataclasses import fields
+
+from repository.snapshot import (
+    Snapshot,
+    SnapshotManager,
+    StringColumn,
+)
+
+MAGIC = b"NBSNAP02"
+
+_header = struct.Struct("<8sII")
+_directory_entry = struct.Struct("<48sc7xQQ")
+
+
+def _sections(snapshot: Snapshot) -> list[tuple[str, str, bytes | memoryview, int]]:
+    sections = []
+    for field in fields(Snapshot):
+        column = getattr(snapshot, field.name)
+        if isinstance(column, StringColumn):
+            offsets = array("q", column.offsets)
+            sections.append((f"{field.name}.offsets", "q", memoryview(offsets).cast("B"), len(offsets)))
+            sections.append((f"{field.name}.heap", "B", column.heap, len(column.heap)))
+        else:
+            typed = column if isinstance(column, array) else array(memoryview(column).format, column)
+            sections.append((field.name, typed.typecode, memoryview(typed).cast("B"), len(typed)))
+
+    return sections
+
+
+def write_snapshot(snapshot: Snapshot, path: str):
+    """
+    Writes the snapshot to a file, the file is replaced atomically so running readers keep their mapping
+    Args:
+        snapshot: Snapshot
+        path: File path
+    """
+    sections = _sections(snapshot)
+    offset = _header.size + _directory_entry.size * len(sections)
+    directory = []
+    for name, typecode, data, count in sections:
+        offset = (offset + 7) & ~7
+        directory.append(_directory_entry.pack(name.encode(), typecode.encode(), offset, count))
+        offset += len(data)
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as file:
+        file.write(_header.pack(MAGIC, len(sections), 0))
+        file.write(b"".join(directory))
+        for name, typecode, data, count in sections:
+            file.write(b"\0" * (-file.tell() % 8))
+            file.write(data)
+        file.flush()
+        os.fsync(file.fileno())
+
+    os.replace(tmp_path, path)
+
+
+def open_snapshot(path: str) -> Snapshot:
+    """
+    Maps the snapshot file into memory, columns are typed views over the mapping and nothing is copied
+    Args:
+        path: File path
+
+    Returns:
+        Snapshot: Snapshot backed by the mapping
+    """
+    with open(path, "rb") as file:
+        buffer = memoryview(mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ))
+
+    magic, section_count, _ = _header.unpack_from(buffer, 0)
+    if magic != MAGIC:
+        raise SnapshotFileException(f"{path} is not a snapshot file")
+
+    sections = {}
+    for index in range(section_count):
+        name, typecode, offset, count = _directory_entry.unpack_from(
+            buffer, _header.size + _directory_entry.size * index
+        )
+        typecode = typecode.decode()
+        size = count * array(typecode).itemsize
+        sections[name.rstrip(b"\0").decode()] = buffer[offset : offset + size].cast(typecode)
+
+    columns = {}
+    for field in fields(Snapshot):
+        if field.name in sections:
+            columns[field.name] = sections[field.name]
+        else:
+            columns[field.name] = StringColumn(sections[f"{field.name}.offsets"], sections[f"{field.name}.heap"])
+
+    return Snapshot(**columns)
+
+
+class SnapshotFile:
+    """Snapshot file watched for replacement by the builder"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._version: tuple[int, int] | None = None
+
+    async def open_if_changed(self, manager: SnapshotManager):
+        """Maps the file into the manager when it was replaced since the last call"""
+        stat = os.stat(self.path)
+        version = (stat.st_ino, stat.st_mtime_ns)
+        if version == self._version:
+            return
+
+        manager.swap(open_snapshot(self.path))
+        self._version = version
+
+
+class SnapshotFileException(Exception):
+    def __init__(self, message="Invalid snapshot file"):
+        self.message = message
+        super().__init__(self.message)
@@ -0,0 +1,691 @@
+import asyncio
+import heapq
+import math
+import re
+from bisect import (
+    bisect_left,
+    bisect_right,
+)
+from collections import Counter
+from typing import (
+    Callable,
+    Iterable,
+)
+
+from domain.filters import (
+    FilterKind,
+    OrganizationFilters,
+    RadiusQuery,
+)
+from domain.normalization import (
+    WordSimilarity,
+    normalize_name,
+    word_similarity_bound,
+)
+from domain.schemas import (
+    ActivityFacetRead,
+    ActivityRead,
+    BuildingRead,
+    BuildingSummaryRead,
+    OrganizationRead,
+)
+from repository.constants import (
+    EARTH_RADIUS_KM,
+    NESTED_DEPTH,
+    WORD_SIMILARITY_THRESHOLD,
+)
+from repository.filter_stats import filter_statistics
+from repository.geo import (
+    great_circle_distance,
+    radius_bounding_box,
+)
+from repository.planner import (
+    SNAPSHOT_COSTS,
+    plan_filters,
+)
+from repository.snapshot import (
+    Snapshot,
+    SnapshotNotLoadedException,
+    StringColumn,
+)
+
+
+class ActivityAncestorsCache:
+    """
+    Activity index -> indexes of the activity and its ancestors up to NESTED_DEPTH levels above,
+    derived once per snapshot like filter_statistics.for_snapshot
+    """
+
+    def __init__(self):
+        self._snapshot: Snapshot | None = None
+        self._ancestors: list[tuple[int, ...]] = []
+
+    def for_snapshot(self, snapshot: Snapshot) -> list[tuple[int, ...]]:
+        if self._snapshot is not snapshot:
+            ancestors: list[list[int]] = [[] for _ in snapshot.activity_ids]
+            for ancestor in range(len(snapshot.activity_ids)):
+                for descendant in SnapshotStorage._descendants(snapshot, ancestor, NESTED_DEPTH):
+                    ancestors[descendant].append(ancestor)
+            self._ancestors = [tuple(items) for items in ancestors]
+            self._snapshot = snapshot
+
+        return self._ancestors
+
+
+activity_ancestors = ActivityAncestorsCache()
+
+
+def _required_trigrams(query_length: int) -> int:
+    """Fewest query trigrams a name has to share to reach WORD_SIMILARITY_THRESHOLD, 0 when no name can"""
+    for shared in range(1, query_length + 1):
+        if word_similarity_bound(shared, query_length) >= WORD_SIMILARITY_THRESHOLD:
+            return shared
+
+    return 0
+
+
+class SnapshotStorage:
+    """Answers storage queries in-process from the snapshot that was current when the storage was created"""
+
+    def __init__(self, snapshot: Snapshot | None):
+        self._snapshot = snapshot
+
+    @property
+    def snapshot(self) -> Snapshot:
+        if self._snapshot is None:
+            raise SnapshotNotLoadedException()
+
+        return self._snapshot
+
+    async def get_organizations_by_building_id_with_pagination(
+        self, building_id: int, page: int, limit: int
+    ) -> list[OrganizationRead] | None:
+        """
+        Returns a list of organizations by building id with pagination
+        Args:
+            building_id: Building id
+            page: Page number
+            limit: Limit of items per page
+
+        Returns:
+            list[OrganizationRead]: List of organizations
+        """
+        snapshot = self.snapshot
+        building = snapshot.find(snapshot.building_ids, building_id)
+        if building is None:
+            return
+
+        start = snapshot.building_org_offsets[building] + (page - 1) * limit
+        end = min(start + limit, snapshot.building_org_offsets[building + 1])
+
+        return self._read_many(snapshot, snapshot.building_orgs[start:end])
+
+    async def get_organizations_by_activity_id_with_pagination(
+        self, activity_id: int, page: int, limit: int
+    ) -> list[OrganizationRead] | None:
+        """
+        Returns a list of organizations by activity id with pagination
+        Args:
+            activity_id: Activity id
+            page: Page number
+            limit: Limit of items per page
+
+        Returns:
+            list[OrganizationRead]: List of organizations
+        """
+        snapshot = self.snapshot
+        activity = snapshot.find(snapshot.activity_ids, activity_id)
+        if activity is None:
+            return
+
+        start = snapshot.activity_org_offsets[activity] + (page - 1) * limit
+        end = min(start + limit, snapshot.activity_org_offsets[activity + 1])
+
+        return self._read_many(snapshot, snapshot.activity_orgs[start:end])
+
+    async def get_organization_by_id(self, organization_id: int) -> OrganizationRead | None:
+        """
+        Returns an organization by id
+        Args:
+            organization_id: Organization id
+
+        Returns:
+            OrganizationRead: Organization
+        """
+        snapshot = self.snapshot
+        organization = snapshot.find(snapshot.org_ids, organization_id)
+        if organization is None:
+            return
+
+        return self._read(snapshot, organization)
+
+    async def get_organization_by_name(self, name: str) -> OrganizationRead | None:
+        """
+        Returns an organization by name
+        Args:
+            name: Organization name
+
+        Returns:
+            OrganizationRead: Organization
+        """
+        snapshot = self.snapshot
+        organization = snapshot.find_org_by_name(name)
+        if organization is None:
+            return
+
+        return self._read(snapshot, organization)
+
+    async def search_organizations_by_name_with_pagination(
+        self, name: str, page: int, limit: int
+    ) -> list[OrganizationRead] | None:
+        """
+        Returns a ranked list of organizations whose name matches by substring, prefix or trigram similarity
+        Ranking follows PostgresStorage: exact matches, prefix matches, then pg_trgm word similarity, then id
+        Args:
+            name: Part of organization name, case and Latin/Cyrillic lookalikes are ignored
+            page: Page number
+            limit: Limit of items per page
+
+        Returns:
+            list[OrganizationRead]: List of organizations
+        """
+        snapshot = self.snapshot
+        offset: int = (page - 1) * limit
+        # a common word can match a large share of the names, the event loop keeps serving meanwhile
+        ranked = await asyncio.to_thread(self._ranked_names, snapshot, normalize_name(name), offset + limit)
+
+        return self._read_many(snapshot, ranked[offset:])
+
+    async def get_organizations_in_radius_with_pagination(
+        self, latitude: float, longitude: float, radius: float, page: int, limit: int
+    ) -> list[OrganizationRead] | None:
+        """
+        Returns a list of organizations in radius with pagination
+        Args:
+            latitude: Latitude
+            longitude: Longitude
+            radius: Radius in kilometers
+            page: Page number
+            limit: Limit of items per page
+
+        Returns:
+            list[OrganizationRead]: List of organizations
+        """
+        snapshot = self.snapshot
+        buildings = self._buildings_in_radius(snapshot, latitude, longitude, radius)
+
+        return self._read_page(snapshot, self._building_orgs(snapshot, buildings), page, limit)
+
+    async def get_organizations_in_bbox_with_pagination(
+        self, lat_min: float, lon_min: float, lat_max: float, lon_max: float, page: int, limit: int
+    ) -> list[OrganizationRead] | None:
+        """
+        Returns a list of organizations in bounding box with pagination
+        Args:
+            lat_min: Minimum latitude
+            lon_min: Minimum longitude
+            lat_max: Maximum latitude
+            lon_max: Maximum longitude
+            page: Page number
+            limit: Limit of items per page
+        Returns:
+            list[OrganizationRead]: List of organizations
+        """
+        snapshot = self.snapshot
+        buildings = self._buildings_in_bbox(snapshot, lat_min, lat_max, lon_min, lon_max)
+
+        return self._read_page(snapshot, self._building_orgs(snapshot, buildings), page, limit)
+
+    async def get_organizations_by_nested_activity_id_with_pagination(
+        self, activity_id: int, page: int, limit: int
+    ) -> list[OrganizationRead] | None:
+        """
+        Returns a list of organizations with nested activities by activity id with pagination
+        Args:
+            activity_id: Activity id
+            page: Page number
+            limit: Limit of items per page
+        Returns:
+            list[OrganizationRead]: List of organizations
+        """
+        snapshot = self.snapshot
+        activity = snapshot.find(snapshot.activity_ids, activity_id)
+        if activity is None:
+            return
+
+        return self._read_page(snapshot, self._nested_activity_orgs(snapshot, activity), page, limit)
+
+    async def search_organizations_with_pagination(
+        self, filters: OrganizationFilters, page: int, limit: int
+    ) -> list[OrganizationRead] | None:
+        """
+        Returns a list of organizations matching all given filters with pagination
+        The cheapest filter by estimated cardinality produces candidates, the others are checked per candidate
+        Args:
+            filters: Any combination of organization filters
+            page: Page number
+            limit: Limit of items per page
+
+        Returns:
+            list[OrganizationRead]: List of organizations ordered by id
+        """
+        snapshot = self.snapshot
+
+        return self._read_page(snapshot, self._matching_organizations(snapshot, filters), page, limit)
+
+    async def get_activity_facets(self, filters: OrganizationFilters) -> list[ActivityFacetRead]:
+        """
+        Returns the number of organizations matching the filters per activity, rolled up the activity tree
+        Args:
+            filters: Any combination of organization filters
+
+        Returns:
+            list[ActivityFacetRead]: Activities with their counts, the largest first
+        """
+        snapshot = self.snapshot
+        ancestors = activity_ancestors.for_snapshot(snapshot)
+
+        counts = Counter()
+        offsets = snapshot.org_activity_offsets
+        for organization in self._matching_organizations(snapshot, filters):
+            rollup = set()
+            for activity in snapshot.org_activities[offsets[organization] : offsets[organization + 1]]:
+                rollup.update(ancestors[activity])
+            counts.update(rollup)
+
+        return [
+            ActivityFacetRead.model_construct(
+                id=snapshot.activity_ids[activity], name=snapshot.activity_names[activity], count=count
+            )
+            for activity, count in sorted(counts.items(), key=lambda item: (-item[1], item[0]))
+        ]
+
+    async def get_organizations_in_radius_batch(
+        self, queries: list[RadiusQuery], limit: int
+    ) -> tuple[list[list[int]], list[OrganizationRead]]:
+        """
+        Answers many radius queries in one pass: candidate buildings of all queries are collected through the
+        latitude index first, their trigonometry is computed once and reused by every query they are near
+        Args:
+            queries: Radius queries
+            limit: Maximum organizations per query, the lowest ids first
+
+        Returns:
+            tuple: Organization ids per query in query order and every found organization once, ordered by id
+        """
+        snapshot = self.snapshot
+
+        boxes = []
+        trigonometry: dict[int, tuple[float, float, float]] = {}
+        for query in queries:
+            lat_min, lat_max, lon_min, lon_max = radius_bounding_box(query.latitude, query.longitude, query.radius)
+            buildings = self._buildings_in_bbox(snapshot, lat_min, lat_max, lon_min, lon_max)
+            boxes.append(buildings)
+            for building in buildings:
+                if building not in trigonometry:
+                    latitude = math.radians(snapshot.building_latitudes[building])
+                    trigonometry[building] = (
+                        math.sin(latitude),
+                        math.cos(latitude),
+                        math.radians(snapshot.building_longitudes[building]),
+                    )
+
+        organization_ids: list[list[int]] = []
+        found: set[int] = set()
+        for query, buildings in zip(queries, boxes):
+            latitude, longitude = math.radians(query.latitude), math.radians(query.longitude)
+            sin_latitude, cos_latitude = math.sin(latitude), math.cos(latitude)
+            # comparing cosines avoids acos per pair, the cosine decreases as the distance grows
+            min_cosine = math.cos(min(query.radius / EARTH_RADIUS_KM, math.pi))
+
+            near = [
+                building
+                for building in buildings
+                if sin_latitude * trigonometry[building][0]
+                + cos_latitude * trigonometry[building][1] * math.cos(trigonometry[building][2] - longitude)
+                >= min_cosine
+            ]
+            organizations = heapq.nsmallest(limit, self._building_orgs(snapshot, near))
+            found.update(organizations)
+            organization_ids.append([snapshot.org_ids[organization] for organization in organizations])
+
+        return organization_ids, self._read_many(snapshot, sorted(found))
+
+    async def get_building_by_id(self, building_id: int) -> BuildingSummaryRead | None:
+        """
+        Returns a building with the number of its organizations
+        Args:
+            building_id: Building id
+
+        Returns:
+            BuildingSummaryRead: Building
+        """
+        snapshot = self.snapshot
+        building = bisect_left(snapshot.building_ids, building_id)
+        if building == len(snapshot.building_ids) or snapshot.building_ids[building] != building_id:
+            return
+
+        return self._read_building(snapshot, building)
+
+    async def get_buildings_in_bbox(
+        self, lat_min: float, lon_min: float, lat_max: float, lon_max: float, after_id: int, limit: int
+    ) -> list[BuildingSummaryRead]:
+        """
+        Returns a keyset page of buildings in bounding box with the number of organizations in each
+        Args:
+            lat_min: Minimum latitude
+            lon_min: Minimum longitude
+            lat_max: Maximum latitude
+            lon_max: Maximum longitude
+            after_id: Only buildings with a greater id are returned
+            limit: Limit of items per page
+
+        Returns:
+            list[BuildingSummaryRead]: List of buildings ordered by id
+        """
+        snapshot = self.snapshot
+        buildings = self._buildings_in_bbox(snapshot, lat_min, lat_max, lon_min, lon_max)
+
+        return self._read_buildings_page(snapshot, buildings, after_id, limit)
+
+    async def get_buildings_in_radius(
+        self, latitude: float, longitude: float, radius: float, after_id: int, limit: int
+    ) -> list[BuildingSummaryRead]:
+        """
+        Returns a keyset page of buildings in radius with the number of organizations in each
+        Args:
+            latitude: Latitude
+            longitude: Longitude
+            radius: Radius in kilometers
+            after_id: Only buildings with a greater id are returned
+            limit: Limit of items per page
+
+        Returns:
+            list[BuildingSummaryRead]: List of buildings ordered by id
+        """
+        snapshot = self.snapshot
+        buildings = self._buildings_in_radius(snapshot, latitude, longitude, radius)
+
+        return self._read_buildings_page(snapshot, buildings, after_id, limit)
+
+    def _matching_organizations(self, snapshot: Snapshot, filters: OrganizationFilters) -> list[int]:
+        """Organizations matching all filters: candidates of the cheapest filter checked against the others"""
+        driver, *rest = plan_filters(filters, filter_statistics.for_snapshot(snapshot), SNAPSHOT_COSTS)
+        checks = [self._filter_check(snapshot, kind, filters) for kind in rest]
+
+        return [
+            organization
+            for organization in self._filter_candidates(snapshot, driver, filters)
+            if all(check(organization) for check in checks)
+        ]
+
+    def _filter_candidates(self, snapshot: Snapshot, kind: FilterKind, filters: OrganizationFilters) -> Iterable[int]:
+        """Organizations matching one filter, read through the snapshot structure serving it"""
+        if kind == "building":
+            building = snapshot.find(snapshot.building_ids, filters.building_id)
+            if building is None:
+                return ()
+            return snapshot.building_orgs[
+                snapshot.building_org_offsets[building] : snapshot.building_org_offsets[building + 1]
+            ]
+        if kind == "activity":
+            activity = snapshot.find(snapshot.activity_ids, filters.activity_id)
+            if activity is None:
+                return ()
+            return snapshot.activity_orgs[
+                snapshot.activity_org_offsets[activity] : snapshot.activity_org_offsets[activity + 1]
+            ]
+        if kind == "nested_activity":
+            activity = snapshot.find(snapshot.activity_ids, filters.nested_activity_id)
+            return () if activity is None else self._nested_activity_orgs(snapshot, activity)
+        if kind == "bbox":
+            buildings = self._buildings_in_bbox(
+                snapshot, filters.lat_min, filters.lat_max, filters.lon_min, filters.lon_max
+            )
+            return self._building_orgs(snapshot, buildings)
+        if kind == "radius":
+            buildings = self._buildings_in_radius(snapshot, filters.latitude, filters.longitude, filters.radius)
+            return self._building_orgs(snapshot, buildings)
+        if kind == "name":
+            matches, _ = self._matching_names(snapshot, WordSimilarity(normalize_name(filters.name)))
+            return matches
+
+        address = filters.address.lower()
+        buildings = (
+            building
+            for building in range(len(snapshot.building_ids))
+            if address in snapshot.building_addresses[building].lower()
+        )
+        return self._building_orgs(snapshot, buildings)
+
+    def _filter_check(
+        self, snapshot: Snapshot, kind: FilterKind, filters: OrganizationFilters
+    ) -> Callable[[int], bool]:
+        """Predicate telling whether an organization matches one filter"""
+        if kind == "building":
+            building = snapshot.find(snapshot.building_ids, filters.building_id)
+            return lambda organization: snapshot.org_buildings[organization] == building
+        if kind in ("activity", "nested_activity"):
+            if kind == "activity":
+                activity = snapshot.find(snapshot.activity_ids, filters.activity_id)
+                activities = set() if activity is None else {activity}
+            else:
+                activity = snapshot.find(snapshot.activity_ids, filters.nested_activity_id)
+                activities = set() if activity is None else set(self._descendants(snapshot, activity, NESTED_DEPTH))
+            offsets = snapshot.org_activity_offsets
+            return lambda organization: not activities.isdisjoint(
+                snapshot.org_activities[offsets[organization] : offsets[organization + 1]]
+            )
+        if kind == "bbox":
+            return lambda organization: (
+                filters.lat_min <= snapshot.building_latitudes[snapshot.org_buildings[organization]] <= filters.lat_max
+                and filters.lon_min
+                <= snapshot.building_longitudes[snapshot.org_buildings[organization]]
+                <= filters.lon_max
+            )
+        if kind == "radius":
+            return lambda organization: (
+                great_circle_distance(
+                    filters.latitude,
+                    filters.longitude,
+                    snapshot.building_latitudes[snapshot.org_buildings[organization]],
+                    snapshot.building_longitudes[snapshot.org_buildings[organization]],
+                )
+                <= filters.radius
+            )
+        if kind == "name":
+            similarity = WordSimilarity(normalize_name(filters.name))
+            return lambda organization: self._name_matches(similarity, snapshot.org_search_names[organization])
+
+        address = filters.address.lower()
+        return lambda organization: address in snapshot.building_addresses[snapshot.org_buildings[organization]].lower()
+
+    @staticmethod
+    def _name_matches(similarity: WordSimilarity, search_name: str) -> bool:
+        return similarity.query in search_name or similarity(search_name) >= WORD_SIMILARITY_THRESHOLD
+
+    @classmethod
+    def _matching_names(cls, snapshot: Snapshot, similarity: WordSimilarity) -> tuple[dict[int, bool], Counter]:
+        """
+        Organizations whose search name contains the name or is word similar to it, each with whether the search
+        name starts with the name, and the number of query trigrams every organization shares with the name.
+        Substrings are found by one scan over the UTF-8 heap, the shared trigrams are counted over the posting lists
+        and only names sharing enough of them are scored.
+        """
+        shared = Counter()
+        for trigram in similarity.query_trigrams:
+            shared.update(snapshot.find_trigram_orgs(trigram))
+
+        matches = cls._containing(snapshot.org_search_names, similarity.query)
+        required = _required_trigrams(len(similarity.query_trigrams))
+        if required:
+            matches.update(
+                (organization, False)
+                for organization, count in shared.items()
+                if count >= required
+                and organization not in matches
+                and similarity(snapshot.org_search_names[organization]) >= WORD_SIMILARITY_THRESHOLD
+            )
+
+        return matches, shared
+
+    @classmethod
+    def _ranked_names(cls, snapshot: Snapshot, normalized_name: str, count: int) -> list[int]:
+        """
+        First count organizations matching the name in the order of PostgresStorage. Matches are visited by their best
+        possible rank, computed from the upper bound of their similarity, and the word similarity of a match is only
+        computed when it is visited, so a page costs about count similarity computations rather than one per match.
+        """
+        similarity = WordSimilarity(normalized_name)
+        matches, shared = cls._matching_names(snapshot, similarity)
+        names, offsets = snapshot.org_search_names, snapshot.org_search_names.offsets
+        length = len(normalized_name.encode())
+        bounds = [
+            -word_similarity_bound(count, len(similarity.query_trigrams))
+            for count in range(len(similarity.query_trigrams) + 1)
+        ]
+
+        unvisited = [
+            (
+                not prefix or offsets[organization + 1] - offsets[organization] != length,
+                not prefix,
+                bounds[shared[organization]],
+                organization,
+            )
+            for organization, prefix in matches.items()
+        ]
+        heapq.heapify(unvisited)
+
+        ranked, visited = [], []
+        while unvisited and len(ranked) < count:
+            best_possible = heapq.heappop(unvisited)
+            # no unvisited match can rank above a visited one whose rank is not above the best possible rank
+            while visited and visited[0] <= best_possible and len(ranked) < count:
+                ranked.append(heapq.heappop(visited)[-1])
+            not_exact, not_prefix, _, organization = best_possible
+            heapq.heappush(visited, (not_exact, not_prefix, -similarity(names[organization]), organization))
+        while visited and len(ranked) < count:
+            ranked.append(heapq.heappop(visited)[-1])
+
+        return ranked
+
+    @staticmethod
+    def _containing(column: StringColumn, value: str) -> dict[int, bool]:
+        """Indexes of the strings containing the value, each with whether the string starts with it"""
+        if not value:
+            return dict.fromkeys(range(len(column)), True)
+
+        pattern = re.compile(re.escape(value.encode()))
+        offsets = column.offsets
+        found, position = {}, 0
+        while match := pattern.search(column.heap, position):
+            index = bisect_right(offsets, match.start()) - 1
+            # a match running over the end of a string spans two neighbours
+            if match.end() <= offsets[index + 1]:
+                found[index] = match.start() == offsets[index]
+                position = offsets[index + 1]
+            else:
+                position = match.start() + 1
+
+        return found
+
+    def _nested_activity_orgs(self, snapshot: Snapshot, activity: int) -> set[int]:
+        organizations = set()
+        for descendant in self._descendants(snapshot, activity, NESTED_DEPTH):
+            start, end = snapshot.activity_org_offsets[descendant], snapshot.activity_org_offsets[descendant + 1]
+            organizations.update(snapshot.activity_orgs[start:end])
+
+        return organizations
+
+    @staticmethod
+    def _descendants(snapshot: Snapshot, activity: int, max_depth: int) -> Iterable[int]:
+        start, end = snapshot.closure_offsets[activity], snapshot.closure_offsets[activity + 1]
+        # closure rows of an ancestor are ordered by depth
+        end = bisect_right(snapshot.closure_depths, max_depth, lo=start, hi=end)
+
+        return snapshot.closure_descendants[start:end]
+
+    @staticmethod
+    def _buildings_in_bbox(
+        snapshot: Snapshot, lat_min: float, lat_max: float, lon_min: float | None, lon_max: float | None
+    ) -> list[int]:
+        order = snapshot.building_latitude_order
+        latitudes, longitudes = snapshot.building_latitudes, snapshot.building_longitudes
+        start = bisect_left(order, lat_min, key=latitudes.__getitem__)
+        end = bisect_right(order, lat_max, key=latitudes.__getitem__, lo=start)
+
+        if lon_min is None:
+            return list(order[start:end])
+
+        return [building for building in order[start:end] if lon_min <= longitudes[building] <= lon_max]
+
+    def _buildings_in_radius(self, snapshot: Snapshot, latitude: float, longitude: float, radius: float) -> list[int]:
+        lat_min, lat_max, lon_min, lon_max = radius_bounding_box(latitude, longitude, radius)
+
+        return [
+            building
+            for building in self._buildings_in_bbox(snapshot, lat_min, lat_max, lon_min, lon_max)
+            if great_circle_distance(
+                latitude, longitude, snapshot.building_latitudes[building], snapshot.building_longitudes[building]
+            )
+            <= radius
+        ]
+
+    @staticmethod
+    def _building_orgs(snapshot: Snapshot, buildings: Iterable[int]) -> list[int]:
+        organizations = []
+        for building in buildings:
+            organizations.extend(
+                snapshot.building_orgs[
+                    snapshot.building_org_offsets[building] : snapshot.building_org_offsets[building + 1]
+                ]
+            )
+
+        return organizations
+
+    def _read_page(
+        self, snapshot: Snapshot, organizations: Iterable[int], page: int, limit: int
+    ) -> list[OrganizationRead]:
+        # organization indexes follow id order, so sorting indexes is ordering by id
+        offset: int = (page - 1) * limit
+
+        return self._read_many(snapshot, sorted(organizations)[offset : offset + limit])
+
+    def _read_many(self, snapshot: Snapshot, organizations: Iterable[int]) -> list[OrganizationRead]:
+        return [self._read(snapshot, organization) for organization in organizations]
+
+    def _read_buildings_page(
+        self, snapshot: Snapshot, buildings: list[int], after_id: int, limit: int
+    ) -> list[BuildingSummaryRead]:
+        # building indexes follow id order as organization indexes do
+        buildings.sort()
+        start = bisect_right(buildings, after_id, key=snapshot.building_ids.__getitem__)
+
+        return [self._read_building(snapshot, building) for building in buildings[start : start + limit]]
+
+    @staticmethod
+    def _read_building(snapshot: Snapshot, building: int) -> BuildingSummaryRead:
+        return BuildingSummaryRead.model_construct(
+            id=snapshot.building_ids[building],
+            address=snapshot.building_addresses[building],
+            latitude=snapshot.building_latitudes[building],
+            longitude=snapshot.building_longitudes[building],
+            organization_count=snapshot.building_org_offsets[building + 1] - snapshot.building_org_offsets[building],
+        )
+
+    @staticmethod
+    def _read(snapshot: Snapshot, organization: int) -> OrganizationRead:
+        start, end = snapshot.org_activity_offsets[organization], snapshot.org_activity_offsets[organization + 1]
+
+        return OrganizationRead.model_construct(
+            id=snapshot.org_ids[organization],
+            name=snapshot.org_names[organization],
+            phone=snapshot.org_phones[organization],
+            building=BuildingRead.model_construct(
+                address=snapshot.building_addresses[snapshot.org_buildings[organization]]
+            ),
+            activities=[
+                ActivityRead.model_construct(name=snapshot.activity_names[activity])
+                for activity in snapshot.org_activities[start:end]
+            ],
+        )
@@ -1,16 +1,71 @@
-from config import settings
+from math import ceil
+
+from config import (
+    ApiKeySettings,
+    settings,
+)
 from fastapi import (
     HTTPException,
     Security,
 )
 from fastapi.security import APIKeyHeader
-from starlette.status import HTTP_403_FORBIDDEN
+from observability.metrics import API_KEY_REJECTIONS
+from security.rate_limit import (
+    ApiKeyLimiter,
+    KeyPolicy,
+    key_fingerprint,
+)
+from starlette.status import (
+    HTTP_403_FORBIDDEN,
+    HTTP_429_TOO_MANY_REQUESTS,
+)
 
 api_key_header = APIKeyHeader(name=settings.api_key_header, auto_error=False)
 
 
+def _build_policies() -> dict[str, KeyPolicy]:
+    keys = {
+        settings.api_key: ApiKeySettings(
+            name="default",
+            rate=settings.api_key_rate,
+            burst=settings.api_key_burst,
+            max_concurrency=settings.api_key_max_concurrency,
+        )
+    }
+    # sorted so that every worker assigns the same shared bucket slot to a key
+    keys.update(sorted(settings.api_keys.items()))
+
+    return {
+        key: KeyPolicy(
+            name=limits.name,
+            slot=slot,
+            rate=limits.rate,
+            burst=limits.burst or max(limits.rate, 1.0),
+            max_concurrency=limits.max_concurrency,
+            fingerprint=key_fingerprint(limits.name),
+        )
+        for slot, (key, limits) in enumerate(keys.items())
+    }
+
+
+limiter = ApiKeyLimiter(_build_policies())
+
+
 async def verify_api_key(api_key: str = Security(api_key_header)):
-    if api_key == settings.api_key:
-        return api_key_header
-    else:
+    policy = limiter.policies.get(api_key)
+    if policy is None:
         raise HTTPException(status_code=HTTP_403_FORBIDDEN, detail="Invalid API Key")
+
+    retry_after = limiter.acquire(policy)
+    if retry_after:
+        API_KEY_REJECTIONS.inc(policy.name)
+        raise HTTPException(
+            status_code=HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many requests",
+            headers={"Retry-After": str(ceil(retry_after))},
+        )
+
+    try:
+        yield policy.name
+    finally:
+        limiter.release(policy)
@@ -0,0 +1,139 @@
+"""
+Per API key token buckets and concurrency caps
+
+Buckets live in process memory, or in a small file mapped by every worker of the host when a shared path is
+configured. A shared bucket is updated under an fcntl lock on its own slot, so checks stay O(1) and independent
+keys never contend. A slot records the fingerprint of its key and starts over when another key owns it after the
+configured keys changed. Concurrency caps are always per worker process, a crashed worker cannot leak them.
+"""
+
+import fcntl
+import hashlib
+import mmap
+import os
+import struct
+from dataclasses import dataclass
+from time import monotonic
+
+# key fingerprint, tokens, last refill (monotonic seconds, shared by all processes of the host)
+SLOT = struct.Struct("<Qdd")
+
+
+def key_fingerprint(name: str) -> int:
+    """Stable 64-bit hash of a key name, unlike hash() it is the same in every process"""
+    return int.from_bytes(hashlib.blake2b(name.encode(), digest_size=8).digest(), "little")
+
+
+@dataclass(frozen=True)
+class KeyPolicy:
+    """
+    Limits of one API key
+    rate: Requests per second refilled into the bucket, 0 disables the rate limit
+    burst: Bucket capacity
+    max_concurrency: Requests processed at once by one worker, 0 disables the cap
+    """
+
+    name: str
+    slot: int
+    rate: float
+    burst: float
+    max_concurrency: int
+    fingerprint: int = 0
+
+
+def _take(tokens: float, updated_at: float, now: float, rate: float, burst: float) -> tuple[float, float]:
+    """Returns the tokens left after refilling and taking one token and the seconds to wait when none was left"""
+    tokens = min(burst, tokens + (now - updated_at) * rate)
+    if tokens >= 1.0:
+        return tokens - 1.0, 0.0
+
+    return tokens, (1.0 - tokens) / rate
+
+
+class LocalBuckets:
+    def __init__(self, slots: int):
+        self._tokens = [float("nan")] * slots
+        self._updated_at = [0.0] * slots
+
+    def take(self, policy: KeyPolicy) -> float:
+        now = monotonic()
+        tokens = self._tokens[policy.slot]
+        if tokens != tokens:
+            tokens = policy.burst
+
+        tokens, retry_after = _take(tokens, self._updated_at[policy.slot], now, policy.rate, policy.burst)
+        self._tokens[policy.slot] = tokens
+        self._updated_at[policy.slot] = now
+
+        return retry_after
+
+
+class SharedBuckets:
+    def __init__(self, path: str, slots: int):
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        size = SLOT.size * max(slots, 1)
+        if os.fstat(self._fd).st_size < size:
+            os.ftruncate(self._fd, size)
+        self._map = mmap.mmap(self._fd, size)
+
+    def take(self, policy: KeyPolicy) -> float:
+        offset = policy.slot * SLOT.size
+        fcntl.lockf(self._fd, fcntl.LOCK_EX, SLOT.size, offset)
+        try:
+            now = monotonic()
+            fingerprint, tokens, updated_at = SLOT.unpack_from(self._map, offset)
+            if fingerprint != policy.fingerprint or updated_at == 0.0 or updated_at > now:
+                # fresh file, a slot of another key before the keys changed or a file left over from before a reboot
+                tokens, updated_at = policy.burst, now
+
+            tokens, retry_after = _take(tokens, updated_at, now, policy.rate, policy.burst)
+            SLOT.pack_into(self._map, offset, policy.fingerprint, tokens, now)
+        finally:
+            fcntl.lockf(self._fd, fcntl.LOCK_UN, SLOT.size, offset)
+
+        return retry_after
+
+    def close(self):
+        self._map.close()
+        os.close(self._fd)
+
+
+class ApiKeyLimiter:
+    """Rate limits and concurrency caps of the configured API keys"""
+
+    def __init__(self, policies: dict[str, KeyPolicy]):
+        self.policies = policies
+        self.buckets: LocalBuckets | SharedBuckets = LocalBuckets(len(policies))
+        self._in_flight = [0] * len(policies)
+
+    def open_shared(self, path: str):
+        """Moves the buckets into the file shared by the workers of the host, called at startup of every worker"""
+        self.buckets = SharedBuckets(path, len(self.policies))
+
+    def close(self):
+        if isinstance(self.buckets, SharedBuckets):
+            self.buckets.close()
+            self.buckets = LocalBuckets(len(self.policies))
+
+    def acquire(self, policy: KeyPolicy) -> float:
+        """
+        Takes a token and a concurrency slot of the key
+        Args:
+            policy: Policy of the key
+
+        Returns:
+            float: 0 when the request may proceed, otherwise the seconds the client should wait
+        """
+        if policy.max_concurrency and self._in_flight[policy.slot] >= policy.max_concurrency:
+            return 1.0
+
+        if policy.rate:
+            retry_after = self.buckets.take(policy)
+            if retry_after:
+                return retry_after
+
+        self._in_flight[policy.slot] += 1
+        return 0.0
+
+    def release(self, policy: KeyPolicy):
+        self._in_flight[policy.slot] -= 1
@@ -0,0 +1,288 @@
+import asyncio
+import heapq
+from bisect import (
+    bisect_left,
+    insort,
+)
+from collections import (
+    Counter,
+    OrderedDict,
+)
+from typing import (
+    Iterable,
+    Literal,
+    NamedTuple,
+)
+
+from domain.normalization import normalize_name
+from protocols.autocomplete import AutocompleteSource
+
+SuggestionKind = Literal["organization", "activity"]
+
+# changed (key, id) pairs up to which the sorted key list is edited in place, larger batches rewrite it in one merge
+IN_PLACE_KEY_CHANGES = 64
+
+
+class Suggestion(NamedTuple):
+    kind: SuggestionKind
+    id: int
+    name: str
+    weight: float
+
+
+class AutocompleteIndex:
+    """
+    Prefix index over normalized names of one kind of entity
+
+    Every word suffix of a name is a key ("ооо рога и копыта" is found by "рог" and "коп"), keys are kept in one sorted
+    list of (key, id) pairs, so a prefix lookup is two binary searches plus a top-k pass over the matching range.
+    Top-k answers are cached per prefix, an update drops only the cached prefixes of the changed names.
+    """
+
+    def __init__(self, kind: SuggestionKind, max_limit: int = 20, cache_size: int = 4096):
+        self.kind = kind
+        self.max_limit = max_limit
+        self.cache_size = cache_size
+        self._keys: list[tuple[str, int]] = []
+        self._entries: dict[int, Suggestion] = {}
+        self._cache: OrderedDict[str, list[Suggestion]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def build(self, entries: Iterable[tuple[int, str, float]]):
+        """
+        Replaces the whole index content
+        Args:
+            entries: Tuples of entity id, name and popularity weight
+        """
+        self._entries = {id_: Suggestion(self.kind, id_, name, weight) for id_, name, weight in entries}
+        self._keys = sorted((key, id_) for id_, entry in self._entries.items() for key in self._name_keys(entry.name))
+        self._cache.clear()
+
+    def update(self, upserts: Iterable[tuple[int, str, float | None]] = (), removals: Iterable[int] = ()):
+        """
+        Applies a batch of changes: the sorted key list is rewritten once and only the cached prefixes matching
+        an old or new name of a changed entry are dropped
+        Args:
+            upserts: Tuples of entity id, name and popularity weight, the weight is kept when None
+            removals: Ids of entities to remove, a removal wins over an upsert of the same id
+        """
+        changed: dict[int, Suggestion | None] = {}
+        for id_, name, weight in upserts:
+            previous = changed.get(id_, self._entries.get(id_))
+            if weight is None:
+                weight = previous.weight if previous else 0.0
+            changed[id_] = Suggestion(self.kind, id_, name, weight)
+        for id_ in removals:
+            changed[id_] = None
+
+        stale, fresh, touched = set(), [], set()
+        for id_, entry in changed.items():
+            previous = self._entries.get(id_)
+            if previous is None and entry is None:
+                continue
+
+            old_keys = self._name_keys(previous.name) if previous else set()
+            new_keys = self._name_keys(entry.name) if entry else set()
+            if old_keys != new_keys:
+                stale.update((key, id_) for key in old_keys - new_keys)
+                fresh.extend((key, id_) for key in new_keys - old_keys)
+            touched |= old_keys | new_keys
+
+            if entry is None:
+                del self._entries[id_]
+            else:
+                self._entries[id_] = entry
+
+        self._replace_keys(stale, fresh)
+        self._invalidate(touched)
+
+    def upsert(self, id_: int, name: str, weight: float | None = None):
+        """
+        Adds an entry or updates its name and weight, the weight is kept when not given
+        Args:
+            id_: Entity id
+            name: Entity name
+            weight: Popularity weight
+        """
+        self.update(upserts=[(id_, name, weight)])
+
+    def add_weight(self, id_: int, delta: float):
+        """
+        Increases the popularity weight of an entry
+        Args:
+            id_: Entity id
+            delta: Weight increment
+        """
+        entry = self._entries.get(id_)
+        if not entry:
+            return
+
+        self._entries[id_] = entry._replace(weight=entry.weight + delta)
+        self._invalidate(self._name_keys(entry.name))
+
+    def remove(self, id_: int):
+        """
+        Removes an entry if it exists
+        Args:
+            id_: Entity id
+        """
+        self.update(removals=[id_])
+
+    def suggest(self, prefix: str, limit: int) -> list[Suggestion]:
+        """
+        Returns the heaviest entries having a word that starts with the prefix
+        Args:
+            prefix: Normalized prefix
+            limit: Maximum number of suggestions
+
+        Returns:
+            list[Suggestion]: Suggestions ordered by weight
+        """
+        if not prefix:
+            return []
+
+        cached = self._cache.get(prefix)
+        if cached is not None:
+            self._cache.move_to_end(prefix)
+            return cached[:limit]
+
+        start = bisect_left(self._keys, (prefix,))
+        end = bisect_left(self._keys, (prefix + "\U0010ffff",), lo=start)
+        ids = {id_ for _, id_ in self._keys[start:end]}
+        suggestions = heapq.nsmallest(
+            self.max_limit,
+            (self._entries[id_] for id_ in ids),
+            key=lambda entry: (-entry.weight, len(entry.name), entry.name),
+        )
+
+        self._cache[prefix] = suggestions
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+        return suggestions[:limit]
+
+    def hot_prefixes(self, max_prefixes: int, sample_step: int = 64) -> list[str]:
+        """
+        Returns the prefixes worth caching ahead of time: every one letter prefix and the most common two letter
+        ones, estimated from a sample of keys. Short prefixes scan the widest key ranges and are typed the most
+        Args:
+            max_prefixes: Maximum number of prefixes
+            sample_step: Every sample_step-th key is counted
+
+        Returns:
+            list[str]: Prefixes, shortest first
+        """
+        counts = Counter(key[:2] for key, _ in self._keys[::sample_step])
+        single = sorted({prefix[:1] for prefix in counts})
+        double = [prefix for prefix, _ in counts.most_common() if len(prefix) == 2]
+
+        return (single + double)[:max_prefixes]
+
+    def _replace_keys(self, stale: set[tuple[str, int]], fresh: list[tuple[str, int]]):
+        """Removes the stale (key, id) pairs and inserts the fresh ones keeping the key list sorted"""
+        if len(stale) + len(fresh) <= IN_PLACE_KEY_CHANGES:
+            for pair in stale:
+                position = bisect_left(self._keys, pair)
+                if position < len(self._keys) and self._keys[position] == pair:
+                    del self._keys[position]
+            for pair in fresh:
+                insort(self._keys, pair)
+            return
+
+        kept = [pair for pair in self._keys if pair not in stale] if stale else self._keys
+        self._keys = list(heapq.merge(kept, sorted(fresh)))
+
+    def _invalidate(self, keys: set[str]):
+        """Drops the cached answers of every prefix of the keys"""
+        if sum(len(key) for key in keys) <= len(self._cache):
+            for key in keys:
+                for end in range(1, len(key) + 1):
+                    self._cache.pop(key[:end], None)
+            return
+
+        ordered = sorted(keys)
+        for prefix in list(self._cache):
+            position = bisect_left(ordered, prefix)
+            if position < len(ordered) and ordered[position].startswith(prefix):
+                del self._cache[prefix]
+
+    @staticmethod
+    def _name_keys(name: str) -> set[str]:
+        words = normalize_name(name).split(" ")
+
+        return {" ".join(words[position:]) for position in range(len(words)) if words[position]}
+
+
+class Autocomplete:
+    """Holds the organization and activity indexes and merges their suggestions"""
+
+    def __init__(self):
+        self.organizations = AutocompleteIndex("organization")
+        self.activities = AutocompleteIndex("activity")
+
+    async def load(self, source: AutocompleteSource):
+        """
+        Builds both indexes from the source
+        Args:
+            source: Source of names and weights
+        """
+        self.organizations.build(await source.get_organization_entries())
+        self.activities.build(await source.get_activity_entries())
+
+    async def apply_changes(self, source: AutocompleteSource, organization_ids: set[int], activity_ids: set[int]):
+        """
+        Re-reads changed entries from the source, entries missing from the source are removed
+        Args:
+            source: Source of names and weights
+            organization_ids: Ids of changed organizations
+            activity_ids: Ids of changed activities
+        """
+        for index, ids, get_entries in (
+            (self.organizations, organization_ids, source.get_organization_entries),
+            (self.activities, activity_ids, source.get_activity_entries),
+        ):
+            if not ids:
+                continue
+
+            entries = await get_entries(list(ids))
+            index.update(upserts=entries, removals=ids - {entry[0] for entry in entries})
+
+    async def warm(self, max_prefixes: int = 256):
+        """
+        Fills the prefix caches of both indexes with their hot prefixes, yielding to the event loop in between
+        Args:
+            max_prefixes: Maximum number of prefixes per index
+        """
+        for index in (self.organizations, self.activities):
+            for prefix in index.hot_prefixes(max_prefixes):
+                index.suggest(prefix, index.max_limit)
+                await asyncio.sleep(0)
+
+    def suggest(self, query: str, limit: int, kind: SuggestionKind | None = None) -> list[Suggestion]:
+        """
+        Returns top-k completions for the typed text
+        Args:
+            query: Typed text
+            limit: Maximum number of suggestions
+            kind: Restricts suggestions to organizations or activities
+
+        Returns:
+            list[Suggestion]: Suggestions ordered by weight
+        """
+        prefix = normalize_name(query)
+
+        if kind == "organization":
+            return self.organizations.suggest(prefix, limit)
+        if kind == "activity":
+            return self.activities.suggest(prefix, limit)
+
+        return heapq.nsmallest(
+            limit,
+            self.organizations.suggest(prefix, limit) + self.activities.suggest(prefix, limit),
+            key=lambda entry: (-entry.weight, len(entry.name), entry.name),
+        )
+
+
+autocomplete = Autocomplete()
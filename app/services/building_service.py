@@ -0,0 +1,112 @@
+import logging
+
+from domain.schemas import BuildingSummaryRead
+from observability.metrics import SERIALIZATION_DURATION
+from protocols.storage import Storage
+from services.exceptions import (
+    BuildingNotFoundException,
+    StorageInternalException,
+)
+
+
+class CustomBuildingService:
+    def __init__(self, storage: Storage):
+        self.storage = storage
+
+    async def get_building_by_id(self, building_id: int) -> dict:
+        """
+        Returns a building with the number of its organizations
+        Args:
+            building_id: Building id
+
+        Returns:
+            dict: Building
+        """
+        try:
+            building_dto: BuildingSummaryRead = await self.storage.get_building_by_id(building_id)
+        except Exception as exc:
+            logging.error("Error while getting building from storage by id %s - %s", building_id, exc)
+            raise StorageInternalException(message="Error while getting building from storage by id")
+
+        if not building_dto:
+            raise BuildingNotFoundException()
+
+        with SERIALIZATION_DURATION.time("dump"):
+            building = building_dto.model_dump()
+
+        return building
+
+    async def get_buildings_in_bbox(
+        self, lat_min: float, lon_min: float, lat_max: float, lon_max: float, after_id: int, limit: int
+    ) -> dict:
+        """
+        Returns a keyset page of buildings in bounding box with the number of organizations in each
+        Args:
+            lat_min: Minimum latitude
+            lon_min: Minimum longitude
+            lat_max: Maximum latitude
+            lon_max: Maximum longitude
+            after_id: Only buildings with a greater id are returned
+            limit: Limit of items per page
+
+        Returns:
+            dict: Buildings and the after_id of the next page
+        """
+        try:
+            buildings_dto: list[BuildingSummaryRead] = await self.storage.get_buildings_in_bbox(
+                lat_min, lon_min, lat_max, lon_max, after_id, limit
+            )
+        except Exception as exc:
+            logging.error(
+                "Error while getting buildings from storage in bbox %s, %s, %s, %s - %s",
+                lat_min,
+                lon_min,
+                lat_max,
+                lon_max,
+                exc,
+            )
+            raise StorageInternalException(message="Error while getting buildings from storage in bbox")
+
+        return self._page(buildings_dto, limit)
+
+    async def get_buildings_in_radius(
+        self, latitude: float, longitude: float, radius: float, after_id: int, limit: int
+    ) -> dict:
+        """
+        Returns a keyset page of buildings in radius with the number of organizations in each
+        Args:
+            latitude: Latitude
+            longitude: Longitude
+            radius: Radius in kilometers
+            after_id: Only buildings with a greater id are returned
+            limit: Limit of items per page
+
+        Returns:
+            dict: Buildings and the after_id of the next page
+        """
+        try:
+            buildings_dto: list[BuildingSummaryRead] = await self.storage.get_buildings_in_radius(
+                latitude, longitude, radius, after_id, limit
+            )
+        except Exception as exc:
+            logging.error(
+                "Error while getting buildings from storage in radius %s km of %s, %s - %s",
+                radius,
+                latitude,
+                longitude,
+                exc,
+            )
+            raise StorageInternalException(message="Error while getting buildings from storage in radius")
+
+        return self._page(buildings_dto, limit)
+
+    @staticmethod
+    def _page(buildings_dto: list[BuildingSummaryRead], limit: int) -> dict:
+        # an empty area is a valid answer for a map, so no page raises BuildingNotFoundException
+        with SERIALIZATION_DURATION.time("dump"):
+            buildings = [building.model_dump() for building in buildings_dto]
+
+        return {
+            "buildings": buildings,
+            "next_after_id": buildings[-1]["id"] if len(buildings) == limit else None,
+        }
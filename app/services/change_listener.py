@@ -0,0 +1,170 @@
+import asyncio
+import json
+import logging
+from contextlib import suppress
+from dataclasses import dataclass
+from typing import (
+    Awaitable,
+    Callable,
+)
+
+import asyncpg
+
+CHANGE_CHANNEL = "directory_changes"
+# table of the notification tools.build_snapshot sends after replacing the snapshot file
+SNAPSHOT_FILE_TABLE = "snapshot_file"
+
+
+@dataclass(frozen=True)
+class Change:
+    """Row change reported by the notify_directory_change trigger"""
+
+    table: str
+    op: str
+    id: int | None = None
+    ref: int | None = None
+
+
+ChangeHandler = Callable[[list[Change]], Awaitable[None]]
+ResyncHandler = Callable[[], Awaitable[None]]
+
+
+class ChangeListener:
+    """
+    Listens to directory change notifications on a dedicated asyncpg connection and fans them out to subscribers
+
+    Notifications are coalesced into batches. Whenever changes may have been missed (reconnect, queue overflow,
+    truncate or an explicit resync notification from a bulk load) subscribers get a full resync instead.
+    """
+
+    def __init__(
+        self,
+        channel: str = CHANGE_CHANNEL,
+        batch_window: float = 0.05,
+        queue_size: int = 10_000,
+        health_check_interval: float = 10.0,
+        reconnect_delay: float = 1.0,
+        max_reconnect_delay: float = 30.0,
+    ):
+        self.channel = channel
+        self.batch_window = batch_window
+        self.health_check_interval = health_check_interval
+        self.reconnect_delay = reconnect_delay
+        self.max_reconnect_delay = max_reconnect_delay
+        self._queue: asyncio.Queue[Change] = asyncio.Queue(maxsize=queue_size)
+        self._change_handlers: list[ChangeHandler] = []
+        self._resync_handlers: list[ResyncHandler] = []
+        self._resync_needed = False
+        self._tasks: list[asyncio.Task] = []
+
+    def subscribe(self, on_change: ChangeHandler, on_resync: ResyncHandler):
+        self._change_handlers.append(on_change)
+        self._resync_handlers.append(on_resync)
+
+    async def start(self, *dsns: str):
+        """Listens on every database, changes of all of them go through one dispatcher"""
+        self._tasks = [asyncio.create_task(self._listen(dsn)) for dsn in dsns]
+        self._tasks.append(asyncio.create_task(self._dispatch()))
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        for task in self._tasks:
+            with suppress(asyncio.CancelledError):
+                await task
+        self._tasks = []
+
+    def _on_notification(self, connection, pid, channel, payload):
+        try:
+            data = json.loads(payload)
+            change = Change(table=data.get("t", ""), op=data["op"], id=data.get("id"), ref=data.get("ref"))
+        except (ValueError, KeyError) as exc:
+            logging.error("Malformed change notification %r - %s", payload, exc)
+            self._request_resync()
+            return
+
+        if change.op in ("resync", "truncate"):
+            self._request_resync()
+            return
+
+        try:
+            self._queue.put_nowait(change)
+        except asyncio.QueueFull:
+            self._request_resync()
+
+    def _request_resync(self):
+        self._resync_needed = True
+        # wake the dispatcher up even if no regular change follows
+        with suppress(asyncio.QueueFull):
+            self._queue.put_nowait(Change(table="", op="resync"))
+
+    async def _listen(self, dsn: str):
+        delay = self.reconnect_delay
+        connected_before = False
+
+        while True:
+            connection = None
+            try:
+                connection = await asyncpg.connect(dsn)
+                lost = asyncio.Event()
+                connection.add_termination_listener(lambda _: lost.set())
+                await connection.add_listener(self.channel, self._on_notification)
+                logging.info("Listening to %s notifications.", self.channel)
+
+                if connected_before:
+                    # notifications sent while we were disconnected are lost
+                    self._request_resync()
+                connected_before = True
+                delay = self.reconnect_delay
+
+                while not lost.is_set():
+                    with suppress(asyncio.TimeoutError):
+                        await asyncio.wait_for(lost.wait(), timeout=self.health_check_interval)
+                    if not lost.is_set():
+                        await connection.execute("SELECT 1", timeout=self.health_check_interval)
+
+                logging.warning("Connection listening to %s was closed.", self.channel)
+
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                logging.error("Error while listening to %s - %s", self.channel, exc)
+
+            finally:
+                if connection is not None and not connection.is_closed():
+                    with suppress(Exception):
+                        await connection.close(timeout=1)
+
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, self.max_reconnect_delay)
+
+    async def _dispatch(self):
+        while True:
+            changes = [await self._queue.get()]
+            await asyncio.sleep(self.batch_window)
+            while not self._queue.empty():
+                changes.append(self._queue.get_nowait())
+
+            if self._resync_needed:
+                self._resync_needed = False
+                if not await self._run_handlers([handler() for handler in self._resync_handlers]):
+                    await asyncio.sleep(self.reconnect_delay)
+                    self._request_resync()
+                continue
+
+            changes = list(dict.fromkeys(change for change in changes if change.op != "resync"))
+            if changes:
+                await self._run_handlers([handler(changes) for handler in self._change_handlers])
+
+    @staticmethod
+    async def _run_handlers(calls: list[Awaitable]) -> bool:
+        succeeded = True
+        for result in await asyncio.gather(*calls, return_exceptions=True):
+            if isinstance(result, Exception):
+                logging.error("Error while applying directory changes - %s", result)
+                succeeded = False
+
+        return succeeded
+
+
+change_listener = ChangeListener()
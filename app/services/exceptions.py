@@ -10,3 +10,17 @@ class OrganizationNotFoundException(Exception):
     def __init__(self, message="Organization not found."):
         self.message = message
         super().__init__(self.message)
+
+
+class BuildingNotFoundException(Exception):
+
+    def __init__(self, message="Building not found."):
+        self.message = message
+        super().__init__(self.message)
+
+
+class ExportUnavailableException(Exception):
+
+    def __init__(self, message="Exports need pyarrow, install it with pip install pyarrow."):
+        self.message = message
+        super().__init__(self.message)
@@ -0,0 +1,160 @@
+"""
+Columnar export of the organization directory as an Arrow IPC stream or Parquet
+
+Rows of a server-side cursor are transposed straight into Arrow arrays, nothing goes through OrganizationRead.
+A batch is converted and encoded in a worker thread while the next one is fetched.
+
+pyarrow is an optional dependency (the "export" extra), it is imported on the first export.
+"""
+
+import asyncio
+import io
+from contextlib import suppress
+from typing import (
+    AsyncIterator,
+    Literal,
+    Sequence,
+)
+
+from services.exceptions import ExportUnavailableException
+
+ExportFormat = Literal["arrow", "parquet"]
+
+MEDIA_TYPES: dict[ExportFormat, str] = {
+    "arrow": "application/vnd.apache.arrow.stream",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+FILE_EXTENSIONS: dict[ExportFormat, str] = {
+    "arrow": "arrows",
+    "parquet": "parquet",
+}
+
+
+def load_pyarrow():
+    """
+    Imports pyarrow with its Parquet module
+    Returns:
+        module: pyarrow
+    """
+    try:
+        import pyarrow
+        import pyarrow.parquet  # noqa: F401
+    except ImportError as exc:
+        raise ExportUnavailableException() from exc
+
+    return pyarrow
+
+
+def export_schema(pa):
+    # column order is the order of repository.export.EXPORT_ORGANIZATIONS
+    return pa.schema(
+        [
+            ("id", pa.int32()),
+            ("name", pa.string()),
+            ("phone", pa.string()),
+            ("building_id", pa.int32()),
+            ("address", pa.string()),
+            ("latitude", pa.float64()),
+            ("longitude", pa.float64()),
+            ("activity_ids", pa.list_(pa.int32())),
+        ]
+    )
+
+
+class ChunkSink(io.RawIOBase):
+    """
+    Write-only file collecting encoded bytes until they are drained
+    Keeps counting the position across drains, the Parquet writer records column chunk offsets from tell()
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._chunks: list[bytes] = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        chunk = bytes(data)
+        self._chunks.append(chunk)
+        self._position += len(chunk)
+
+        return len(chunk)
+
+    def tell(self) -> int:
+        return self._position
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+
+        return data
+
+
+class BatchWriter:
+    """Encodes batches of export rows in one format, every batch is a record batch or a Parquet row group"""
+
+    def __init__(self, sink: ChunkSink, export_format: ExportFormat):
+        self.pa = load_pyarrow()
+        self.schema = export_schema(self.pa)
+
+        if export_format == "parquet":
+            self._writer = self.pa.parquet.ParquetWriter(sink, self.schema, compression="zstd")
+        else:
+            self._writer = self.pa.ipc.new_stream(sink, self.schema)
+
+    def write(self, rows: Sequence[Sequence]):
+        columns = zip(*rows)
+        batch = self.pa.record_batch(
+            [self.pa.array(column, type=field.type) for column, field in zip(columns, self.schema)],
+            schema=self.schema,
+        )
+        self._writer.write_batch(batch)
+
+    def close(self):
+        self._writer.close()
+
+
+async def stream_export(
+    batches: AsyncIterator[Sequence[Sequence]], export_format: ExportFormat
+) -> AsyncIterator[bytes]:
+    """
+    Encodes batches of rows into the export format
+    Args:
+        batches: Batches of rows in the export schema column order
+        export_format: "arrow" for an Arrow IPC stream or "parquet"
+
+    Returns:
+        AsyncIterator[bytes]: Encoded file content, one chunk per batch plus the trailer
+    """
+    sink = ChunkSink()
+    writer = BatchWriter(sink, export_format)
+
+    def encode(rows: Sequence[Sequence]) -> bytes:
+        writer.write(rows)
+        return sink.drain()
+
+    # a batch is encoded in a thread while the next one is read, the thread can't be interrupted, so it is shielded
+    # from cancellation and always finishes before the writer is closed, also when reading or encoding fails
+    encoding = None
+    try:
+        async for rows in batches:
+            if encoding is not None:
+                chunk = await asyncio.shield(encoding)
+                encoding = None
+                yield chunk
+            encoding = asyncio.ensure_future(asyncio.to_thread(encode, rows))
+
+        if encoding is not None:
+            chunk = await asyncio.shield(encoding)
+            encoding = None
+            yield chunk
+    finally:
+        if encoding is not None:
+            with suppress(Exception):
+                await encoding
+        writer.close()
+
+    yield sink.drain()
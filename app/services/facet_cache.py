@@ -0,0 +1,76 @@
+import math
+from collections import OrderedDict
+from dataclasses import replace
+from time import monotonic
+
+from config import settings
+from domain.filters import OrganizationFilters
+
+# bounding boxes are snapped outward to AREA_GRID degrees, radius centers to CENTER_GRID degrees and radii up to
+# RADIUS_STEP kilometers, so nearby map views share one cache entry; counts are those of the snapped area
+AREA_GRID = 0.01
+CENTER_GRID = 0.001
+RADIUS_STEP = 0.1
+
+
+def snap_area(area: OrganizationFilters) -> OrganizationFilters:
+    """
+    Returns the area widened to the cache grid
+    Args:
+        area: Bounding box or radius filters
+
+    Returns:
+        OrganizationFilters: Snapped area
+    """
+    if area.radius is not None:
+        return replace(
+            area,
+            latitude=round(round(area.latitude / CENTER_GRID) * CENTER_GRID, 6),
+            longitude=round(round(area.longitude / CENTER_GRID) * CENTER_GRID, 6),
+            # the center moves by up to half a cell, widen the radius so the original circle stays covered
+            radius=round(
+                math.ceil((area.radius + CENTER_GRID * 111.2 / 2 * math.sqrt(2)) / RADIUS_STEP) * RADIUS_STEP, 6
+            ),
+        )
+
+    return replace(
+        area,
+        lat_min=max(-90.0, round(math.floor(area.lat_min / AREA_GRID) * AREA_GRID, 6)),
+        lon_min=max(-180.0, round(math.floor(area.lon_min / AREA_GRID) * AREA_GRID, 6)),
+        lat_max=min(90.0, round(math.ceil(area.lat_max / AREA_GRID) * AREA_GRID, 6)),
+        lon_max=min(180.0, round(math.ceil(area.lon_max / AREA_GRID) * AREA_GRID, 6)),
+    )
+
+
+class FacetCache:
+    """LRU cache of facet counts per snapped area, entries expire after ttl seconds and on data changes"""
+
+    def __init__(self, ttl: float = 60.0, max_entries: int = 1024):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: OrderedDict[OrganizationFilters, tuple[float, list[dict]]] = OrderedDict()
+
+    def get(self, area: OrganizationFilters) -> list[dict] | None:
+        entry = self._entries.get(area)
+        if entry is None:
+            return None
+
+        stored_at, facets = entry
+        if monotonic() - stored_at >= self.ttl:
+            del self._entries[area]
+            return None
+
+        self._entries.move_to_end(area)
+        return facets
+
+    def put(self, area: OrganizationFilters, facets: list[dict]):
+        self._entries[area] = (monotonic(), facets)
+        self._entries.move_to_end(area)
+        if len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        self._entries.clear()
+
+
+facet_cache = FacetCache(settings.facet_cache_ttl, settings.facet_cache_size)
@@ -0,0 +1,85 @@
+from contextlib import AbstractAsyncContextManager
+from typing import Callable
+
+from database import DatabaseSessionManager
+from protocols.autocomplete import AutocompleteSource
+from repository.snapshot import SnapshotManager
+from repository.snapshot_file import SnapshotFile
+from services.autocomplete import Autocomplete
+from services.change_listener import (
+    SNAPSHOT_FILE_TABLE,
+    Change,
+    ChangeListener,
+)
+from services.facet_cache import FacetCache
+
+
+def subscribe_autocomplete(
+    listener: ChangeListener,
+    autocomplete: Autocomplete,
+    open_source: Callable[[], AbstractAsyncContextManager[AutocompleteSource]],
+):
+    """
+    Keeps the autocomplete indexes up to date by re-reading only the changed names and weights
+    from the database the index was loaded from
+    """
+
+    async def on_change(changes: list[Change]):
+        organization_ids = {
+            change.id for change in changes if change.table in ("organizations", "organization_activity")
+        }
+        activity_ids = {change.id for change in changes if change.table == "activities"} | {
+            change.ref for change in changes if change.table == "organization_activity"
+        }
+        if not organization_ids and not activity_ids:
+            return
+
+        async with open_source() as source:
+            await autocomplete.apply_changes(source, organization_ids, activity_ids)
+
+    async def on_resync():
+        async with open_source() as source:
+            await autocomplete.load(source)
+
+    listener.subscribe(on_change, on_resync)
+
+
+def subscribe_snapshot(listener: ChangeListener, manager: SnapshotManager, sessionmanager: DatabaseSessionManager):
+    """
+    Rebuilds the in-memory snapshot in the background after row changes. The columns are packed arrays, so changes
+    are not applied one by one, they are debounced (SNAPSHOT_CHANGE_DEBOUNCE) and a burst results in one rebuild
+    """
+
+    async def on_change(changes: list[Change]):
+        if any(change.table != SNAPSHOT_FILE_TABLE for change in changes):
+            manager.request_reload(sessionmanager)
+
+    async def on_resync():
+        manager.request_reload(sessionmanager)
+
+    listener.subscribe(on_change, on_resync)
+
+
+def subscribe_snapshot_file(listener: ChangeListener, snapshot_file: SnapshotFile, manager: SnapshotManager):
+    """Maps the snapshot file again as soon as tools.build_snapshot reports it was replaced"""
+
+    async def on_change(changes: list[Change]):
+        if any(change.table == SNAPSHOT_FILE_TABLE for change in changes):
+            await snapshot_file.open_if_changed(manager)
+
+    async def on_resync():
+        await snapshot_file.open_if_changed(manager)
+
+    listener.subscribe(on_change, on_resync)
+
+
+def subscribe_facets(listener: ChangeListener, cache: FacetCache):
+    """Drops cached facet counts on any change, they are recomputed on the next request for an area"""
+
+    async def on_change(changes: list[Change]):
+        cache.clear()
+
+    async def on_resync():
+        cache.clear()
+
+    listener.subscribe(on_change, on_resync)
@@ -1,11 +1,24 @@
 import logging
 
-from domain.schemas import OrganizationRead
+from domain.filters import (
+    OrganizationFilters,
+    RadiusQuery,
+)
+from domain.schemas import (
+    ActivityFacetRead,
+    BatchRadiusRequest,
+    OrganizationRead,
+)
+from observability.metrics import SERIALIZATION_DURATION
 from protocols.storage import Storage
 from services.exceptions import (
     OrganizationNotFoundException,
     StorageInternalException,
 )
+from services.facet_cache import (
+    facet_cache,
+    snap_area,
+)
 
 
 class CustomOrganizationService:
@@ -32,14 +45,17 @@ class CustomOrganizationService:
 
         except Exception as exc:
             logging.error(
-                f"Error while getting organizations from storage by building id {building_id} with pagination - {exc}"
+                "Error while getting organizations from storage by building id %s with pagination - %s",
+                building_id,
+                exc,
             )
             raise StorageInternalException(message="Error while getting organizations from storage by building id")
 
         if not organizations_dto:
             raise OrganizationNotFoundException()
 
-        organizations = [org.model_dump() for org in organizations_dto]
+        with SERIALIZATION_DURATION.time("dump"):
+            organizations = [org.model_dump() for org in organizations_dto]
 
         return organizations
 
@@ -62,14 +78,17 @@ class CustomOrganizationService:
             )
         except Exception as exc:
             logging.error(
-                f"Error while getting organizations from storage by activity id {activity_id} with pagination - {exc}"
+                "Error while getting organizations from storage by activity id %s with pagination - %s",
+                activity_id,
+                exc,
             )
             raise StorageInternalException(message="Error while getting organizations from storage by activity id")
 
         if not organizations_dto:
             raise OrganizationNotFoundException()
 
-        organizations = [org.model_dump() for org in organizations_dto]
+        with SERIALIZATION_DURATION.time("dump"):
+            organizations = [org.model_dump() for org in organizations_dto]
 
         return organizations
 
@@ -85,13 +104,14 @@ class CustomOrganizationService:
         try:
             organization_dto: OrganizationRead = await self.storage.get_organization_by_id(organization_id)
         except Exception as exc:
-            logging.error(f"Error while getting organization from storage by id {organization_id} - {exc}")
+            logging.error("Error while getting organization from storage by id %s - %s", organization_id, exc)
             raise StorageInternalException(message="Error while getting organization from storage by id")
 
         if not organization_dto:
             raise OrganizationNotFoundException()
 
-        organization = organization_dto.model_dump()
+        with SERIALIZATION_DURATION.time("dump"):
+            organization = organization_dto.model_dump()
 
         return organization
 
@@ -107,16 +127,44 @@ class CustomOrganizationService:
         try:
             organization_dto: OrganizationRead = await self.storage.get_organization_by_name(name)
         except Exception as exc:
-            logging.error(f"Error while getting organization from storage by name {name} - {exc}")
+            logging.error("Error while getting organization from storage by name %s - %s", name, exc)
             raise StorageInternalException(message="Error while getting organization from storage by name")
 
         if not organization_dto:
             raise OrganizationNotFoundException()
 
-        organization = organization_dto.model_dump()
+        with SERIALIZATION_DURATION.time("dump"):
+            organization = organization_dto.model_dump()
 
         return organization
 
+    async def search_organizations_by_name_with_pagination(self, name: str, page: int, limit: int) -> list[dict]:
+        """
+        Returns a ranked list of organizations matching the name by substring, prefix or similarity with pagination
+        Args:
+            name: Part of organization name
+            page: Page number
+            limit: Limit of items per page
+
+        Returns:
+            list[dict]: List of organizations
+        """
+        try:
+            organizations_dto: list[OrganizationRead] = await self.storage.search_organizations_by_name_with_pagination(
+                name, page, limit
+            )
+        except Exception as exc:
+            logging.error("Error while searching organizations in storage by name %s with pagination - %s", name, exc)
+            raise StorageInternalException(message="Error while searching organizations in storage by name")
+
+        if not organizations_dto:
+            raise OrganizationNotFoundException()
+
+        with SERIALIZATION_DURATION.time("dump"):
+            organizations = [org.model_dump() for org in organizations_dto]
+
+        return organizations
+
     async def get_organizations_in_radius_with_pagination(
         self, latitude: float, longitude: float, radius: float, page: int, limit: int
     ) -> list[dict]:
@@ -138,7 +186,7 @@ class CustomOrganizationService:
             )
 
         except Exception as exc:
-            logging.error(f"Error while getting organizations from storage in radius with pagination - {exc}")
+            logging.error("Error while getting organizations from storage in radius with pagination - %s", exc)
             raise StorageInternalException(
                 message="Error while getting organizations from storage in radius with pagination"
             )
@@ -146,7 +194,8 @@ class CustomOrganizationService:
         if not organizations_dto:
             raise OrganizationNotFoundException()
 
-        organizations = [org.model_dump() for org in organizations_dto]
+        with SERIALIZATION_DURATION.time("dump"):
+            organizations = [org.model_dump() for org in organizations_dto]
 
         return organizations
 
@@ -170,7 +219,7 @@ class CustomOrganizationService:
                 lat_min, lon_min, lat_max, lon_max, page, limit
             )
         except Exception as exc:
-            logging.error(f"Error while getting organizations from storage in bounding box with pagination - {exc}")
+            logging.error("Error while getting organizations from storage in bounding box with pagination - %s", exc)
             raise StorageInternalException(
                 message="Error while getting organizations from storage in bounding box with pagination"
             )
@@ -178,7 +227,8 @@ class CustomOrganizationService:
         if not organizations_dto:
             raise OrganizationNotFoundException()
 
-        organizations = [org.model_dump() for org in organizations_dto]
+        with SERIALIZATION_DURATION.time("dump"):
+            organizations = [org.model_dump() for org in organizations_dto]
 
         return organizations
 
@@ -200,7 +250,7 @@ class CustomOrganizationService:
             )
         except Exception as exc:
             logging.error(
-                f"Error while getting organizations from storage by nested activity id with pagination - {exc}"
+                "Error while getting organizations from storage by nested activity id with pagination - %s", exc
             )
             raise StorageInternalException(
                 message="Error while getting organizations from storage by nested activity id with pagination"
@@ -209,6 +259,95 @@ class CustomOrganizationService:
         if not organizations_dto:
             raise OrganizationNotFoundException()
 
-        organizations = [org.model_dump() for org in organizations_dto]
+        with SERIALIZATION_DURATION.time("dump"):
+            organizations = [org.model_dump() for org in organizations_dto]
 
         return organizations
+
+    async def search_organizations_with_pagination(
+        self, filters: OrganizationFilters, page: int, limit: int
+    ) -> list[dict]:
+        """
+        Returns a list of organizations matching all given filters with pagination
+        Args:
+            filters: Any combination of organization filters
+            page: Page number
+            limit: Limit of items per page
+
+        Returns:
+            list[dict]: List of organizations
+        """
+        try:
+            organizations_dto: list[OrganizationRead] = await self.storage.search_organizations_with_pagination(
+                filters, page, limit
+            )
+        except Exception as exc:
+            logging.error(
+                "Error while searching organizations in storage by filters %s with pagination - %s", filters, exc
+            )
+            raise StorageInternalException(message="Error while searching organizations in storage by filters")
+
+        if not organizations_dto:
+            raise OrganizationNotFoundException()
+
+        with SERIALIZATION_DURATION.time("dump"):
+            organizations = [org.model_dump() for org in organizations_dto]
+
+        return organizations
+
+    async def get_activity_facets_in_area(self, area: OrganizationFilters) -> list[dict]:
+        """
+        Returns organization counts per activity, rolled up the activity tree, for an area snapped to the cache grid
+        Args:
+            area: Bounding box or radius filters
+
+        Returns:
+            list[dict]: Activities with their counts, the largest first
+        """
+        area = snap_area(area)
+        facets = facet_cache.get(area)
+        if facets is not None:
+            return facets
+
+        try:
+            facets_dto: list[ActivityFacetRead] = await self.storage.get_activity_facets(area)
+        except Exception as exc:
+            logging.error("Error while getting activity facets from storage in area %s - %s", area, exc)
+            raise StorageInternalException(message="Error while getting activity facets from storage")
+
+        with SERIALIZATION_DURATION.time("dump"):
+            facets = [facet.model_dump() for facet in facets_dto]
+
+        facet_cache.put(area, facets)
+
+        return facets
+
+    async def get_organizations_in_radius_batch(self, request: BatchRadiusRequest) -> dict:
+        """
+        Answers many radius queries at once, every found organization is returned once
+        Args:
+            request: Radius queries with client ids and the per query limit
+
+        Returns:
+            dict: Organization ids per query id and the organizations
+        """
+        queries = [RadiusQuery(query.latitude, query.longitude, query.radius) for query in request.queries]
+        try:
+            organization_ids, organizations_dto = await self.storage.get_organizations_in_radius_batch(
+                queries, request.limit
+            )
+        except Exception as exc:
+            logging.error(
+                "Error while getting organizations from storage for %s radius queries - %s", len(queries), exc
+            )
+            raise StorageInternalException(message="Error while getting organizations from storage for radius queries")
+
+        with SERIALIZATION_DURATION.time("dump"):
+            organizations = [org.model_dump() for org in organizations_dto]
+
+        return {
+            "results": [
+                {"id": query.id, "organization_ids": ids} for query, ids in zip(request.queries, organization_ids)
+            ],
+            "organizations": organizations,
+        }
@@ -0,0 +1,17 @@
+class Readiness:
+    """Tells the load balancer whether this worker should get traffic"""
+
+    def __init__(self):
+        self.ready = False
+        self.reason = "starting"
+
+    def set_ready(self):
+        self.ready = True
+        self.reason = ""
+
+    def set_not_ready(self, reason: str):
+        self.ready = False
+        self.reason = reason
+
+
+readiness = Readiness()
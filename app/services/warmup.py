@@ -0,0 +1,120 @@
+import asyncio
+import logging
+from contextlib import suppress
+from time import perf_counter
+from typing import (
+    Awaitable,
+    Callable,
+)
+
+from database import DatabaseSessionManager
+from domain.filters import OrganizationFilters
+from protocols.storage import Storage
+from repository.samples import get_warmup_parameters
+from services.autocomplete import Autocomplete
+from services.exceptions import OrganizationNotFoundException
+from services.organization_service import CustomOrganizationService
+from services.readiness import Readiness
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+StorageFactory = Callable[[AsyncSession], Awaitable[Storage]]
+
+
+async def open_pool_connections(sessionmanager: DatabaseSessionManager, connections: int):
+    """
+    Opens connections at once so they are pooled before the first request needs them
+    Args:
+        sessionmanager: Session manager with an initialized engine
+        connections: Number of connections, at most the pool size stays open
+    """
+
+    async def ping():
+        async with sessionmanager.engine.connect() as connection:
+            await connection.execute(text("SELECT 1"))
+
+    await asyncio.gather(*(ping() for _ in range(connections)))
+
+
+async def run_organization_queries(service: CustomOrganizationService, parameters: dict):
+    """
+    Runs every organization query once, compiling statements and building validators and serializers
+    Args:
+        service: Organization service over the storage that serves requests
+        parameters: Parameters from get_warmup_parameters
+    """
+    latitude, longitude = parameters["latitude"], parameters["longitude"]
+    calls = (
+        (service.get_organizations_by_building_id_with_pagination, parameters["building_id"], 1, 10),
+        (service.get_organizations_by_activity_id_with_pagination, parameters["activity_id"], 1, 10),
+        (service.get_organization_by_id, parameters["organization_id"]),
+        (service.get_organization_by_name, parameters["name"]),
+        (service.search_organizations_by_name_with_pagination, parameters["name"][:8], 1, 10),
+        (service.get_organizations_in_radius_with_pagination, latitude, longitude, 1.0, 1, 10),
+        (
+            service.get_organizations_in_bbox_with_pagination,
+            latitude - 0.01,
+            longitude - 0.01,
+            latitude + 0.01,
+            longitude + 0.01,
+            1,
+            10,
+        ),
+        (service.get_organizations_by_nested_activity_id_with_pagination, parameters["root_activity_id"], 1, 10),
+        (
+            service.search_organizations_with_pagination,
+            OrganizationFilters(
+                nested_activity_id=parameters["root_activity_id"], latitude=latitude, longitude=longitude, radius=1.0
+            ),
+            1,
+            10,
+        ),
+    )
+    # one session serves one statement at a time, so the calls go one after another
+    for method, *arguments in calls:
+        with suppress(OrganizationNotFoundException):
+            await method(*arguments)
+
+
+async def warm_up(
+    sessionmanager: DatabaseSessionManager,
+    storage_factory: StorageFactory,
+    autocomplete: Autocomplete,
+    pool_connections: int,
+):
+    """
+    Pays the first request costs ahead of time: pool connections, queries and hot autocomplete prefixes
+    Args:
+        sessionmanager: Session manager with an initialized engine
+        storage_factory: Builds the storage serving requests from a session
+        autocomplete: Loaded autocomplete index
+        pool_connections: Number of connections to open
+    """
+    started = perf_counter()
+    if pool_connections:
+        await open_pool_connections(sessionmanager, pool_connections)
+
+    async with sessionmanager.session() as session:
+        parameters = await get_warmup_parameters(session)
+        if parameters is not None:
+            await run_organization_queries(CustomOrganizationService(await storage_factory(session)), parameters)
+
+    await autocomplete.warm()
+    logging.info("Warm-up finished in %.2f s", perf_counter() - started)
+
+
+async def warm_up_and_mark_ready(readiness: Readiness, timeout: float, *args):
+    """
+    Runs warm_up within the timeout and reports the worker ready afterwards, also when warm-up failed,
+    since a cold worker still serves requests correctly
+    Args:
+        readiness: Readiness of this worker
+        timeout: Seconds after which warm-up is abandoned
+        *args: Arguments of warm_up
+    """
+    try:
+        await asyncio.wait_for(warm_up(*args), timeout)
+    except Exception as exc:
+        logging.error("Error while warming up - %r", exc)
+
+    readiness.set_ready()
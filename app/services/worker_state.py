@@ -0,0 +1,144 @@
+"""
+Metrics and readiness shared by the worker processes of a host
+
+Every worker writes its registry dump and readiness to its own file in a shared directory, once per
+WORKER_STATE_PUBLISH_INTERVAL and right before it answers /metrics or /health/ready, so whichever worker the request
+lands on answers for all of them. Files are replaced atomically and read without locks. A worker whose process is
+gone still counts in counters and histograms but not in gauges and readiness.
+"""
+
+import asyncio
+import json
+import logging
+import os
+from dataclasses import dataclass
+
+from observability.metrics import (
+    Registry,
+    registry,
+)
+from services.readiness import (
+    Readiness,
+    readiness,
+)
+
+WORKER_STATE_PUBLISH_INTERVAL = 1.0
+
+
+@dataclass(frozen=True)
+class WorkerState:
+    pid: int
+    alive: bool
+    ready: bool
+    reason: str
+    metrics: dict[str, list]
+
+
+def _process_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        # a process of another user took the pid over, the worker is gone
+        return False
+
+    return True
+
+
+class SharedWorkerState:
+    """Publishes the state of this worker and aggregates the states of all workers of the host"""
+
+    def __init__(self, registry: Registry, readiness: Readiness):
+        self.registry = registry
+        self.readiness = readiness
+        self.directory = ""
+        self.workers = 1
+
+    @property
+    def opened(self) -> bool:
+        return bool(self.directory)
+
+    def open(self, directory: str, workers: int):
+        """
+        Starts publishing into the directory, called at startup of every worker
+        Args:
+            directory: Directory shared by the workers, emptied by scripts/serve.sh before they start
+            workers: Number of workers started, readiness waits for all of them
+        """
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.workers = workers
+        self.publish()
+
+    def publish(self):
+        """Writes the registry dump and readiness of this worker"""
+        pid = os.getpid()
+        path = os.path.join(self.directory, f"worker-{pid}.json")
+        state = {
+            "pid": pid,
+            "ready": self.readiness.ready,
+            "reason": self.readiness.reason,
+            "metrics": self.registry.dump(),
+        }
+        with open(f"{path}.tmp", "w", encoding="utf-8") as file:
+            json.dump(state, file)
+        os.replace(f"{path}.tmp", path)
+
+    async def publish_periodically(self, interval: float = WORKER_STATE_PUBLISH_INTERVAL):
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                self.publish()
+            except OSError as exc:
+                logging.error("Error while publishing worker state - %r", exc)
+
+    def read(self) -> list[WorkerState]:
+        """
+        Publishes this worker and reads the states of all workers
+        Returns:
+            list[WorkerState]: States, one per worker that ever started
+        """
+        self.publish()
+
+        states = []
+        for entry in os.scandir(self.directory):
+            if not (entry.name.startswith("worker-") and entry.name.endswith(".json")):
+                continue
+            try:
+                with open(entry.path, encoding="utf-8") as file:
+                    state = json.load(file)
+            except (OSError, ValueError):
+                # removed between listing and opening
+                continue
+
+            states.append(
+                WorkerState(
+                    state["pid"], _process_alive(state["pid"]), state["ready"], state["reason"], state["metrics"]
+                )
+            )
+
+        return states
+
+    def render_metrics(self) -> str:
+        """Renders the metrics summed over all workers"""
+        return self.registry.render_merged((state.metrics, state.alive) for state in self.read())
+
+    def ready(self) -> tuple[bool, str]:
+        """
+        Tells whether every worker started and is ready
+        Returns:
+            tuple[bool, str]: Readiness and the reason when not ready
+        """
+        running = [state for state in self.read() if state.alive]
+        if len(running) < self.workers:
+            return False, f"{len(running)} of {self.workers} workers running"
+
+        for state in running:
+            if not state.ready:
+                return False, f"worker {state.pid} {state.reason}"
+
+        return True, ""
+
+
+worker_state = SharedWorkerState(registry, readiness)
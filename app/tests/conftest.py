@@ -0,0 +1,17 @@
+import os
+
+# config.Settings reads the required settings at import time, tests need no database or API key
+for name, value in {
+    "POSTGRES_HOST": "localhost",
+    "POSTGRES_PORT": "5432",
+    "POSTGRES_DB": "nebus_db",
+    "POSTGRES_USER": "nebus",
+    "POSTGRES_PASSWORD": "nebus",
+    "API_KEY_HEADER": "Authorization",
+    "API_KEY": "test",
+    "LOG_LEVEL": "INFO",
+    "LOG_FORMAT": "%(message)s",
+    "LOG_DATE_FORMAT": "%Y-%m-%d %H:%M:%S",
+    "LOG_PATH": "./logs/test.log",
+}.items():
+    os.environ.setdefault(name, value)
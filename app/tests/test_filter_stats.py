@@ -0,0 +1,105 @@
+import math
+
+import pytest
+from domain.filters import OrganizationFilters
+from repository.filter_stats import FilterStatistics
+from repository.geo import radius_bounding_box
+
+
+def statistics(density: dict[tuple[int, int], int], cell: float = 1.0) -> FilterStatistics:
+    return FilterStatistics(
+        organization_count=sum(density.values()),
+        building_count=len(density),
+        activity_organization_counts={},
+        nested_activities={},
+        density=density,
+        cell=cell,
+    )
+
+
+def test_empty_grid():
+    empty = statistics({})
+
+    assert empty._estimate_box(-90.0, 90.0, -180.0, 180.0) == 0.0
+    assert empty._estimate_box(10.0, 10.5, 20.0, 20.5) == 0.0
+
+
+def test_whole_cells():
+    grid = statistics({(10, 20): 100, (10, 21): 50, (11, 20): 10})
+
+    assert grid._estimate_box(10.0, 12.0, 20.0, 22.0) == pytest.approx(160.0)
+    assert grid._estimate_box(10.0, 11.0, 20.0, 21.0) == pytest.approx(100.0)
+
+
+def test_partial_cells_count_by_overlap():
+    grid = statistics({(10, 20): 100, (10, 21): 40})
+
+    assert grid._estimate_box(10.0, 10.5, 20.0, 21.0) == pytest.approx(50.0)
+    assert grid._estimate_box(10.25, 10.75, 20.5, 21.5) == pytest.approx(100 * 0.25 + 40 * 0.25)
+
+
+def test_box_outside_the_cells():
+    grid = statistics({(10, 20): 100})
+
+    assert grid._estimate_box(-10.0, -5.0, 20.0, 21.0) == 0.0
+    assert grid._estimate_box(10.0, 11.0, 40.0, 41.0) == 0.0
+
+
+def test_inverted_box_is_empty():
+    grid = statistics({(10, 20): 100})
+
+    assert grid._estimate_box(11.0, 10.0, 20.0, 21.0) == 0.0
+    assert grid._estimate_box(11.0, 10.0, 21.0, 20.0) == 0.0
+
+
+def test_wide_box_scans_the_grid():
+    # the box covers more cells than the grid has, so the grid is scanned instead of the box
+    grid = statistics({(10, 20): 100, (-50, -170): 7}, cell=0.1)
+
+    assert grid._estimate_box(-90.0, 90.0, -180.0, 180.0) == pytest.approx(107.0)
+
+
+def test_negative_coordinates():
+    grid = statistics({(-1, -1): 100}, cell=0.1)
+
+    assert grid._estimate_box(-0.1, 0.0, -0.1, 0.0) == pytest.approx(100.0)
+    assert grid._estimate_box(-0.05, 0.0, -0.1, 0.0) == pytest.approx(50.0)
+
+
+def test_points_on_the_pole_and_the_antimeridian():
+    # buildings at latitude 90 or longitude 180 fall into cells starting at the edge of the coordinate range
+    grid = statistics({(900, 0): 3, (0, 1800): 5, (-900, -1800): 7}, cell=0.1)
+
+    assert grid._estimate_box(-90.0, 90.0, -180.0, 180.0) == pytest.approx(15.0)
+    assert grid._estimate_box(89.0, 90.0, 0.0, 0.05) == pytest.approx(1.5)
+    assert grid._estimate_box(0.0, 0.1, 179.0, 180.0) == pytest.approx(5.0)
+    assert grid._estimate_box(0.0, 0.1, 170.0, 179.0) == 0.0
+
+
+def test_radius_reaching_the_pole_covers_every_longitude():
+    grid = statistics({(899, 0): 10, (899, -1800): 20, (899, 1799): 30}, cell=0.1)
+    filters = OrganizationFilters(latitude=89.95, longitude=0.0, radius=50.0)
+
+    assert grid.estimate("radius", filters) == pytest.approx(60.0)
+
+
+def test_radius_crossing_the_antimeridian_covers_every_longitude():
+    grid = statistics({(0, 1799): 10, (0, -1800): 20, (0, 0): 30}, cell=0.1)
+    filters = OrganizationFilters(latitude=0.05, longitude=179.99, radius=5.0)
+    lat_min, lat_max, lon_min, _ = radius_bounding_box(0.05, 179.99, 5.0)
+
+    assert lon_min is None
+    # the latitude band covers part of the cell row, every cell of it counts in the same proportion
+    assert grid.estimate("radius", filters) == pytest.approx(60.0 * (lat_max - lat_min) / 0.1)
+
+
+def test_radius_scales_the_box_by_the_circle():
+    grid = statistics({(0, 0): 1000}, cell=10.0)
+    filters = OrganizationFilters(latitude=5.0, longitude=5.0, radius=100.0)
+
+    lat_min, lat_max, lon_min, lon_max = radius_bounding_box(5.0, 5.0, 100.0)
+
+    # the bounding box of the circle lies inside the cell
+    assert grid.estimate("radius", filters) == pytest.approx(
+        1000 * (lat_max - lat_min) * (lon_max - lon_min) / 100 * math.pi / 4
+    )
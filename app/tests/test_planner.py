@@ -0,0 +1,99 @@
+from domain.filters import OrganizationFilters
+from repository.filter_stats import FilterStatistics
+from repository.planner import (
+    POSTGRES_COSTS,
+    SNAPSHOT_COSTS,
+    driver_cost,
+    plan_filters,
+)
+
+# 100k organizations in 20k buildings spread over a 1x1 degree city in 0.1 degree cells
+STATISTICS = FilterStatistics(
+    organization_count=100_000,
+    building_count=20_000,
+    activity_organization_counts={1: 50_000, 2: 500, 3: 20},
+    nested_activities={1: (1, 2, 3), 2: (2, 3), 3: (3,)},
+    density={(lat, lon): 1000 for lat in range(550, 560) for lon in range(370, 380)},
+)
+
+CITY = {"lat_min": 55.0, "lat_max": 56.0, "lon_min": 37.0, "lon_max": 38.0}
+BLOCK = {"lat_min": 55.5, "lat_max": 55.51, "lon_min": 37.5, "lon_max": 37.51}
+
+
+def test_single_filter():
+    assert plan_filters(OrganizationFilters(name="ромашка"), STATISTICS) == ["name"]
+    assert plan_filters(OrganizationFilters(name="ромашка"), STATISTICS, SNAPSHOT_COSTS) == ["name"]
+
+
+def test_most_selective_filter_drives():
+    filters = OrganizationFilters(activity_id=3, nested_activity_id=1, **CITY)
+
+    assert plan_filters(filters, STATISTICS) == ["activity", "nested_activity", "bbox"]
+    assert plan_filters(filters, STATISTICS, SNAPSHOT_COSTS)[0] == "activity"
+
+
+def test_building_drives_over_a_rare_activity():
+    filters = OrganizationFilters(building_id=7, activity_id=3)
+
+    assert plan_filters(filters, STATISTICS) == ["building", "activity"]
+
+
+def test_unknown_activity_drives():
+    filters = OrganizationFilters(activity_id=404, **CITY)
+
+    assert plan_filters(filters, STATISTICS)[0] == "activity"
+
+
+def test_ties_follow_the_row_cost_order():
+    filters = OrganizationFilters(activity_id=2, nested_activity_id=2)
+    statistics = FilterStatistics(
+        organization_count=1000,
+        building_count=10,
+        activity_organization_counts={2: 10},
+        nested_activities={2: (2,)},
+        density={},
+    )
+
+    # both estimate 10 rows, the nested activity costs more per row
+    assert plan_filters(filters, statistics) == ["activity", "nested_activity"]
+
+
+def test_address_pays_for_the_building_scan():
+    filters = OrganizationFilters(address="Ленина", **CITY)
+
+    assert driver_cost("address", filters, STATISTICS) > STATISTICS.building_count
+    assert plan_filters(filters, STATISTICS) == ["address", "bbox"]
+    assert plan_filters(OrganizationFilters(address="Ленина", **BLOCK), STATISTICS) == ["bbox", "address"]
+
+
+def test_postgres_name_is_priced_by_its_selectivity():
+    filters = OrganizationFilters(name="ромашка", **CITY)
+
+    assert driver_cost("name", filters, STATISTICS) == STATISTICS.organization_count * 0.001 * 4
+    assert plan_filters(filters, STATISTICS) == ["name", "bbox"]
+
+
+def test_snapshot_name_pays_for_the_name_scan():
+    city = OrganizationFilters(name="ромашка", **CITY)
+    block = OrganizationFilters(name="ромашка", **BLOCK)
+
+    assert driver_cost("name", city, STATISTICS, SNAPSHOT_COSTS) >= STATISTICS.organization_count * 2
+    # word similarity checks of every organization of the city cost more than scanning the names once
+    assert plan_filters(city, STATISTICS, SNAPSHOT_COSTS) == ["name", "bbox"]
+    # a block holds few organizations, checking their names is cheaper than the scan
+    assert plan_filters(block, STATISTICS, SNAPSHOT_COSTS) == ["bbox", "name"]
+
+
+def test_snapshot_checks_cheapest_first():
+    filters = OrganizationFilters(building_id=7, name="ромашка", address="Ленина", activity_id=2, **CITY)
+
+    assert plan_filters(filters, STATISTICS, SNAPSHOT_COSTS) == ["building", "bbox", "activity", "address", "name"]
+
+
+def test_postgres_plan_ignores_check_costs():
+    filters = OrganizationFilters(activity_id=2, name="ромашка", **BLOCK)
+
+    assert POSTGRES_COSTS.check_cost == dict.fromkeys(POSTGRES_COSTS.row_cost, 0.0)
+    assert plan_filters(filters, STATISTICS) == sorted(
+        filters.kinds, key=lambda kind: driver_cost(kind, filters, STATISTICS)
+    )
@@ -0,0 +1,64 @@
+"""
+Builds the snapshot file served by STORAGE_BACKEND=mmap
+
+The file is written next to the target and renamed over it. A notification on the change channel makes the workers
+map the new file right away, otherwise they pick it up on their next reload.
+
+Usage (from the app directory):
+    python -m tools.build_snapshot --output ./snapshots/directory.snap
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import time
+
+import asyncpg
+from config import settings
+from database import sessionmanager
+from repository.snapshot import load_snapshot
+from repository.snapshot_file import write_snapshot
+from services.change_listener import (
+    CHANGE_CHANNEL,
+    SNAPSHOT_FILE_TABLE,
+)
+
+
+async def run(args: argparse.Namespace):
+    sessionmanager.init(settings.postgres_url)
+    try:
+        started = time.perf_counter()
+        async with sessionmanager.session() as session:
+            snapshot = await load_snapshot(session)
+        loaded = time.perf_counter()
+    finally:
+        await sessionmanager.close()
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    write_snapshot(snapshot, args.output)
+
+    connection = await asyncpg.connect(settings.postgres_dsn)
+    try:
+        await connection.execute(
+            "SELECT pg_notify($1, $2)", CHANGE_CHANNEL, json.dumps({"t": SNAPSHOT_FILE_TABLE, "op": "replace"})
+        )
+    finally:
+        await connection.close()
+
+    print(
+        f"{len(snapshot.org_ids)} organizations, {len(snapshot.building_ids)} buildings, "
+        f"{len(snapshot.activity_ids)} activities: loaded in {loaded - started:.2f}s, "
+        f"written in {time.perf_counter() - loaded:.2f}s, {os.path.getsize(args.output) / 2**20:.1f} MiB"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Writes the memory-mapped directory snapshot")
+    parser.add_argument("--output", default=settings.snapshot_path, help="Snapshot file path")
+
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,205 @@
+"""
+Query plan regression check for PostgresStorage
+
+Runs every storage query against a seeded database, captures the SQL statements it issues (including the selectinload
+follow-ups) and re-runs each of them with EXPLAIN (ANALYZE, BUFFERS). Fails when a plan scans a large table
+sequentially or touches more shared buffers than the budget allows.
+
+Usage (from the app directory):
+    python -m tools.explain_plans --analyze --buffer-budget 2000
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+from dataclasses import (
+    dataclass,
+    field,
+)
+from typing import (
+    Awaitable,
+    Callable,
+)
+
+from config import settings
+from database import sessionmanager
+from repository.postgres_repo import PostgresStorage
+from repository.samples import get_sample_parameters
+from sqlalchemy import (
+    event,
+    text,
+)
+from sqlalchemy.ext.asyncio import AsyncSession
+
+
+@dataclass
+class StatementReport:
+    statement: str
+    total_buffers: int
+    execution_ms: float
+    node_types: list[str]
+    violations: list[str] = field(default_factory=list)
+
+
+@dataclass
+class CaseReport:
+    name: str
+    statements: list[StatementReport] = field(default_factory=list)
+
+    @property
+    def failed(self) -> bool:
+        return any(statement.violations for statement in self.statements)
+
+
+class StatementRecorder:
+    """Collects statements sent to the database while enabled"""
+
+    def __init__(self):
+        self.enabled = False
+        self.statements: list[tuple[str, tuple]] = []
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        if self.enabled:
+            self.statements.append((statement, parameters))
+
+
+def get_cases(params: dict, page: int) -> dict[str, Callable[[PostgresStorage], Awaitable]]:
+    lat, lon = params["latitude"], params["longitude"]
+
+    return {
+        "by-building": lambda s: s.get_organizations_by_building_id_with_pagination(params["building_id"], page, 10),
+        "by-activity": lambda s: s.get_organizations_by_activity_id_with_pagination(params["activity_id"], page, 10),
+        "by-id": lambda s: s.get_organization_by_id(1),
+        "by-name": lambda s: s.get_organization_by_name(params["name"]),
+        "search": lambda s: s.search_organizations_by_name_with_pagination(params["name"][:5], page, 10),
+        "in-radius": lambda s: s.get_organizations_in_radius_with_pagination(lat, lon, 1.0, page, 10),
+        "in-bbox": lambda s: s.get_organizations_in_bbox_with_pagination(
+            lat - 0.01, lon - 0.01, lat + 0.01, lon + 0.01, page, 10
+        ),
+        "by-nested-activity": lambda s: s.get_organizations_by_nested_activity_id_with_pagination(
+            params["root_activity_id"], page, 10
+        ),
+    }
+
+
+def walk_plan(plan: dict):
+    yield plan
+    for child in plan.get("Plans", []):
+        yield from walk_plan(child)
+
+
+async def explain_case(
+    session: AsyncSession,
+    recorder: StatementRecorder,
+    name: str,
+    call: Callable[[PostgresStorage], Awaitable],
+    table_sizes: dict[str, float],
+    args: argparse.Namespace,
+) -> CaseReport:
+    recorder.statements.clear()
+    recorder.enabled = True
+    try:
+        await call(PostgresStorage(session, settings.activity_hierarchy))
+    finally:
+        recorder.enabled = False
+
+    report = CaseReport(name)
+    connection = await session.connection()
+
+    for statement, parameters in list(recorder.statements):
+        result = await connection.exec_driver_sql(
+            f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {statement}", tuple(parameters)
+        )
+        plan_output = result.scalar()
+        explain = (json.loads(plan_output) if isinstance(plan_output, str) else plan_output)[0]
+        root = explain["Plan"]
+        nodes = list(walk_plan(root))
+
+        statement_report = StatementReport(
+            statement=" ".join(statement.split()),
+            total_buffers=root.get("Shared Hit Blocks", 0) + root.get("Shared Read Blocks", 0),
+            execution_ms=explain.get("Execution Time", 0.0),
+            node_types=[node["Node Type"] for node in nodes],
+        )
+
+        for node in nodes:
+            relation = node.get("Relation Name")
+            if node["Node Type"] == "Seq Scan" and table_sizes.get(relation, 0) >= args.min_rows:
+                statement_report.violations.append(
+                    f"seq scan on {relation} (~{int(table_sizes[relation])} rows, {node.get('Actual Rows')} returned)"
+                )
+
+        if statement_report.total_buffers > args.buffer_budget:
+            statement_report.violations.append(
+                f"{statement_report.total_buffers} shared buffers exceed budget {args.buffer_budget}"
+            )
+
+        report.statements.append(statement_report)
+
+    return report
+
+
+async def run(args: argparse.Namespace) -> int:
+    sessionmanager.init(settings.postgres_url)
+    recorder = StatementRecorder()
+    event.listen(sessionmanager.engine.sync_engine, "before_cursor_execute", recorder)
+
+    try:
+        async with sessionmanager.session() as session:
+            if args.analyze:
+                await session.execute(
+                    text("ANALYZE organizations, buildings, activities, activities_closures, organization_activity")
+                )
+
+            table_sizes = {
+                relname: reltuples
+                for relname, reltuples in (
+                    await session.execute(text("SELECT relname, reltuples FROM pg_class WHERE relkind = 'r'"))
+                ).all()
+            }
+            params = await get_sample_parameters(session)
+
+            reports = []
+            for page in args.pages:
+                for name, call in get_cases(params, page).items():
+                    reports.append(
+                        await explain_case(session, recorder, f"{name} page={page}", call, table_sizes, args)
+                    )
+
+            await session.rollback()
+    finally:
+        await sessionmanager.close()
+
+    failed = False
+    for report in reports:
+        print(f"{'FAIL' if report.failed else 'ok  '} {report.name}")
+        for statement in report.statements:
+            print(
+                f"     {statement.execution_ms:8.3f} ms  {statement.total_buffers:6d} buffers  "
+                f"{' > '.join(dict.fromkeys(statement.node_types))}"
+            )
+            for violation in statement.violations:
+                print(f"     ! {violation}")
+            if args.verbose or statement.violations:
+                print(f"       {statement.statement}")
+        failed = failed or report.failed
+
+    return 1 if failed else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="EXPLAIN-based plan regression check for PostgresStorage queries")
+    parser.add_argument("--buffer-budget", type=int, default=1000, help="Max shared buffers touched per statement")
+    parser.add_argument(
+        "--min-rows", type=int, default=10_000, help="Seq scans on tables smaller than this are tolerated"
+    )
+    parser.add_argument("--pages", type=int, nargs="+", default=[1, 50], help="Pages to check, deep pages included")
+    parser.add_argument("--analyze", action="store_true", help="Run ANALYZE before explaining")
+    parser.add_argument("--verbose", action="store_true", help="Print every statement")
+
+    sys.exit(asyncio.run(run(parser.parse_args())))
+
+
+if __name__ == "__main__":
+    main()
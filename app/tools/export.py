@@ -0,0 +1,63 @@
+"""
+Exports organizations with their building address, coordinates and activity ids as an Arrow IPC stream or Parquet
+
+Rows are read through a server-side cursor and written batch by batch, memory use does not grow with the dataset.
+Needs pyarrow (pip install pyarrow).
+
+Usage (from the app directory):
+    python -m tools.export --format parquet --output ./exports/organizations.parquet
+"""
+
+import argparse
+import asyncio
+import os
+import time
+
+import asyncpg
+from config import settings
+from repository.export import PostgresExportSource
+from services.export import stream_export
+
+
+async def run(args: argparse.Namespace):
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    temporary_path = f"{args.output}.tmp"
+
+    started = time.perf_counter()
+    connection = await asyncpg.connect(settings.postgres_dsn)
+    try:
+        rows = 0
+
+        async def counted(batches):
+            nonlocal rows
+            async for batch in batches:
+                rows += len(batch)
+                yield batch
+
+        with open(temporary_path, "wb") as file:
+            source = PostgresExportSource(connection)
+            async for chunk in stream_export(counted(source.batches(args.batch_size)), args.format):
+                file.write(chunk)
+    finally:
+        await connection.close()
+
+    os.replace(temporary_path, args.output)
+
+    seconds = time.perf_counter() - started
+    print(
+        f"{rows} organizations exported in {seconds:.2f}s ({rows / max(seconds, 1e-9):.0f} rows/s), "
+        f"{os.path.getsize(args.output) / 2**20:.1f} MiB"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Columnar export of the organization directory")
+    parser.add_argument("--format", choices=["arrow", "parquet"], default="parquet")
+    parser.add_argument("--output", required=True, help="Output file path")
+    parser.add_argument("--batch-size", type=int, default=settings.export_batch_size, help="Rows per batch")
+
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+"""
+Deterministic synthetic dataset for load and query plan testing
+
+Buildings are clustered around city centers with cluster sizes following a power law, organizations are spread over
+buildings and activities with Zipf-like skew, activities form trees of configurable depth and fan-out. Rows are
+generated lazily and streamed through the bulk ingest pipeline, so memory use does not grow with the dataset.
+
+Usage (from the app directory):
+    python -m tools.generate_dataset --buildings 200000 --organizations 1000000 --depth 4 --fanout 5 --truncate
+"""
+
+import argparse
+import asyncio
+import random
+from bisect import bisect_left
+from itertools import accumulate
+from typing import Iterator
+
+import asyncpg
+from config import settings
+from repository.bulk_ingest import (
+    ActivityRecord,
+    BuildingRecord,
+    OrganizationRecord,
+    PostgresBulkIngest,
+)
+
+CITIES = [
+    ("Москва", 55.7558, 37.6173),
+    ("Санкт-Петербург", 59.9343, 30.3351),
+    ("Новосибирск", 55.0084, 82.9357),
+    ("Екатеринбург", 56.8389, 60.6057),
+    ("Казань", 55.7961, 49.1064),
+    ("Нижний Новгород", 56.2965, 43.9361),
+    ("Челябинск", 55.1644, 61.4368),
+    ("Самара", 53.1959, 50.1002),
+    ("Омск", 54.9885, 73.3242),
+    ("Ростов-на-Дону", 47.2357, 39.7015),
+    ("Уфа", 54.7388, 55.9721),
+    ("Красноярск", 56.0153, 92.8932),
+    ("Воронеж", 51.6755, 39.2089),
+    ("Пермь", 58.0105, 56.2502),
+    ("Волгоград", 48.7080, 44.5133),
+    ("Владивосток", 43.1155, 131.8855),
+]
+
+STREETS = ["Ленина", "Мира", "Гагарина", "Советская", "Садовая", "Лесная", "Школьная", "Центральная", "Новая"]
+
+ACTIVITY_WORDS = ["Еда", "Автомобили", "Одежда", "Строительство", "Медицина", "Образование", "Туризм", "Финансы"]
+
+NAME_WORDS = ["Рога", "Копыта", "Север", "Восток", "Альфа", "Вектор", "Гранит", "Импульс", "Радуга", "Орион"]
+
+
+def zipf_cum_weights(count: int, exponent: float) -> list[float]:
+    return list(accumulate(1.0 / (rank**exponent) for rank in range(1, count + 1)))
+
+
+def pick(rng: random.Random, cum_weights: list[float]) -> int:
+    """Returns a zero-based index drawn with the given cumulative weights"""
+    return bisect_left(cum_weights, rng.random() * cum_weights[-1])
+
+
+def generate_buildings(args: argparse.Namespace) -> Iterator[BuildingRecord]:
+    rng = random.Random(f"{args.seed}:buildings")
+    cities = CITIES[: args.clusters]
+    city_weights = zipf_cum_weights(len(cities), 1.0)
+
+    for building_id in range(1, args.buildings + 1):
+        city, latitude, longitude = cities[pick(rng, city_weights)]
+        # most buildings are close to the center, a few are in the suburbs
+        spread = args.spread * (3 if rng.random() < 0.1 else 1)
+        yield (
+            building_id,
+            f"г. {city}, ул. {rng.choice(STREETS)} {rng.randint(1, 250)}, офис {rng.randint(1, 500)}",
+            max(-90.0, min(90.0, rng.gauss(latitude, spread))),
+            max(-180.0, min(180.0, rng.gauss(longitude, spread * 1.7))),
+        )
+
+
+def activity_tree(args: argparse.Namespace) -> list[ActivityRecord]:
+    """Returns activities in breadth-first order, ids start from 1"""
+    activities: list[ActivityRecord] = []
+    level: list[tuple[int, str]] = []
+    for root in range(args.roots):
+        word = ACTIVITY_WORDS[root % len(ACTIVITY_WORDS)]
+        activities.append((len(activities) + 1, f"{word} {len(activities) + 1}", None))
+        level.append((len(activities), word))
+
+    for _ in range(1, args.depth):
+        next_level = []
+        for parent_id, word in level:
+            for _ in range(args.fanout):
+                activities.append((len(activities) + 1, f"{word} {len(activities) + 1}", parent_id))
+                next_level.append((len(activities), word))
+        level = next_level
+
+    return activities
+
+
+def generate_organizations(args: argparse.Namespace, activity_count: int) -> Iterator[OrganizationRecord]:
+    rng = random.Random(f"{args.seed}:organizations")
+    # shuffled ranks, so hot buildings and activities are spread over the id space and the tree
+    building_ranks = list(range(1, args.buildings + 1))
+    rng.shuffle(building_ranks)
+    activity_ranks = list(range(1, activity_count + 1))
+    rng.shuffle(activity_ranks)
+    building_weights = zipf_cum_weights(args.buildings, args.skew)
+    activity_weights = zipf_cum_weights(activity_count, args.skew)
+
+    for organization_id in range(1, args.organizations + 1):
+        activity_ids = {activity_ranks[pick(rng, activity_weights)] for _ in range(rng.randint(1, args.max_activities))}
+        yield (
+            organization_id,
+            f"ООО {rng.choice(NAME_WORDS)} {rng.choice(NAME_WORDS)} {organization_id}",
+            f"8-9{rng.randint(10, 99)}-{rng.randint(100, 999)}-{rng.randint(10, 99)}-{rng.randint(10, 99)}",
+            building_ranks[pick(rng, building_weights)],
+            sorted(activity_ids),
+        )
+
+
+async def run(args: argparse.Namespace):
+    activities = activity_tree(args)
+
+    connection = await asyncpg.connect(settings.postgres_dsn)
+    try:
+        if args.truncate:
+            await connection.execute(
+                "TRUNCATE organization_activity, organizations, buildings, activities_closures, activities "
+                "RESTART IDENTITY"
+            )
+
+        report = await PostgresBulkIngest(connection).run(
+            buildings=generate_buildings(args),
+            activities=activities,
+            organizations=generate_organizations(args, len(activities)),
+        )
+        await connection.execute(
+            "ANALYZE buildings, activities, organizations, organization_activity, activities_closures"
+        )
+    finally:
+        await connection.close()
+
+    print(report)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generates and loads a deterministic synthetic directory")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--buildings", type=int, default=100_000)
+    parser.add_argument("--organizations", type=int, default=1_000_000)
+    parser.add_argument("--clusters", type=int, default=len(CITIES), choices=range(1, len(CITIES) + 1))
+    parser.add_argument("--spread", type=float, default=0.08, help="Standard deviation around a city, degrees")
+    parser.add_argument("--roots", type=int, default=8, help="Number of root activities")
+    parser.add_argument("--depth", type=int, default=3, help="Levels of the activity trees")
+    parser.add_argument("--fanout", type=int, default=4, help="Children per activity")
+    parser.add_argument("--max-activities", type=int, default=3, help="Max activities per organization")
+    parser.add_argument("--skew", type=float, default=1.0, help="Zipf exponent for buildings and activities")
+    parser.add_argument("--truncate", action="store_true", help="Remove existing data first")
+
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
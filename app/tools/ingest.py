@@ -0,0 +1,105 @@
+"""
+Bulk loads buildings, activities and organizations from CSV or NDJSON files
+
+Files are streamed, the format is chosen by extension (.csv, .ndjson or .jsonl). Expected fields:
+    buildings       id, address, latitude, longitude
+    activities      id, name, parent_id (empty or null for root activities)
+    organizations   id, name, phone, building_id, activity_ids ("1;2;3" in CSV, a list in NDJSON)
+
+Existing rows with the same ids are updated and the last row of an id wins, the activity closure is rebuilt when
+activities are loaded. Rows with missing values, values longer than their column or coordinates out of range,
+organizations of unknown buildings and organizations whose name is taken are skipped, the report counts them.
+
+Usage (from the app directory):
+    python -m tools.ingest --buildings buildings.csv --activities activities.csv --organizations organizations.ndjson
+"""
+
+import argparse
+import asyncio
+import csv
+import json
+import os
+from typing import Iterator
+
+import asyncpg
+from config import settings
+from repository.bulk_ingest import (
+    ActivityRecord,
+    BuildingRecord,
+    OrganizationRecord,
+    PostgresBulkIngest,
+)
+
+
+def read_rows(path: str | None) -> Iterator[dict]:
+    if not path:
+        return
+
+    extension = os.path.splitext(path)[1].lower()
+    with open(path, newline="", encoding="utf-8") as file:
+        if extension == ".csv":
+            yield from csv.DictReader(file)
+        elif extension in (".ndjson", ".jsonl"):
+            for line in file:
+                if line.strip():
+                    yield json.loads(line)
+        else:
+            raise ValueError(f"Unsupported file format {extension}, expected .csv, .ndjson or .jsonl")
+
+
+def optional_int(value) -> int | None:
+    return int(value) if value not in (None, "") else None
+
+
+def parse_ids(value) -> list[int]:
+    if isinstance(value, list):
+        return [int(item) for item in value]
+
+    return [int(item) for item in str(value or "").split(";") if item.strip()]
+
+
+def read_buildings(path: str | None) -> Iterator[BuildingRecord]:
+    for row in read_rows(path):
+        yield int(row["id"]), row["address"], float(row["latitude"]), float(row["longitude"])
+
+
+def read_activities(path: str | None) -> Iterator[ActivityRecord]:
+    for row in read_rows(path):
+        yield int(row["id"]), row["name"], optional_int(row.get("parent_id"))
+
+
+def read_organizations(path: str | None) -> Iterator[OrganizationRecord]:
+    for row in read_rows(path):
+        yield int(row["id"]), row["name"], row["phone"], int(row["building_id"]), parse_ids(row.get("activity_ids"))
+
+
+async def run(args: argparse.Namespace):
+    connection = await asyncpg.connect(settings.postgres_dsn)
+    try:
+        report = await PostgresBulkIngest(connection).run(
+            buildings=read_buildings(args.buildings),
+            activities=read_activities(args.activities),
+            organizations=read_organizations(args.organizations),
+        )
+        if args.analyze:
+            await connection.execute(
+                "ANALYZE buildings, activities, organizations, organization_activity, activities_closures"
+            )
+    finally:
+        await connection.close()
+
+    print(report)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="COPY-based bulk load of the organization directory")
+    parser.add_argument("--buildings", help="Buildings file")
+    parser.add_argument("--activities", help="Activities file")
+    parser.add_argument("--organizations", help="Organizations file")
+    parser.add_argument("--analyze", action="store_true", help="Refresh planner statistics after loading")
+
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""
+Splits the organization directory of the primary database into the region shards of STORAGE_BACKEND=sharded
+
+Every building goes to the first shard whose region contains it, organizations follow their building, activities are
+copied to every shard. Building and organization ids are moved into the id range of their shard
+(id_prefix * SHARD_ID_STRIDE + id), so point lookups are routed without a directory, and the id sequences of the shard
+start in that range, so rows inserted later are routed too. Buildings outside every region are reported and skipped.
+
+Shard databases need the schema first, run the migrations with POSTGRES_* pointing at each of them.
+
+Usage (from the app directory):
+    python -m tools.split_shards
+"""
+
+import argparse
+import asyncio
+import time
+from typing import AsyncIterator
+
+import asyncpg
+from config import settings
+from repository.bulk_ingest import (
+    ActivityRecord,
+    OrganizationRecord,
+    PostgresBulkIngest,
+)
+from repository.sharding import (
+    Shard,
+    ShardMap,
+    shard_map,
+)
+
+SOURCE_BUILDINGS = "SELECT id, address, latitude, longitude FROM buildings ORDER BY id"
+
+SOURCE_ACTIVITIES = """
+SELECT a.id, a.name, c.ancestor_id
+FROM activities a
+LEFT JOIN activities_closures c ON c.descendant_id = a.id AND c.depth = 1
+ORDER BY a.id
+"""
+
+# a shard without rows would otherwise hand out ids 1, 2, ... which belong to no shard
+SHARD_SEQUENCES = """
+SELECT setval(pg_get_serial_sequence(t.name, 'id'), greatest(t.max_id, $1::bigint))
+FROM (
+    VALUES
+        ('buildings', (SELECT max(id) FROM buildings)),
+        ('organizations', (SELECT max(id) FROM organizations))
+) AS t(name, max_id)
+"""
+
+SOURCE_ORGANIZATIONS = """
+SELECT
+    o.id,
+    o.name,
+    o.phone,
+    o.building_id,
+    ARRAY(SELECT oa.activity_id FROM organization_activity oa WHERE oa.organization_id = o.id) AS activity_ids
+FROM organizations o
+WHERE o.building_id = ANY($1::integer[])
+ORDER BY o.id
+"""
+
+
+async def shard_organizations(
+    source: asyncpg.Connection, shards: ShardMap, shard: Shard, building_ids: list[int], batch_size: int
+) -> AsyncIterator[OrganizationRecord]:
+    async with source.transaction(isolation="repeatable_read", readonly=True):
+        cursor = await source.cursor(SOURCE_ORGANIZATIONS, building_ids)
+        while rows := await cursor.fetch(batch_size):
+            for id_, name, phone, building_id, activity_ids in rows:
+                yield (
+                    shards.global_id(shard, id_),
+                    name,
+                    phone,
+                    shards.global_id(shard, building_id),
+                    list(activity_ids),
+                )
+
+
+async def run(args: argparse.Namespace):
+    if not shard_map.shards:
+        raise SystemExit("No shards configured, set SHARDS")
+
+    source = await asyncpg.connect(settings.postgres_dsn)
+    try:
+        activities: list[ActivityRecord] = [tuple(row) for row in await source.fetch(SOURCE_ACTIVITIES)]
+
+        shard_buildings: dict[Shard, list[tuple]] = {shard: [] for shard in shard_map.shards}
+        outside = 0
+        for id_, address, latitude, longitude in await source.fetch(SOURCE_BUILDINGS):
+            shard = shard_map.for_point(latitude, longitude)
+            if shard is None:
+                outside += 1
+                continue
+            shard_buildings[shard].append((id_, address, latitude, longitude))
+
+        for shard, buildings in shard_buildings.items():
+            started = time.perf_counter()
+            connection = await asyncpg.connect(shard.dsn)
+            try:
+                report = await PostgresBulkIngest(connection).run(
+                    buildings=[(shard_map.global_id(shard, row[0]), *row[1:]) for row in buildings],
+                    activities=activities,
+                    organizations=shard_organizations(
+                        source, shard_map, shard, [row[0] for row in buildings], args.batch_size
+                    ),
+                )
+                await connection.execute(SHARD_SEQUENCES, shard.id_prefix * shard_map.id_stride)
+            finally:
+                await connection.close()
+
+            print(f"{shard.name}: {len(buildings)} buildings in {time.perf_counter() - started:.2f}s")
+            print(report)
+    finally:
+        await source.close()
+
+    if outside:
+        print(f"{outside} buildings are outside every shard region and were skipped")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Splits the primary database into the region shards")
+    parser.add_argument("--batch-size", type=int, default=10_000, help="Organizations fetched at once")
+
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
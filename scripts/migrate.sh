@@ -0,0 +1,5 @@
+#!/bin/sh
+# Applies migrations once, before the application containers start
+set -e
+
+alembic -c ./app/alembic.ini upgrade head
@@ -0,0 +1,60 @@
+#!/bin/sh
+# Production launch: one worker per available CPU, no reloader.
+# Migrations are not applied here, run scripts/migrate.sh once before starting the workers.
+#
+# Environment:
+#   HOST, PORT          bind address (0.0.0.0:8000)
+#   WEB_CONCURRENCY     worker processes, defaults to the CPUs available to the container
+#   BACKLOG             listen backlog for connection bursts (2048)
+#   KEEP_ALIVE          idle keep-alive seconds, keep it above the idle timeout of the load balancer (75)
+#   WORKER_STATE_DIR    directory the workers publish their metrics and readiness to (/tmp/nebus-workers), so
+#                       /metrics sums all workers and /health/ready is 200 only once every worker is warmed up,
+#                       whichever worker answers
+
+HOST=${HOST:-0.0.0.0}
+PORT=${PORT:-8000}
+BACKLOG=${BACKLOG:-2048}
+KEEP_ALIVE=${KEEP_ALIVE:-75}
+
+# CPUs from the affinity mask, capped by a cgroup v2 CPU quota when there is one
+WORKERS=${WEB_CONCURRENCY:-$(python - <<'PY'
+import math
+import os
+
+cpus = len(os.sched_getaffinity(0))
+try:
+    quota, period = open("/sys/fs/cgroup/cpu.max").read().split()
+    if quota != "max":
+        cpus = min(cpus, max(1, math.ceil(int(quota) / int(period))))
+except (OSError, ValueError):
+    pass
+print(cpus)
+PY
+)}
+
+# the production mode needs gunicorn, uvloop and httptools (main dependencies), a partial install is an error
+# rather than a silent fallback to the asyncio loop and the h11 parser
+if ! python -c "import gunicorn, httptools, uvloop" 2>/dev/null; then
+    echo "gunicorn, uvloop and httptools are required, install the main dependencies (poetry install --only main)" >&2
+    exit 1
+fi
+
+# files of the workers of a previous run would count as workers that exited
+WORKER_STATE_DIR=${WORKER_STATE_DIR:-/tmp/nebus-workers}
+mkdir -p "$WORKER_STATE_DIR"
+find "$WORKER_STATE_DIR" -maxdepth 1 -name 'worker-*.json*' -delete
+export WORKER_STATE_DIR
+export WEB_CONCURRENCY="$WORKERS"
+
+echo "Starting $WORKERS workers on $HOST:$PORT (loop uvloop, http httptools)"
+
+# the app is imported once in the master and forked into the workers
+exec gunicorn app:app \
+    --chdir ./app \
+    --preload \
+    --worker-class uvicorn.workers.UvicornWorker \
+    --workers "$WORKERS" \
+    --bind "$HOST:$PORT" \
+    --backlog "$BACKLOG" \
+    --keep-alive "$KEEP_ALIVE" \
+    --graceful-timeout 30